@@ -0,0 +1,19 @@
+"""Domain enums shared by the ORM models and the API schemas."""
+
+from enum import Enum
+
+
+class EnergyType(str, Enum):
+    solar = "Solar"
+    wind = "Wind"
+    natural_gas = "Natural Gas"
+    nuclear = "Nuclear"
+    coal = "Coal"
+    hydro = "Hydro"
+
+
+class ContractStatus(str, Enum):
+    available = "Available"
+    reserved = "Reserved"
+    sold = "Sold"
+    expired = "Expired"
@@ -0,0 +1,78 @@
+"""Export contracts or portfolio holdings as an Arrow IPC stream or Parquet file.
+
+Run from the backend directory (uses ``DATABASE_READ_URL`` / ``DATABASE_URL``):
+
+    python -m app.export_cli contracts --format parquet --output contracts.parquet
+    python -m app.export_cli portfolio-holdings --user-id 1 --active-only --output -
+"""
+import argparse
+import asyncio
+from datetime import date
+from decimal import Decimal
+import sys
+
+from app.db import snapshot_session
+from app.schemas import ContractFilters, ContractStatus, EnergyType, ExportFormat, ExportTable
+from app.services.export_service import export_table
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("table", choices=["contracts", "portfolio-holdings"])
+    parser.add_argument(
+        "--format", choices=[item.value for item in ExportFormat], default=ExportFormat.parquet.value
+    )
+    parser.add_argument("--output", required=True, help="File path, or - for stdout")
+    parser.add_argument("--user-id", type=int, help="Only this user's holdings")
+    parser.add_argument(
+        "--energy-type", action="append", choices=[item.value for item in EnergyType]
+    )
+    parser.add_argument("--status", choices=[item.value for item in ContractStatus])
+    parser.add_argument("--active-only", action="store_true")
+    parser.add_argument("--location")
+    parser.add_argument("--price-min", type=Decimal)
+    parser.add_argument("--price-max", type=Decimal)
+    parser.add_argument("--quantity-min", type=Decimal)
+    parser.add_argument("--quantity-max", type=Decimal)
+    parser.add_argument("--delivery-start-from", type=date.fromisoformat)
+    parser.add_argument("--delivery-end-to", type=date.fromisoformat)
+    return parser.parse_args(argv)
+
+
+async def run_export(args: argparse.Namespace) -> None:
+    filters = ContractFilters(
+        energy_types=args.energy_type,
+        status=args.status,
+        active_only=args.active_only,
+        location=args.location,
+        price_min=args.price_min,
+        price_max=args.price_max,
+        quantity_min=args.quantity_min,
+        quantity_max=args.quantity_max,
+        delivery_start_from=args.delivery_start_from,
+        delivery_end_to=args.delivery_end_to,
+    )
+    export_format = ExportFormat(args.format)
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        async with snapshot_session() as session:
+            chunks = export_table(
+                session=session,
+                table=ExportTable(args.table.replace("-", "_")),
+                filters=filters,
+                export_format=export_format,
+                user_id=args.user_id,
+            )
+            async for chunk in chunks:
+                output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+
+def main() -> None:
+    asyncio.run(run_export(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,45 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 import logging
 import os
+import time
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.db import engine
-from app.models import Base
+# First app import, so PROCESS_STARTED is taken before the rest of the app loads.
+from app.services.startup import (
+    FirstRequestTimer,
+    mark_ready,
+    run_prewarm,
+    startup_report,
+)
+from app.db import async_session, engine, read_session
+from app.repositories import REPOSITORY_BACKEND
+from app.routers.admin import router as admin_router
 from app.routers.contracts import router as contracts_router
+from app.routers.events import router as events_router
+from app.routers.exports import router as exports_router
+from app.routers.jobs import router as jobs_router
 from app.routers.portfolios import router as portfolios_router
+from app.routers.prices import router as prices_router
+from app.routers.profiles import router as profiles_router
+from app.routers.stats import router as stats_router
+from app.services.admission import AdmissionControlMiddleware
+from app.services.analytics_service import (
+    ADMIN_TOKEN,
+    ANALYTICS_REFRESH_ENABLED,
+    run_rollup_refresher,
+)
+from app.services.jobs import JOBS_ENABLED, JobQueue
+from app.services.lifecycle_service import LIFECYCLE_SWEEP_ENABLED, run_lifecycle_sweeper
+from app.services.profiling import (
+    PROFILING_ENABLED,
+    PROFILING_TOKEN,
+    ProfilingMiddleware,
+    profile_store,
+)
+from app.services.schema_service import check_schema
 
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "INFO").upper()
@@ -17,18 +48,57 @@ logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI):
-    # Ensure db tables exist at startup - so create if not exists.
-    # create_all is synchronous DDL, so we run it via the async connection with run_sync.
-    async with engine.begin() as connection:
-        await connection.run_sync(Base.metadata.create_all)
+async def lifespan(fastapi_app: FastAPI):
+    if REPOSITORY_BACKEND != "sql":
+        # Price history, exports, analytics, and jobs live only in the database, so a
+        # memory-backed app would serve contracts those paths never see.
+        raise RuntimeError(
+            f"REPOSITORY_BACKEND={REPOSITORY_BACKEND!r} is for tests and benchmarks only"
+        )
+    # One query against schema_version instead of create_all's catalog introspection;
+    # schema changes are applied explicitly with `python -m app.migrate_cli`.
+    started = time.perf_counter()
+    startup_report.schema_version = await check_schema(engine)
+    startup_report.schema_check_ms = round(1000 * (time.perf_counter() - started), 1)
     logger.info("Startup: DB connection established")
+    sweeper = (
+        asyncio.create_task(run_lifecycle_sweeper(session_factory=async_session))
+        if LIFECYCLE_SWEEP_ENABLED
+        else None
+    )
+    rollup_refresher = (
+        asyncio.create_task(run_rollup_refresher(session_factory=async_session))
+        if ANALYTICS_REFRESH_ENABLED
+        else None
+    )
+    job_queue = JobQueue(session_factory=async_session) if JOBS_ENABLED else None
+    if job_queue is not None:
+        await job_queue.start()
+    fastapi_app.state.job_queue = job_queue
+    await run_prewarm(session_factory=read_session)
+    mark_ready()
     yield
+    if job_queue is not None:
+        await job_queue.stop()
+    for task in (sweeper, rollup_refresher):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
     logger.info("Shutdown: DB connection closed")
 
 
 app = FastAPI(title="Energy Contract Marketplace", lifespan=lifespan)
+app.state.admin_token = ADMIN_TOKEN
 
+# Innermost, so shed requests are never profiled; not installed at all when disabled.
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+    app.state.profile_store = profile_store
+    app.state.profile_token = PROFILING_TOKEN
+# Added before CORS so shed 503s still carry CORS headers for the frontend.
+app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(FirstRequestTimer)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"], # TODO: add production frontend URL
@@ -37,8 +107,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(admin_router)
 app.include_router(contracts_router)
+app.include_router(events_router)
+app.include_router(exports_router)
+app.include_router(jobs_router)
 app.include_router(portfolios_router)
+app.include_router(prices_router)
+app.include_router(profiles_router)
+app.include_router(stats_router)
 
 
 @app.get("/health")
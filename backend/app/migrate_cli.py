@@ -0,0 +1,49 @@
+"""Apply pending schema migrations and record the schema version and fingerprint.
+
+Run from the backend directory (uses ``DATABASE_URL``) before starting the app:
+
+    python -m app.migrate_cli              # create or upgrade the schema
+    python -m app.migrate_cli --dry-run    # list pending migrations only
+    python -m app.migrate_cli --verify     # compare the live catalog with the models
+    python -m app.migrate_cli --baseline 3 # database set up by hand through 003
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db import engine
+from app.services.schema_service import SCHEMA_VERSION, migrate, verify_schema
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--verify", action="store_true")
+    parser.add_argument(
+        "--baseline", type=int, help="Last migration applied to a database without schema_version"
+    )
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> int:
+    try:
+        if args.verify:
+            problems = await verify_schema(engine)
+            for problem in problems:
+                print(problem)
+            print(f"{len(problems)} difference(s) from the models")
+            return 1 if problems else 0
+        applied = await migrate(engine, baseline=args.baseline, dry_run=args.dry_run)
+        action = "Pending" if args.dry_run else "Applied"
+        print(f"{action} migrations: {applied or 'none'}; schema version {SCHEMA_VERSION}")
+        return 0
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    sys.exit(asyncio.run(run(parse_args())))
+
+
+if __name__ == "__main__":
+    main()
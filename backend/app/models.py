@@ -3,31 +3,211 @@ from decimal import Decimal
 
 from datetime import datetime
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, Numeric, String, UniqueConstraint, func
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Computed,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    UniqueConstraint,
+    column,
+    func,
+    select,
+)
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql.functions import FunctionElement
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+from app.enums import ContractStatus, EnergyType
+
+# SQLite's CURRENT_TIMESTAMP default has second precision; bind datetimes the same
+# way so keyset comparisons on server-generated timestamps are consistent.
+TimestampTZ = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
+
+# Native enums on PostgreSQL (4 bytes per value in rows and indexes); plain strings
+# on SQLite. ORM attributes stay the API's string values.
+EnergyTypeEnum = Enum(
+    *(energy_type.value for energy_type in EnergyType), name="energy_type_enum"
+)
+ContractStatusEnum = Enum(
+    *(status.value for status in ContractStatus), name="contract_status_enum"
+)
+
+
+class delivery_days(FunctionElement):
+    """Inclusive days from a start to an end date column, e.g. for a generated column."""
+
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(delivery_days)
+def _compile_delivery_days(element, compiler, **kw):
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"({end} - {start} + 1)"
+
+
+@compiles(delivery_days, "sqlite")
+def _compile_delivery_days_sqlite(element, compiler, **kw):
+    # SQLite stores dates as ISO text, which does not subtract.
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"(CAST(julianday({end}) - julianday({start}) AS INTEGER) + 1)"
+
 
 class Base(DeclarativeBase):
     pass
 
 
+class Location(Base):
+    """Dimension table for contract locations; contracts reference it by integer id."""
+
+    __tablename__ = "locations"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(80), nullable=False, unique=True)
+
+
+# Statuses stored in the hot partition of ``contracts`` on PostgreSQL (see sql/schema.sql);
+# Sold and Expired rows live in the cold partition.
+HOT_CONTRACT_STATUSES = ("Available", "Reserved")
+
+
 class Contract(Base):
+    # On PostgreSQL this table is list-partitioned by status with a (id, status)
+    # primary key; the ORM keys on id alone, which the id sequence keeps unique.
+    # SQLite (tests) creates it unpartitioned from this model.
     __tablename__ = "contracts"
+    # Index names match sql/schema.sql; both feed the schema fingerprint.
+    __table_args__ = (
+        Index("idx_contracts_energy_type", "energy_type"),
+        Index("idx_contracts_location_id", "location_id"),
+        Index("idx_contracts_delivery_dates", "delivery_start", "delivery_end"),
+        Index("idx_contracts_total_value", "total_value"),
+        Index("idx_contracts_duration_days", "duration_days"),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    energy_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    energy_type: Mapped[str] = mapped_column(EnergyTypeEnum, nullable=False)
     quantity_mwh: Mapped[Decimal] = mapped_column(Numeric(18, 3), nullable=False)
     price_per_mwh: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False)
     delivery_start: Mapped[date] = mapped_column(Date, nullable=False)
     delivery_end: Mapped[date] = mapped_column(Date, nullable=False)
-    location: Mapped[str] = mapped_column(String(80), nullable=False)
-    status: Mapped[str] = mapped_column(String(20), nullable=False, default="Available")
+    location_id: Mapped[int] = mapped_column(
+        ForeignKey("locations.id"), nullable=False
+    )
+    status: Mapped[str] = mapped_column(ContractStatusEnum, nullable=False, default="Available")
+    # Stored generated columns: computed by the database on every write, so sorting,
+    # filtering, and aggregates read them instead of recomputing per row.
+    total_value: Mapped[Decimal] = mapped_column(
+        Numeric(36, 9), Computed("quantity_mwh * price_per_mwh", persisted=True)
+    )
+    duration_days: Mapped[int] = mapped_column(
+        Integer,
+        Computed(
+            delivery_days(column("delivery_start"), column("delivery_end")), persisted=True
+        ),
+    )
+
+    # Many-to-one on a tiny table, so it is always joined in rather than lazy loaded.
+    location_ref: Mapped["Location"] = relationship(lazy="joined", innerjoin=True)
+
+    @hybrid_property
+    def location(self) -> str:
+        return self.location_ref.name
+
+    @location.inplace.expression
+    @classmethod
+    def _location_expression(cls):
+        return select(Location.name).where(Location.id == cls.location_id).scalar_subquery()
+
+
+class ContractPriceHistory(Base):
+    """Append-only log of contract prices and statuses, written with each change.
+
+    There is no foreign key to ``contracts`` so history outlives deleted contracts;
+    rows are only ever inserted, in ``recorded_at`` order, which keeps the BRIN
+    index on PostgreSQL a few pages even over years of history.
+    """
+
+    __tablename__ = "contract_price_history"
+    __table_args__ = (
+        Index("idx_contract_price_history_recorded_at", "recorded_at", postgresql_using="brin"),
+        Index("idx_contract_price_history_contract", "contract_id", "recorded_at"),
+    )
+
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True
+    )
+    contract_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    recorded_at: Mapped[datetime] = mapped_column(TimestampTZ, nullable=False)
+    reason: Mapped[str] = mapped_column(String(16), nullable=False)
+    energy_type: Mapped[str] = mapped_column(EnergyTypeEnum, nullable=False)
+    location_id: Mapped[int] = mapped_column(ForeignKey("locations.id"), nullable=False)
+    price_per_mwh: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False)
+    status: Mapped[str] = mapped_column(ContractStatusEnum, nullable=False)
+    # False for status-only changes, which do not feed the price rollups.
+    price_changed: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+    location_ref: Mapped["Location"] = relationship(lazy="joined", innerjoin=True)
+
+    @property
+    def location(self) -> str:
+        return self.location_ref.name
+
+
+class ContractPriceRollup(Base):
+    """OHLC of recorded prices per bucket width, bucket, energy type, and location.
+
+    Upserted in the same transaction as the history rows it summarizes, so reads
+    never touch ``contract_price_history``.
+    """
+
+    __tablename__ = "contract_price_rollups"
+    __table_args__ = (
+        Index("idx_contract_price_rollups_bucket_start", "bucket", "bucket_start"),
+    )
+
+    bucket: Mapped[str] = mapped_column(String(8), primary_key=True)
+    energy_type: Mapped[str] = mapped_column(EnergyTypeEnum, primary_key=True)
+    location_id: Mapped[int] = mapped_column(ForeignKey("locations.id"), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(TimestampTZ, primary_key=True)
+    open_price: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False)
+    open_at: Mapped[datetime] = mapped_column(TimestampTZ, nullable=False)
+    high_price: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False)
+    low_price: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False)
+    close_price: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False)
+    close_at: Mapped[datetime] = mapped_column(TimestampTZ, nullable=False)
+    observations: Mapped[int] = mapped_column(Integer, nullable=False)
+    price_sum: Mapped[Decimal] = mapped_column(Numeric(24, 6), nullable=False)
+
+    location_ref: Mapped["Location"] = relationship(lazy="joined", innerjoin=True)
+
+    @property
+    def location(self) -> str:
+        return self.location_ref.name
 
 
 class User(Base):
     __tablename__ = "users"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str | None] = mapped_column(String(80), nullable=True)
 
     portfolio: Mapped["Portfolio | None"] = relationship(
@@ -39,16 +219,17 @@ class User(Base):
 
 class Portfolio(Base):
     __tablename__ = "portfolios"
+    __table_args__ = (Index("idx_portfolios_user_id", "user_id"),)
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False
     )
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        TimestampTZ, server_default=func.now(), nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        TimestampTZ,
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False,
@@ -65,9 +246,13 @@ class PortfolioHolding(Base):
     __tablename__ = "portfolio_holdings"
     __table_args__ = (
         UniqueConstraint("portfolio_id", "contract_id", name="uq_portfolio_contract"),
+        Index("idx_portfolio_holdings_portfolio_id", "portfolio_id"),
+        Index("idx_portfolio_holdings_contract_id", "contract_id"),
+        # Keyset pagination within a portfolio on (added_at, id), either direction.
+        Index("idx_portfolio_holdings_keyset", "portfolio_id", "added_at", "id"),
     )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     portfolio_id: Mapped[int] = mapped_column(
         ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False
     )
@@ -75,8 +260,96 @@ class PortfolioHolding(Base):
         ForeignKey("contracts.id", ondelete="CASCADE"), nullable=False
     )
     added_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        TimestampTZ, server_default=func.now(), nullable=False
     )
 
     portfolio: Mapped["Portfolio"] = relationship(back_populates="holdings")
     contract: Mapped["Contract"] = relationship()
+
+
+class ContractHolderRollup(Base):
+    """Number of portfolios holding each held contract, for cross-user analytics.
+
+    A materialized view on PostgreSQL (see sql/schema.sql), refreshed concurrently
+    by ``analytics_service``; SQLite creates a table that the refresh rewrites.
+    """
+
+    __tablename__ = "contract_holder_rollups"
+    __table_args__ = (
+        # REFRESH ... CONCURRENTLY needs a unique index on the view.
+        Index("uq_contract_holder_rollups_contract", "contract_id", unique=True),
+        Index("idx_contract_holder_rollups_holders", "holders", "contract_id"),
+    )
+
+    contract_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    energy_type: Mapped[str] = mapped_column(EnergyTypeEnum, nullable=False)
+    location_id: Mapped[int] = mapped_column(ForeignKey("locations.id"), nullable=False)
+    quantity_mwh: Mapped[Decimal] = mapped_column(Numeric(18, 3), nullable=False)
+    price_per_mwh: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False)
+    holders: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    location_ref: Mapped["Location"] = relationship(lazy="joined", innerjoin=True)
+
+    @property
+    def location(self) -> str:
+        return self.location_ref.name
+
+
+class EnergyTypeHoldingRollup(Base):
+    """Holdings and committed capacity and value per energy type, across all portfolios.
+
+    Refreshed with ``ContractHolderRollup``, as a materialized view on PostgreSQL.
+    """
+
+    __tablename__ = "energy_type_holding_rollups"
+    __table_args__ = (
+        Index("uq_energy_type_holding_rollups_energy_type", "energy_type", unique=True),
+    )
+
+    energy_type: Mapped[str] = mapped_column(EnergyTypeEnum, primary_key=True)
+    holdings: Mapped[int] = mapped_column(Integer, nullable=False)
+    contracts: Mapped[int] = mapped_column(Integer, nullable=False)
+    portfolios: Mapped[int] = mapped_column(Integer, nullable=False)
+    committed_capacity_mwh: Mapped[Decimal] = mapped_column(Numeric(24, 3), nullable=False)
+    committed_value: Mapped[Decimal] = mapped_column(Numeric(28, 6), nullable=False)
+
+
+class Job(Base):
+    """A background job run by the in-process queue in ``app/services/jobs.py``."""
+
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(40), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued", index=True)
+    params: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    progress: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    progress_message: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    # Requests cancellation of a running job from any worker process.
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    result: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # File results (exports) are written under JOBS_RESULT_DIR.
+    result_path: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        TimestampTZ, server_default=func.now(), nullable=False
+    )
+    started_at: Mapped[datetime | None] = mapped_column(TimestampTZ, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(TimestampTZ, nullable=True)
+    # Worker running the job; it renews the lease while alive, and a lapsed lease lets
+    # another worker queue the job again.
+    lease_owner: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(TimestampTZ, nullable=True)
+
+
+class SchemaVersion(Base):
+    """Single row written by ``python -m app.migrate_cli``; checked once at startup."""
+
+    __tablename__ = "schema_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, default=1)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    migrated_at: Mapped[datetime] = mapped_column(
+        TimestampTZ, server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,44 @@
+"""Storage behind ``contracts_service`` and ``portfolios_service``.
+
+``REPOSITORY_BACKEND=sql`` (the default, PostgreSQL in production) runs every
+query through the request's session; ``memory`` serves contracts and holdings
+from one process-wide ``InMemoryStore`` for tests and benchmarks. The app refuses
+to start with ``memory``: price history, exports, analytics, and jobs only read
+the database.
+"""
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.base import ContractRepository, PortfolioRepository
+from app.repositories.memory import InMemoryStore
+from app.repositories.sql import SqlContractRepository, SqlPortfolioRepository
+
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "sql")
+
+memory_store = InMemoryStore()
+
+
+def contract_repository(session: AsyncSession) -> ContractRepository:
+    if REPOSITORY_BACKEND == "memory":
+        return memory_store.contracts
+    return SqlContractRepository(session)
+
+
+def portfolio_repository(session: AsyncSession) -> PortfolioRepository:
+    if REPOSITORY_BACKEND == "memory":
+        return memory_store.portfolios
+    return SqlPortfolioRepository(session)
+
+
+__all__ = [
+    "REPOSITORY_BACKEND",
+    "ContractRepository",
+    "InMemoryStore",
+    "PortfolioRepository",
+    "SqlContractRepository",
+    "SqlPortfolioRepository",
+    "contract_repository",
+    "memory_store",
+    "portfolio_repository",
+]
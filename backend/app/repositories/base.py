@@ -0,0 +1,147 @@
+from collections.abc import AsyncIterator, Sequence
+from datetime import date
+from typing import Protocol
+
+from sqlalchemy import Row
+
+from app.models import Contract, PortfolioHolding
+from app.schemas import ContractFilters
+
+
+class ContractRepository(Protocol):
+    """Contract storage used by ``contracts_service``.
+
+    Filter and sort semantics are those of ``ContractFilters``: results are
+    ordered by ``sort_by`` (id when unset) with ``id`` ascending as tie-breaker.
+    Write methods own their transaction and return the stored contract.
+    """
+
+    async def list(
+        self, *, filters: ContractFilters, offset: int, limit: int
+    ) -> Sequence[Contract]: ...
+
+    async def get_many(self, contract_ids: Sequence[int]) -> Sequence[Contract]: ...
+
+    async def list_measures(self, *, filters: ContractFilters, limit: int) -> Sequence[Row]:
+        """(id, price_per_mwh, quantity_mwh, total_value, duration_days) rows."""
+        ...
+
+    def scan(self, *, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+        """Every contract in batches, for index rebuilds.
+
+        Rows carry the ``Contract`` column attributes plus ``location`` (the name).
+        """
+        ...
+
+    async def get_for_update(self, contract_id: int) -> Contract | None: ...
+
+    async def add(self, fields: dict) -> Contract:
+        """Insert a contract from API fields (``location`` is a name)."""
+        ...
+
+    async def update(self, contract: Contract, fields: dict) -> Contract: ...
+
+    async def bulk_update(
+        self,
+        fields: dict,
+        *,
+        contract_ids: Sequence[int] | None = None,
+        filters: ContractFilters | None = None,
+    ) -> Sequence[Contract]:
+        """Apply ``fields`` to ``contract_ids`` or, when None, to the ``filters`` selection."""
+        ...
+
+    async def expire(self, *, today: date, batch_size: int) -> Sequence[Contract]:
+        """Mark up to ``batch_size`` hot contracts past ``delivery_end`` as expired."""
+        ...
+
+    async def delete(self, contract: Contract) -> None:
+        """Delete the contract and, like the database cascade, its holdings."""
+        ...
+
+
+class PortfolioRepository(Protocol):
+    """Portfolio holdings storage used by ``portfolios_service``."""
+
+    async def add_holding(self, *, user_id: int, contract_id: int) -> PortfolioHolding | None:
+        """Idempotently add a holding, creating the user and portfolio on first use.
+
+        Returns a detached holding with its contract loaded, or None when the
+        contract does not exist.
+        """
+        ...
+
+    async def add_holdings(
+        self, *, user_id: int, contract_ids: Sequence[int], available_only: bool = False
+    ) -> list[int]:
+        """Add several holdings in one transaction; returns the newly added contract ids.
+
+        Missing contracts (and, with ``available_only``, non-Available ones) are skipped.
+        """
+        ...
+
+    async def remove_holding(self, *, user_id: int, contract_id: int) -> bool: ...
+
+    async def count_holdings(self, *, user_id: int) -> int: ...
+
+    async def list_holdings(
+        self, *, user_id: int, offset: int = 0, limit: int | None = None
+    ) -> Sequence[PortfolioHolding]:
+        """Holdings with contracts loaded, newest first."""
+        ...
+
+    async def list_holdings_after(
+        self,
+        *,
+        user_id: int,
+        filters: ContractFilters,
+        limit: int,
+        after: tuple[object, int] | None = None,
+    ) -> Sequence[PortfolioHolding]:
+        """Holdings whose contract matches ``filters``, keyset-ordered.
+
+        The order is (contract ``sort_by`` value, or ``added_at`` when unset; holding
+        id), ascending unless ``sort_direction`` is desc, where the default for
+        ``added_at`` is newest first. ``after`` is the last row's (sort value, id).
+        """
+        ...
+
+    def stream_holdings(
+        self, *, user_id: int, filters: ContractFilters, batch_size: int
+    ) -> AsyncIterator[Sequence[Row]]:
+        """(holding id, added_at, Contract) batches in ``list_holdings_after`` order."""
+        ...
+
+    async def list_holding_measures(
+        self, *, user_id: int, filters: ContractFilters
+    ) -> Sequence[Row]:
+        """(delivery_start, delivery_end, quantity_mwh, total_value) of matching holdings."""
+        ...
+
+    async def list_candidates(
+        self,
+        *,
+        user_id: int,
+        filters: ContractFilters,
+        limit: int | None = None,
+        locations: Sequence[str] | None = None,
+    ) -> Sequence[Row]:
+        """Contracts matching ``filters`` that ``user_id`` does not hold, in filter order.
+
+        Rows are (id, energy_type, quantity_mwh, price_per_mwh, delivery_start,
+        delivery_end, total_value); ``locations`` further restricts to exact location names.
+        """
+        ...
+
+    def stream_candidates(
+        self, *, user_id: int, filters: ContractFilters, batch_size: int
+    ) -> AsyncIterator[Sequence[Row]]:
+        """``list_candidates`` in batches and in no particular order.
+
+        Rows are (id, energy_type, quantity_mwh, price_per_mwh, total_value).
+        """
+        ...
+
+    async def metrics(self, *, user_id: int) -> dict:
+        """Totals and per-energy-type breakdown in the ``PortfolioMetrics`` shape."""
+        ...
@@ -0,0 +1,56 @@
+"""Keyset order and page cursors for holdings, shared by every repository backend."""
+import base64
+import binascii
+from datetime import date, datetime
+from decimal import Decimal
+import json
+
+from app.models import PortfolioHolding
+from app.schemas import ContractFilters, ContractSortBy, ContractSortDirection
+
+# Python type of each holdings sort value, for decoding cursors without the columns.
+HOLDINGS_SORT_TYPES: dict[str, type] = {
+    "added_at": datetime,
+    ContractSortBy.price_per_mwh.value: Decimal,
+    ContractSortBy.quantity_mwh.value: Decimal,
+    ContractSortBy.delivery_start.value: date,
+    ContractSortBy.total_value.value: Decimal,
+    ContractSortBy.duration_days.value: int,
+}
+
+
+def holdings_sort(filters: ContractFilters) -> tuple[str, ContractSortDirection]:
+    """The sort attribute (``added_at`` or a contract field) and its direction."""
+    # Holdings default to newest first; contract attribute sorts default to ascending.
+    if filters.sort_by is None:
+        return "added_at", filters.sort_direction or ContractSortDirection.desc
+    return filters.sort_by.value, filters.sort_direction or ContractSortDirection.asc
+
+
+def holding_sort_value(holding: PortfolioHolding, filters: ContractFilters) -> object:
+    if filters.sort_by is None:
+        return holding.added_at
+    return getattr(holding.contract, filters.sort_by.value)
+
+
+def encode_holdings_cursor(sort_value: object, holding_id: int) -> str:
+    serialized = sort_value.isoformat() if hasattr(sort_value, "isoformat") else str(sort_value)
+    raw = json.dumps([serialized, holding_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_holdings_cursor(cursor: str, filters: ContractFilters) -> tuple[object, int]:
+    """The (sort value, holding id) a cursor carries; ``ValueError`` when malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        serialized, holding_id = json.loads(raw)
+        python_type = HOLDINGS_SORT_TYPES[holdings_sort(filters)[0]]
+        if python_type is datetime:
+            sort_value = datetime.fromisoformat(serialized)
+        elif python_type is date:
+            sort_value = date.fromisoformat(serialized)
+        else:
+            sort_value = python_type(serialized)
+        return sort_value, int(holding_id)
+    except (ValueError, TypeError, ArithmeticError, binascii.Error) as exc:
+        raise ValueError("Invalid cursor") from exc
@@ -0,0 +1,549 @@
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import AsyncIterator, Iterator, Sequence
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from enum import Enum
+import itertools
+
+from sqlalchemy import Row
+
+from app.models import HOT_CONTRACT_STATUSES, Contract, Location, PortfolioHolding
+from app.repositories.keyset import holding_sort_value, holdings_sort
+from app.schemas import ContractFilters, ContractSortBy, ContractSortDirection, ContractStatus
+
+# Match the Numeric(18, 6) / Numeric(18, 3) columns so values compare and render as stored.
+PRICE_QUANTUM = Decimal("0.000001")
+QUANTITY_QUANTUM = Decimal("0.001")
+
+SORTED_FIELDS = (
+    ContractSortBy.price_per_mwh,
+    ContractSortBy.quantity_mwh,
+    ContractSortBy.delivery_start,
+    ContractSortBy.total_value,
+    ContractSortBy.duration_days,
+)
+
+
+class _SortedIndex:
+    """``(value, id)`` pairs kept sorted with bisect, for ordered scans and range bounds."""
+
+    def __init__(self) -> None:
+        self._keys: list[tuple] = []
+
+    def add(self, value, contract_id: int) -> None:
+        insort(self._keys, (value, contract_id))
+
+    def remove(self, value, contract_id: int) -> None:
+        position = bisect_left(self._keys, (value, contract_id))
+        if position < len(self._keys) and self._keys[position] == (value, contract_id):
+            del self._keys[position]
+
+    def scan(self, *, low=None, high=None, descending: bool = False) -> Iterator[int]:
+        """Contract ids with ``low <= value <= high``, ties always in ascending id order."""
+        start = 0 if low is None else bisect_left(self._keys, (low,))
+        # (high, inf) sorts after every (high, id) pair.
+        stop = len(self._keys) if high is None else bisect_right(self._keys, (high, float("inf")))
+        if not descending:
+            for position in range(start, stop):
+                yield self._keys[position][1]
+            return
+        end = stop
+        while end > start:
+            value = self._keys[end - 1][0]
+            run_start = bisect_left(self._keys, (value,), start, end)
+            for position in range(run_start, end):
+                yield self._keys[position][1]
+            end = run_start
+
+
+class _PortfolioTotals:
+    """Running count, capacity and cost of a portfolio, overall and per energy type."""
+
+    def __init__(self) -> None:
+        self.by_energy_type: dict[str, list] = {}
+
+    def apply(self, contract: Contract, sign: int) -> None:
+        totals = self.by_energy_type.setdefault(contract.energy_type, [0, Decimal(0), Decimal(0)])
+        totals[0] += sign
+        totals[1] += sign * contract.quantity_mwh
+        totals[2] += sign * contract.total_value
+        if not totals[0]:
+            del self.by_energy_type[contract.energy_type]
+
+    def as_metrics(self) -> dict:
+        total_contracts = sum(totals[0] for totals in self.by_energy_type.values())
+        total_capacity = sum((totals[1] for totals in self.by_energy_type.values()), Decimal(0))
+        total_cost = sum((totals[2] for totals in self.by_energy_type.values()), Decimal(0))
+        return {
+            "total_contracts": total_contracts,
+            "total_capacity_mwh": total_capacity,
+            "total_cost": total_cost,
+            "weighted_avg_price_per_mwh": (
+                total_cost / total_capacity if total_capacity > 0 else Decimal("0")
+            ),
+            "breakdown_by_energy_type": [
+                {
+                    "energy_type": energy_type,
+                    "total_contracts": count,
+                    "total_capacity_mwh": capacity,
+                    "total_cost": cost,
+                    "weighted_avg_price_per_mwh": (
+                        cost / capacity if capacity > 0 else Decimal("0")
+                    ),
+                }
+                for energy_type, (count, capacity, cost) in sorted(self.by_energy_type.items())
+            ],
+        }
+
+
+def _normalize_fields(fields: dict) -> dict:
+    normalized = {
+        name: value.value if isinstance(value, Enum) else value for name, value in fields.items()
+    }
+    if normalized.get("price_per_mwh") is not None:
+        normalized["price_per_mwh"] = Decimal(normalized["price_per_mwh"]).quantize(PRICE_QUANTUM)
+    if normalized.get("quantity_mwh") is not None:
+        normalized["quantity_mwh"] = Decimal(normalized["quantity_mwh"]).quantize(
+            QUANTITY_QUANTUM
+        )
+    return normalized
+
+
+def _contains(value: str, term: str) -> bool:
+    return term.lower() in value.lower()
+
+
+def contract_matches(contract: Contract, filters: ContractFilters) -> bool:
+    """Python twin of ``build_contract_conditions``."""
+    if filters.energy_types and contract.energy_type not in {
+        energy_type.value for energy_type in filters.energy_types
+    }:
+        return False
+    if filters.status and contract.status != filters.status.value:
+        return False
+    if filters.active_only and contract.status not in HOT_CONTRACT_STATUSES:
+        return False
+    if filters.price_min is not None and contract.price_per_mwh < filters.price_min:
+        return False
+    if filters.price_max is not None and contract.price_per_mwh > filters.price_max:
+        return False
+    if filters.quantity_min is not None and contract.quantity_mwh < filters.quantity_min:
+        return False
+    if filters.quantity_max is not None and contract.quantity_mwh > filters.quantity_max:
+        return False
+    if filters.total_value_min is not None and contract.total_value < filters.total_value_min:
+        return False
+    if filters.total_value_max is not None and contract.total_value > filters.total_value_max:
+        return False
+    if filters.duration_days_min is not None and contract.duration_days < filters.duration_days_min:
+        return False
+    if filters.duration_days_max is not None and contract.duration_days > filters.duration_days_max:
+        return False
+    if filters.location and not _contains(contract.location, filters.location.strip()):
+        return False
+    if (
+        filters.delivery_start_from is not None
+        and contract.delivery_end < filters.delivery_start_from
+    ):
+        return False
+    if filters.delivery_end_to is not None and contract.delivery_start > filters.delivery_end_to:
+        return False
+    if filters.search:
+        term = filters.search.strip()
+        if not (
+            _contains(contract.location, term)
+            or _contains(contract.energy_type, term)
+            or _contains(contract.status, term)
+        ):
+            return False
+    return True
+
+
+def _holdings_order(filters: ContractFilters):
+    """The ``holdings_sort`` order as a (sort value, holding id) key and a descending flag."""
+    return (
+        lambda holding: (holding_sort_value(holding, filters), holding.id),
+        holdings_sort(filters)[1] == ContractSortDirection.desc,
+    )
+
+
+class InMemoryStore:
+    """Contracts and portfolio holdings held in process memory.
+
+    Lookups go through hash indexes on contract id and ``(portfolio_id,
+    contract_id)``; listings scan a sorted index for the requested ``sort_by``,
+    narrowed by that field's range filter; portfolio metrics are running totals
+    adjusted on every holding change and contract write. Everything happens
+    between awaits, so each operation is atomic on the event loop.
+    """
+
+    def __init__(self) -> None:
+        self.contracts = InMemoryContractRepository(self)
+        self.portfolios = InMemoryPortfolioRepository(self)
+        self.reset()
+
+    def reset(self) -> None:
+        self._contracts: dict[int, Contract] = {}
+        self._locations: dict[str, Location] = {}
+        self._sorted: dict[ContractSortBy, _SortedIndex] = {
+            sort_by: _SortedIndex() for sort_by in SORTED_FIELDS
+        }
+        self._portfolio_ids: dict[int, int] = {}
+        self._holdings: dict[tuple[int, int], PortfolioHolding] = {}
+        # Per portfolio, contract id -> holding in insertion (and so added_at, id) order.
+        self._portfolio_holdings: dict[int, dict[int, PortfolioHolding]] = {}
+        self._contract_portfolios: dict[int, set[int]] = {}
+        self._totals: dict[int, _PortfolioTotals] = {}
+        self._contract_sequence = itertools.count(1)
+        self._location_sequence = itertools.count(1)
+        self._portfolio_sequence = itertools.count(1)
+        self._holding_sequence = itertools.count(1)
+
+    def _location(self, name: str) -> Location:
+        name = name.strip()
+        location = self._locations.get(name)
+        if location is None:
+            location = self._locations[name] = Location(
+                id=next(self._location_sequence), name=name
+            )
+        return location
+
+    def _apply_fields(self, contract: Contract, fields: dict) -> None:
+        fields = _normalize_fields(fields)
+        if "location" in fields:
+            location = self._location(fields.pop("location"))
+            contract.location_ref = location
+            contract.location_id = location.id
+        for field_name, field_value in fields.items():
+            setattr(contract, field_name, field_value)
+        # What the database's generated columns would hold.
+        contract.total_value = contract.quantity_mwh * contract.price_per_mwh
+        contract.duration_days = (contract.delivery_end - contract.delivery_start).days + 1
+
+    def _index(self, contract: Contract) -> None:
+        for sort_by, index in self._sorted.items():
+            index.add(getattr(contract, sort_by.value), contract.id)
+
+    def _unindex(self, contract: Contract) -> None:
+        for sort_by, index in self._sorted.items():
+            index.remove(getattr(contract, sort_by.value), contract.id)
+
+    def _adjust_totals(self, contract: Contract, sign: int) -> None:
+        for portfolio_id in self._contract_portfolios.get(contract.id, ()):
+            self._totals[portfolio_id].apply(contract, sign)
+
+    def _candidate_ids(self, filters: ContractFilters) -> Iterator[int]:
+        descending = filters.sort_direction == ContractSortDirection.desc
+        if filters.sort_by == ContractSortBy.price_per_mwh:
+            return self._sorted[filters.sort_by].scan(
+                low=filters.price_min, high=filters.price_max, descending=descending
+            )
+        if filters.sort_by == ContractSortBy.quantity_mwh:
+            return self._sorted[filters.sort_by].scan(
+                low=filters.quantity_min, high=filters.quantity_max, descending=descending
+            )
+        if filters.sort_by == ContractSortBy.delivery_start:
+            return self._sorted[filters.sort_by].scan(
+                high=filters.delivery_end_to, descending=descending
+            )
+        if filters.sort_by == ContractSortBy.total_value:
+            return self._sorted[filters.sort_by].scan(
+                low=filters.total_value_min, high=filters.total_value_max, descending=descending
+            )
+        if filters.sort_by == ContractSortBy.duration_days:
+            return self._sorted[filters.sort_by].scan(
+                low=filters.duration_days_min,
+                high=filters.duration_days_max,
+                descending=descending,
+            )
+        # Ids are assigned in increasing order, so the hash index iterates in id order.
+        return reversed(self._contracts) if descending else iter(self._contracts)
+
+    def select(self, filters: ContractFilters) -> Iterator[Contract]:
+        for contract_id in self._candidate_ids(filters):
+            contract = self._contracts[contract_id]
+            if contract_matches(contract, filters):
+                yield contract
+
+    def _update(self, contract: Contract, fields: dict) -> None:
+        self._unindex(contract)
+        self._adjust_totals(contract, -1)
+        self._apply_fields(contract, fields)
+        self._index(contract)
+        self._adjust_totals(contract, 1)
+
+    def sorted_holdings(
+        self, user_id: int, filters: ContractFilters
+    ) -> tuple[list[tuple], list[PortfolioHolding]]:
+        """A portfolio's matching holdings and their keys, in ``list_holdings_after`` order."""
+        holding_key, descending = _holdings_order(filters)
+        portfolio_id = self._portfolio_ids.get(user_id)
+        keyed = sorted(
+            (
+                (holding_key(holding), holding)
+                for holding in self._portfolio_holdings.get(portfolio_id, {}).values()
+                if contract_matches(holding.contract, filters)
+            ),
+            key=lambda item: item[0],
+            reverse=descending,
+        )
+        return [key for key, _ in keyed], [holding for _, holding in keyed]
+
+
+class InMemoryContractRepository:
+    """``ContractRepository`` over an ``InMemoryStore``.
+
+    Writes do not record price history, which is kept in the database only.
+    """
+
+    def __init__(self, store: InMemoryStore) -> None:
+        self.store = store
+
+    async def list(
+        self, *, filters: ContractFilters, offset: int, limit: int
+    ) -> Sequence[Contract]:
+        return list(itertools.islice(self.store.select(filters), offset, offset + limit))
+
+    async def get_many(self, contract_ids: Sequence[int]) -> Sequence[Contract]:
+        contracts = self.store._contracts
+        return [contracts[contract_id] for contract_id in contract_ids if contract_id in contracts]
+
+    async def list_measures(self, *, filters: ContractFilters, limit: int) -> Sequence[Row]:
+        return [
+            (
+                contract.id,
+                contract.price_per_mwh,
+                contract.quantity_mwh,
+                contract.total_value,
+                contract.duration_days,
+            )
+            for contract in itertools.islice(self.store.select(filters), limit)
+        ]
+
+    async def scan(self, *, batch_size: int) -> AsyncIterator[Sequence[Contract]]:
+        # Contracts carry the same attributes as the SQL rows, ``location`` included.
+        contracts = list(self.store._contracts.values())
+        for start in range(0, len(contracts), batch_size):
+            yield contracts[start : start + batch_size]
+
+    async def get_for_update(self, contract_id: int) -> Contract | None:
+        return self.store._contracts.get(contract_id)
+
+    async def add(self, fields: dict) -> Contract:
+        store = self.store
+        contract = Contract(id=next(store._contract_sequence), status="Available")
+        store._apply_fields(contract, fields)
+        store._contracts[contract.id] = contract
+        store._index(contract)
+        return contract
+
+    async def update(self, contract: Contract, fields: dict) -> Contract:
+        self.store._update(contract, fields)
+        return contract
+
+    async def bulk_update(
+        self,
+        fields: dict,
+        *,
+        contract_ids: Sequence[int] | None = None,
+        filters: ContractFilters | None = None,
+    ) -> Sequence[Contract]:
+        store = self.store
+        if contract_ids is not None:
+            contracts = await self.get_many(list(dict.fromkeys(contract_ids)))
+        else:
+            contracts = list(store.select(filters))
+        for contract in contracts:
+            store._update(contract, fields)
+        return contracts
+
+    async def expire(self, *, today: date, batch_size: int) -> Sequence[Contract]:
+        store = self.store
+        expired = list(
+            itertools.islice(
+                (
+                    contract
+                    for contract in store._contracts.values()
+                    if contract.delivery_end < today and contract.status in HOT_CONTRACT_STATUSES
+                ),
+                batch_size,
+            )
+        )
+        for contract in expired:
+            store._update(contract, {"status": ContractStatus.expired})
+        return expired
+
+    async def delete(self, contract: Contract) -> None:
+        store = self.store
+        if store._contracts.pop(contract.id, None) is None:
+            return
+        store._unindex(contract)
+        store._adjust_totals(contract, -1)
+        for portfolio_id in store._contract_portfolios.pop(contract.id, ()):
+            del store._holdings[(portfolio_id, contract.id)]
+            del store._portfolio_holdings[portfolio_id][contract.id]
+
+
+class InMemoryPortfolioRepository:
+    """``PortfolioRepository`` over an ``InMemoryStore``."""
+
+    def __init__(self, store: InMemoryStore) -> None:
+        self.store = store
+
+    async def add_holding(self, *, user_id: int, contract_id: int) -> PortfolioHolding | None:
+        store = self.store
+        contract = store._contracts.get(contract_id)
+        if contract is None:
+            return None
+        portfolio_id = store._portfolio_ids.get(user_id)
+        if portfolio_id is None:
+            portfolio_id = store._portfolio_ids[user_id] = next(store._portfolio_sequence)
+            store._portfolio_holdings[portfolio_id] = {}
+            store._totals[portfolio_id] = _PortfolioTotals()
+        holding = store._holdings.get((portfolio_id, contract_id))
+        if holding is not None:
+            return holding
+        holding = PortfolioHolding(
+            id=next(store._holding_sequence),
+            portfolio_id=portfolio_id,
+            contract_id=contract_id,
+            added_at=datetime.now(timezone.utc),
+            contract=contract,
+        )
+        store._holdings[(portfolio_id, contract_id)] = holding
+        store._portfolio_holdings[portfolio_id][contract_id] = holding
+        store._contract_portfolios.setdefault(contract_id, set()).add(portfolio_id)
+        store._totals[portfolio_id].apply(contract, 1)
+        return holding
+
+    async def add_holdings(
+        self, *, user_id: int, contract_ids: Sequence[int], available_only: bool = False
+    ) -> list[int]:
+        store = self.store
+        portfolio_id = store._portfolio_ids.get(user_id)
+        held = store._portfolio_holdings.get(portfolio_id, {})
+        new_ids = []
+        for contract_id in dict.fromkeys(contract_ids):
+            contract = store._contracts.get(contract_id)
+            if contract_id in held or contract is None:
+                continue
+            if available_only and contract.status != ContractStatus.available.value:
+                continue
+            await self.add_holding(user_id=user_id, contract_id=contract_id)
+            new_ids.append(contract_id)
+            held = store._portfolio_holdings[store._portfolio_ids[user_id]]
+        return new_ids
+
+    async def remove_holding(self, *, user_id: int, contract_id: int) -> bool:
+        store = self.store
+        portfolio_id = store._portfolio_ids.get(user_id)
+        holding = store._holdings.pop((portfolio_id, contract_id), None)
+        if holding is None:
+            return False
+        del store._portfolio_holdings[portfolio_id][contract_id]
+        store._contract_portfolios[contract_id].discard(portfolio_id)
+        store._totals[portfolio_id].apply(holding.contract, -1)
+        return True
+
+    async def count_holdings(self, *, user_id: int) -> int:
+        portfolio_id = self.store._portfolio_ids.get(user_id)
+        return len(self.store._portfolio_holdings.get(portfolio_id, {}))
+
+    async def list_holdings(
+        self, *, user_id: int, offset: int = 0, limit: int | None = None
+    ) -> Sequence[PortfolioHolding]:
+        portfolio_id = self.store._portfolio_ids.get(user_id)
+        holdings = self.store._portfolio_holdings.get(portfolio_id, {})
+        stop = None if limit is None else offset + limit
+        return list(itertools.islice(reversed(holdings.values()), offset, stop))
+
+    async def list_holdings_after(
+        self,
+        *,
+        user_id: int,
+        filters: ContractFilters,
+        limit: int,
+        after: tuple[object, int] | None = None,
+    ) -> Sequence[PortfolioHolding]:
+        keys, holdings = self.store.sorted_holdings(user_id, filters)
+        if after is not None:
+            # Keys are in scan order, so the page starts at one bisect.
+            if _holdings_order(filters)[1]:
+                start = len(keys) - bisect_left(keys[::-1], after)
+            else:
+                start = bisect_right(keys, after)
+            holdings = holdings[start:]
+        return holdings[:limit]
+
+    async def stream_holdings(
+        self, *, user_id: int, filters: ContractFilters, batch_size: int
+    ) -> AsyncIterator[Sequence[tuple]]:
+        _, holdings = self.store.sorted_holdings(user_id, filters)
+        for start in range(0, len(holdings), batch_size):
+            yield [
+                (holding.id, holding.added_at, holding.contract)
+                for holding in holdings[start : start + batch_size]
+            ]
+
+    async def list_holding_measures(
+        self, *, user_id: int, filters: ContractFilters
+    ) -> Sequence[tuple]:
+        return [
+            (
+                holding.contract.delivery_start,
+                holding.contract.delivery_end,
+                holding.contract.quantity_mwh,
+                holding.contract.total_value,
+            )
+            for holding in self.store.sorted_holdings(user_id, filters)[1]
+        ]
+
+    async def list_candidates(
+        self,
+        *,
+        user_id: int,
+        filters: ContractFilters,
+        limit: int | None = None,
+        locations: Sequence[str] | None = None,
+    ) -> Sequence[tuple]:
+        store = self.store
+        held = store._portfolio_holdings.get(store._portfolio_ids.get(user_id), {})
+        location_names = set(locations or ())
+        candidates = (
+            (
+                contract.id,
+                contract.energy_type,
+                contract.quantity_mwh,
+                contract.price_per_mwh,
+                contract.delivery_start,
+                contract.delivery_end,
+                contract.total_value,
+            )
+            for contract in store.select(filters)
+            if contract.id not in held
+            and (not location_names or contract.location in location_names)
+        )
+        return list(itertools.islice(candidates, limit))
+
+    async def stream_candidates(
+        self, *, user_id: int, filters: ContractFilters, batch_size: int
+    ) -> AsyncIterator[Sequence[tuple]]:
+        store = self.store
+        held = store._portfolio_holdings.get(store._portfolio_ids.get(user_id), {})
+        candidates = (
+            (
+                contract.id,
+                contract.energy_type,
+                contract.quantity_mwh,
+                contract.price_per_mwh,
+                contract.total_value,
+            )
+            for contract in store.select(filters)
+            if contract.id not in held
+        )
+        while batch := list(itertools.islice(candidates, batch_size)):
+            yield batch
+
+    async def metrics(self, *, user_id: int) -> dict:
+        portfolio_id = self.store._portfolio_ids.get(user_id)
+        return self.store._totals.get(portfolio_id, _PortfolioTotals()).as_metrics()
@@ -0,0 +1,768 @@
+from collections.abc import AsyncIterator, Sequence
+from datetime import date
+from decimal import Decimal
+import logging
+
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    String,
+    UnaryExpression,
+    asc,
+    delete,
+    desc,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, contains_eager, selectinload
+
+from app.db import dialect_insert
+from app.models import (
+    HOT_CONTRACT_STATUSES,
+    Contract,
+    Location,
+    Portfolio,
+    PortfolioHolding,
+    User,
+)
+from app.repositories.keyset import holdings_sort
+from app.schemas import (
+    ContractFilters,
+    ContractSortBy,
+    ContractSortDirection,
+    ContractStatus,
+    PriceChangeReason,
+)
+from app.services.price_history_service import record_price_history
+
+logger = logging.getLogger(__name__)
+
+
+def location_matches(pattern: str) -> ColumnElement[bool]:
+    """Match contracts by location name through the (small) locations table, comparing ids."""
+    return Contract.location_id.in_(select(Location.id).where(Location.name.ilike(pattern)))
+
+
+def location_in(names: Sequence[str]) -> ColumnElement[bool]:
+    return Contract.location_id.in_(select(Location.id).where(Location.name.in_(names)))
+
+
+async def resolve_location_id(*, session: AsyncSession, name: str) -> int:
+    """Return the id of the ``locations`` row for ``name``, inserting it on first use."""
+    name = name.strip()
+    statement = select(Location.id).where(Location.name == name)
+    location_id = (await session.execute(statement)).scalar_one_or_none()
+    if location_id is not None:
+        return location_id
+    await session.execute(
+        dialect_insert(session)(Location)
+        .values(name=name)
+        .on_conflict_do_nothing(index_elements=[Location.name])
+    )
+    return (await session.execute(statement)).scalar_one()
+
+
+async def encode_contract_fields(*, session: AsyncSession, fields: dict) -> dict:
+    """Swap an API ``location`` string for its dimension-table ``location_id``."""
+    if "location" in fields:
+        fields = dict(fields)
+        fields["location_id"] = await resolve_location_id(
+            session=session, name=fields.pop("location")
+        )
+    return fields
+
+
+def build_contract_conditions(filters: ContractFilters) -> list[ColumnElement[bool]]:
+    filter_conditions: list[ColumnElement[bool]] = []
+
+    if filters.energy_types:
+        filter_conditions.append(
+            Contract.energy_type.in_([energy_type.value for energy_type in filters.energy_types])
+        )
+    # Status predicates let PostgreSQL prune the contracts partitions it scans.
+    if filters.status:
+        filter_conditions.append(Contract.status == filters.status.value)
+    if filters.active_only:
+        filter_conditions.append(Contract.status.in_(HOT_CONTRACT_STATUSES))
+    if filters.price_min is not None:
+        filter_conditions.append(Contract.price_per_mwh >= filters.price_min)
+    if filters.price_max is not None:
+        filter_conditions.append(Contract.price_per_mwh <= filters.price_max)
+    if filters.quantity_min is not None:
+        filter_conditions.append(Contract.quantity_mwh >= filters.quantity_min)
+    if filters.quantity_max is not None:
+        filter_conditions.append(Contract.quantity_mwh <= filters.quantity_max)
+    if filters.total_value_min is not None:
+        filter_conditions.append(Contract.total_value >= filters.total_value_min)
+    if filters.total_value_max is not None:
+        filter_conditions.append(Contract.total_value <= filters.total_value_max)
+    if filters.duration_days_min is not None:
+        filter_conditions.append(Contract.duration_days >= filters.duration_days_min)
+    if filters.duration_days_max is not None:
+        filter_conditions.append(Contract.duration_days <= filters.duration_days_max)
+    if filters.location:
+        filter_conditions.append(location_matches(f"%{filters.location.strip()}%"))
+    if filters.delivery_start_from is not None:
+        filter_conditions.append(Contract.delivery_end >= filters.delivery_start_from)
+    if filters.delivery_end_to is not None:
+        filter_conditions.append(Contract.delivery_start <= filters.delivery_end_to)
+    if filters.search:
+        search_term = f"%{filters.search.strip()}%"
+        filter_conditions.append(
+            or_(
+                location_matches(search_term),
+                Contract.energy_type.cast(String).ilike(search_term),
+                Contract.status.cast(String).ilike(search_term),
+            )
+        )
+    return filter_conditions
+
+
+def build_contract_order(filters: ContractFilters) -> list[UnaryExpression]:
+    sort_column = Contract.id
+    if filters.sort_by == ContractSortBy.price_per_mwh:
+        sort_column = Contract.price_per_mwh
+    elif filters.sort_by == ContractSortBy.quantity_mwh:
+        sort_column = Contract.quantity_mwh
+    elif filters.sort_by == ContractSortBy.delivery_start:
+        sort_column = Contract.delivery_start
+    elif filters.sort_by == ContractSortBy.total_value:
+        sort_column = Contract.total_value
+    elif filters.sort_by == ContractSortBy.duration_days:
+        sort_column = Contract.duration_days
+
+    sort_direction = filters.sort_direction or ContractSortDirection.asc
+    order_clause = asc(sort_column) if sort_direction == ContractSortDirection.asc else desc(sort_column)
+    return [order_clause, asc(Contract.id)]
+
+
+def holdings_sort_column(
+    filters: ContractFilters,
+) -> tuple[InstrumentedAttribute, ContractSortDirection]:
+    attribute, sort_direction = holdings_sort(filters)
+    if filters.sort_by is None:
+        return PortfolioHolding.added_at, sort_direction
+    return getattr(Contract, attribute), sort_direction
+
+
+def held_contract_ids(user_id: int):
+    return select(PortfolioHolding.contract_id).join(Portfolio).where(Portfolio.user_id == user_id)
+
+
+class SqlContractRepository:
+    """``ContractRepository`` on a SQLAlchemy session (PostgreSQL in production)."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def list(
+        self, *, filters: ContractFilters, offset: int, limit: int
+    ) -> Sequence[Contract]:
+        statement = select(Contract)
+        filter_conditions = build_contract_conditions(filters)
+        if filter_conditions:
+            statement = statement.where(*filter_conditions)
+
+        statement = statement.order_by(*build_contract_order(filters)).offset(offset).limit(limit)
+        result = await self.session.execute(statement)
+        return result.scalars().all()
+
+    async def get_many(self, contract_ids: Sequence[int]) -> Sequence[Contract]:
+        statement = select(Contract).where(Contract.id.in_(contract_ids))
+        result = await self.session.execute(statement)
+        return result.scalars().all()
+
+    async def list_measures(self, *, filters: ContractFilters, limit: int) -> Sequence[Row]:
+        statement = select(
+            Contract.id,
+            Contract.price_per_mwh,
+            Contract.quantity_mwh,
+            Contract.total_value,
+            Contract.duration_days,
+        )
+        filter_conditions = build_contract_conditions(filters)
+        if filter_conditions:
+            statement = statement.where(*filter_conditions)
+        statement = statement.order_by(*build_contract_order(filters)).limit(limit)
+        result = await self.session.execute(statement)
+        return result.all()
+
+    async def scan(self, *, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+        # Plain columns from a server-side cursor: no ORM identity map to grow.
+        statement = (
+            select(
+                Contract.id,
+                Contract.energy_type,
+                Contract.quantity_mwh,
+                Contract.price_per_mwh,
+                Contract.delivery_start,
+                Contract.delivery_end,
+                Contract.location_id,
+                Location.name.label("location"),
+                Contract.status,
+            )
+            .join(Location, Contract.location_id == Location.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.session.stream(statement)
+        async for rows in result.partitions():
+            yield rows
+
+    async def get_for_update(self, contract_id: int) -> Contract | None:
+        """Load into the session, row-locked on PostgreSQL."""
+        # Lock only the contract row, not the joined-in location it shares with other contracts.
+        statement = select(Contract).where(Contract.id == contract_id).with_for_update(of=Contract)
+        result = await self.session.execute(statement)
+        return result.scalar_one_or_none()
+
+    async def add(self, fields: dict) -> Contract:
+        session = self.session
+        try:
+            contract = Contract(**await encode_contract_fields(session=session, fields=fields))
+            session.add(contract)
+            await session.flush()
+            await record_price_history(
+                session=session, contracts=[contract], reason=PriceChangeReason.created
+            )
+            await session.commit()
+            await session.refresh(contract)
+        except Exception:
+            await session.rollback()
+            logger.exception("Create contract failed", extra={"fields": fields})
+            raise
+        return contract
+
+    async def update(self, contract: Contract, fields: dict) -> Contract:
+        session = self.session
+        previous = {contract.id: (contract.price_per_mwh, contract.status)}
+        try:
+            update_data = await encode_contract_fields(session=session, fields=fields)
+            for field_name, field_value in update_data.items():
+                setattr(contract, field_name, field_value)
+            await record_price_history(
+                session=session,
+                contracts=[contract],
+                reason=PriceChangeReason.updated,
+                previous=previous,
+            )
+            await session.commit()
+            await session.refresh(contract)
+        except Exception:
+            await session.rollback()
+            logger.exception("Update contract failed", extra={"contract_id": contract.id})
+            raise
+        return contract
+
+    async def bulk_update(
+        self,
+        fields: dict,
+        *,
+        contract_ids: Sequence[int] | None = None,
+        filters: ContractFilters | None = None,
+    ) -> Sequence[Contract]:
+        """One ``UPDATE ... RETURNING``, with price history in the same transaction."""
+        session = self.session
+        if contract_ids is not None:
+            conditions: list[ColumnElement[bool]] = [Contract.id.in_(contract_ids)]
+        else:
+            conditions = build_contract_conditions(filters)
+        try:
+            previous = None
+            if fields.keys() & {"price_per_mwh", "status"}:
+                # UPDATE ... RETURNING only returns new values; lock and read the old ones first.
+                previous_rows = await session.execute(
+                    select(Contract.id, Contract.price_per_mwh, Contract.status)
+                    .where(*conditions)
+                    .with_for_update(of=Contract)
+                )
+                previous = {row.id: (row.price_per_mwh, row.status) for row in previous_rows}
+            statement = (
+                update(Contract)
+                .where(*conditions)
+                .values(**await encode_contract_fields(session=session, fields=fields))
+                .returning(Contract)
+                .options(selectinload(Contract.location_ref))
+                .execution_options(synchronize_session=False, populate_existing=True)
+            )
+            result = await session.execute(statement)
+            contracts = result.scalars().all()
+            if previous is not None:
+                await record_price_history(
+                    session=session,
+                    contracts=contracts,
+                    reason=PriceChangeReason.bulk_update,
+                    previous=previous,
+                )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            logger.exception("Bulk update contracts failed", extra={"update": fields})
+            raise
+        return contracts
+
+    async def expire(self, *, today: date, batch_size: int) -> Sequence[Contract]:
+        """One ``UPDATE ... RETURNING`` over an id subquery.
+
+        On PostgreSQL the subquery locks with ``SKIP LOCKED``, so rows being edited
+        by requests (or another worker's sweep) are left for the next pass instead
+        of blocking.
+        """
+        session = self.session
+        batch_ids = (
+            select(Contract.id)
+            .where(Contract.delivery_end < today, Contract.status.in_(HOT_CONTRACT_STATUSES))
+            .order_by(Contract.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        statement = (
+            update(Contract)
+            .where(Contract.id.in_(batch_ids.scalar_subquery()))
+            .values(status=ContractStatus.expired.value)
+            .returning(Contract)
+            .options(selectinload(Contract.location_ref))
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        try:
+            result = await session.execute(statement)
+            contracts = result.scalars().all()
+            # Prices are unchanged; an unknown previous status still records the change.
+            await record_price_history(
+                session=session,
+                contracts=contracts,
+                reason=PriceChangeReason.expired,
+                previous={contract.id: (contract.price_per_mwh, None) for contract in contracts},
+            )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            logger.exception("Expire contract batch failed")
+            raise
+        return contracts
+
+    async def delete(self, contract: Contract) -> None:
+        session = self.session
+        await session.delete(contract)
+        try:
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            logger.exception("Delete contract failed", extra={"contract_id": contract.id})
+            raise
+
+
+def _build_holding_upsert(session: AsyncSession, *, user_id: int, contract_id: int):
+    """Build the user, portfolio and holding upserts, each gated on the contract existing.
+
+    The portfolio upsert bumps ``updated_at`` on conflict so it always returns the id
+    and row-locks the portfolio, which serializes concurrent adds to one portfolio.
+    """
+    insert_for_dialect = dialect_insert(session)
+    contract_exists = select(Contract.id).where(Contract.id == contract_id).exists()
+    user_upsert = (
+        insert_for_dialect(User)
+        .from_select(["id"], select(literal(user_id)).where(contract_exists))
+        .on_conflict_do_nothing(index_elements=[User.id])
+    )
+    portfolio_upsert = (
+        insert_for_dialect(Portfolio)
+        .from_select(["user_id"], select(literal(user_id)).where(contract_exists))
+        .on_conflict_do_update(
+            index_elements=[Portfolio.user_id], set_={"updated_at": func.now()}
+        )
+        .returning(Portfolio.id)
+    )
+    return insert_for_dialect, user_upsert, portfolio_upsert
+
+
+async def _upsert_holding_postgresql(
+    session: AsyncSession, *, user_id: int, contract_id: int
+) -> Row | None:
+    insert_for_dialect, user_upsert, portfolio_upsert = _build_holding_upsert(
+        session, user_id=user_id, contract_id=contract_id
+    )
+    new_user = user_upsert.cte("new_user")
+    portfolio = portfolio_upsert.cte("portfolio")
+    new_holding = (
+        insert_for_dialect(PortfolioHolding)
+        .from_select(
+            ["portfolio_id", "contract_id"], select(portfolio.c.id, literal(contract_id))
+        )
+        .on_conflict_do_nothing(constraint="uq_portfolio_contract")
+        .returning(PortfolioHolding.id, PortfolioHolding.added_at)
+        .cte("new_holding")
+    )
+    existing_holding = (
+        select(PortfolioHolding.id, PortfolioHolding.added_at)
+        .join(portfolio, PortfolioHolding.portfolio_id == portfolio.c.id)
+        .where(
+            PortfolioHolding.contract_id == contract_id,
+            ~select(new_holding.c.id).exists(),
+        )
+    )
+    holding = union_all(select(new_holding.c.id, new_holding.c.added_at), existing_holding).cte(
+        "holding"
+    )
+    statement = (
+        select(Contract, holding.c.id, holding.c.added_at)
+        .outerjoin(holding, true())
+        .where(Contract.id == contract_id)
+        .add_cte(new_user)
+    )
+    result = await session.execute(statement)
+    return result.first()
+
+
+async def _upsert_holding_sqlite(
+    session: AsyncSession, *, user_id: int, contract_id: int
+) -> Row | None:
+    # SQLite has no data-modifying CTEs, so the same upserts run as separate statements.
+    insert_for_dialect, user_upsert, portfolio_upsert = _build_holding_upsert(
+        session, user_id=user_id, contract_id=contract_id
+    )
+    await session.execute(user_upsert)
+    portfolio_id = (await session.execute(portfolio_upsert)).scalar_one_or_none()
+    if portfolio_id is not None:
+        await session.execute(
+            insert_for_dialect(PortfolioHolding)
+            .values(portfolio_id=portfolio_id, contract_id=contract_id)
+            .on_conflict_do_nothing(index_elements=["portfolio_id", "contract_id"])
+        )
+    statement = (
+        select(Contract, PortfolioHolding.id, PortfolioHolding.added_at)
+        .outerjoin(
+            PortfolioHolding,
+            (PortfolioHolding.contract_id == Contract.id)
+            & (PortfolioHolding.portfolio_id == portfolio_id),
+        )
+        .where(Contract.id == contract_id)
+    )
+    result = await session.execute(statement)
+    return result.first()
+
+
+class SqlPortfolioRepository:
+    """``PortfolioRepository`` on a SQLAlchemy session."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def add_holding(self, *, user_id: int, contract_id: int) -> PortfolioHolding | None:
+        """On PostgreSQL one ``INSERT ... ON CONFLICT ... RETURNING`` CTE plus the commit.
+
+        If a concurrent transaction inserted the same holding after our snapshot was
+        taken, the row is invisible to that statement, so it is re-read once.
+        """
+        session = self.session
+        if session.bind is not None and session.bind.dialect.name == "postgresql":
+            upsert_holding = _upsert_holding_postgresql
+        else:
+            upsert_holding = _upsert_holding_sqlite
+        try:
+            row = await upsert_holding(session, user_id=user_id, contract_id=contract_id)
+            if row is not None and row[1] is None:
+                row = await upsert_holding(session, user_id=user_id, contract_id=contract_id)
+            if row is None:
+                await session.rollback()
+                return None
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            logger.exception(f"Add contract to portfolio failed: {user_id = }, {contract_id = }")
+            raise
+
+        contract, holding_id, added_at = row
+        # Detached snapshot of the upserted row; it is never added to the session.
+        return PortfolioHolding(
+            id=holding_id, contract_id=contract_id, added_at=added_at, contract=contract
+        )
+
+    async def add_holdings(
+        self, *, user_id: int, contract_ids: Sequence[int], available_only: bool = False
+    ) -> list[int]:
+        """Upserts user, portfolio, and holdings, so concurrent adds never conflict.
+
+        Holdings are inserted from a ``SELECT`` over ``contracts``, so contracts deleted
+        (or, with ``available_only``, no longer Available) since the caller read them
+        are skipped rather than failing the transaction.
+        """
+        session = self.session
+        insert_for_dialect = dialect_insert(session)
+        contract_conditions = [Contract.id.in_(contract_ids)]
+        if available_only:
+            contract_conditions.append(Contract.status == ContractStatus.available.value)
+        try:
+            await session.execute(
+                insert_for_dialect(User)
+                .values(id=user_id)
+                .on_conflict_do_nothing(index_elements=[User.id])
+            )
+            # Bumping updated_at row-locks the portfolio, serializing concurrent adds.
+            portfolio_id = (
+                await session.execute(
+                    insert_for_dialect(Portfolio)
+                    .values(user_id=user_id)
+                    .on_conflict_do_update(
+                        index_elements=[Portfolio.user_id], set_={"updated_at": func.now()}
+                    )
+                    .returning(Portfolio.id)
+                )
+            ).scalar_one()
+            result = await session.execute(
+                insert_for_dialect(PortfolioHolding)
+                .from_select(
+                    ["portfolio_id", "contract_id"],
+                    select(literal(portfolio_id), Contract.id).where(*contract_conditions),
+                )
+                .on_conflict_do_nothing(index_elements=["portfolio_id", "contract_id"])
+                .returning(PortfolioHolding.contract_id)
+            )
+            added_ids = set(result.scalars().all())
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            logger.exception(f"Bulk add to portfolio failed: {user_id = }, {len(contract_ids) = }")
+            raise
+        return [
+            contract_id for contract_id in dict.fromkeys(contract_ids) if contract_id in added_ids
+        ]
+
+    async def remove_holding(self, *, user_id: int, contract_id: int) -> bool:
+        session = self.session
+        statement = (
+            delete(PortfolioHolding)
+            .where(
+                PortfolioHolding.contract_id == contract_id,
+                PortfolioHolding.portfolio_id.in_(
+                    select(Portfolio.id).where(Portfolio.user_id == user_id)
+                ),
+            )
+            .returning(PortfolioHolding.id)
+        )
+        try:
+            result = await session.execute(statement)
+            removed_id = result.scalar_one_or_none()
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            logger.exception(
+                f"Remove contract from portfolio failed: {user_id = }, {contract_id = }"
+            )
+            raise
+        return removed_id is not None
+
+    async def count_holdings(self, *, user_id: int) -> int:
+        statement = (
+            select(func.count(PortfolioHolding.id))
+            .join(Portfolio)
+            .where(Portfolio.user_id == user_id)
+        )
+        return (await self.session.execute(statement)).scalar_one()
+
+    async def list_holdings(
+        self, *, user_id: int, offset: int = 0, limit: int | None = None
+    ) -> Sequence[PortfolioHolding]:
+        statement = (
+            select(PortfolioHolding)
+            .join(Portfolio)
+            .where(Portfolio.user_id == user_id)
+            .options(selectinload(PortfolioHolding.contract))
+            .order_by(PortfolioHolding.added_at.desc(), PortfolioHolding.id.desc())
+            .offset(offset)
+            .limit(limit)
+        )
+        result = await self.session.execute(statement)
+        return result.scalars().all()
+
+    async def list_holdings_after(
+        self,
+        *,
+        user_id: int,
+        filters: ContractFilters,
+        limit: int,
+        after: tuple[object, int] | None = None,
+    ) -> Sequence[PortfolioHolding]:
+        """An index range scan from ``after`` rather than an ``OFFSET``."""
+        sort_column, sort_direction = holdings_sort_column(filters)
+        statement = (
+            select(PortfolioHolding)
+            .join(Portfolio)
+            .join(Contract)
+            .where(Portfolio.user_id == user_id, *build_contract_conditions(filters))
+            .options(contains_eager(PortfolioHolding.contract))
+        )
+        if after is not None:
+            sort_value, holding_id = after
+            position = tuple_(sort_column, PortfolioHolding.id)
+            bound = tuple_(literal(sort_value, sort_column.type), literal(holding_id))
+            if sort_direction == ContractSortDirection.desc:
+                statement = statement.where(position < bound)
+            else:
+                statement = statement.where(position > bound)
+        order = desc if sort_direction == ContractSortDirection.desc else asc
+        statement = statement.order_by(order(sort_column), order(PortfolioHolding.id)).limit(limit)
+        result = await self.session.execute(statement)
+        return result.scalars().all()
+
+    async def stream_holdings(
+        self, *, user_id: int, filters: ContractFilters, batch_size: int
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Batches from a server-side cursor."""
+        session = self.session
+        sort_column, sort_direction = holdings_sort_column(filters)
+        order = desc if sort_direction == ContractSortDirection.desc else asc
+        statement = (
+            select(PortfolioHolding.id, PortfolioHolding.added_at, Contract)
+            .join(Portfolio, PortfolioHolding.portfolio_id == Portfolio.id)
+            .join(Contract, PortfolioHolding.contract_id == Contract.id)
+            .where(Portfolio.user_id == user_id, *build_contract_conditions(filters))
+            .order_by(order(sort_column), order(PortfolioHolding.id))
+            .execution_options(yield_per=batch_size)
+        )
+        result = await session.stream(statement)
+        async for batch in result.partitions():
+            yield batch
+            # Drop the streamed contracts so the identity map stays bounded.
+            session.expunge_all()
+
+    async def list_holding_measures(
+        self, *, user_id: int, filters: ContractFilters
+    ) -> Sequence[Row]:
+        statement = (
+            select(
+                Contract.delivery_start,
+                Contract.delivery_end,
+                Contract.quantity_mwh,
+                Contract.total_value,
+            )
+            .select_from(PortfolioHolding)
+            .join(Portfolio)
+            .join(Contract)
+            .where(Portfolio.user_id == user_id, *build_contract_conditions(filters))
+        )
+        result = await self.session.execute(statement)
+        return result.all()
+
+    async def list_candidates(
+        self,
+        *,
+        user_id: int,
+        filters: ContractFilters,
+        limit: int | None = None,
+        locations: Sequence[str] | None = None,
+    ) -> Sequence[Row]:
+        conditions = [
+            Contract.id.not_in(held_contract_ids(user_id)),
+            *build_contract_conditions(filters),
+        ]
+        if locations:
+            conditions.append(location_in(locations))
+        statement = (
+            select(
+                Contract.id,
+                Contract.energy_type,
+                Contract.quantity_mwh,
+                Contract.price_per_mwh,
+                Contract.delivery_start,
+                Contract.delivery_end,
+                Contract.total_value,
+            )
+            .where(*conditions)
+            .order_by(*build_contract_order(filters))
+            .limit(limit)
+        )
+        result = await self.session.execute(statement)
+        return result.all()
+
+    async def stream_candidates(
+        self, *, user_id: int, filters: ContractFilters, batch_size: int
+    ) -> AsyncIterator[Sequence[Row]]:
+        # Plain columns from a server-side cursor, like ``scan``.
+        statement = (
+            select(
+                Contract.id,
+                Contract.energy_type,
+                Contract.quantity_mwh,
+                Contract.price_per_mwh,
+                Contract.total_value,
+            )
+            .where(
+                Contract.id.not_in(held_contract_ids(user_id)),
+                *build_contract_conditions(filters),
+            )
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.session.stream(statement)
+        async for rows in result.partitions():
+            yield rows
+
+    async def metrics(self, *, user_id: int) -> dict:
+        # Read-only: a user without a portfolio simply aggregates to zeros.
+        session = self.session
+        totals_statement = (
+            select(
+                func.count(Contract.id),
+                func.coalesce(func.sum(Contract.quantity_mwh), 0),
+                func.coalesce(func.sum(Contract.total_value), 0),
+            )
+            .select_from(PortfolioHolding)
+            .join(Portfolio)
+            .join(Contract)
+            .where(Portfolio.user_id == user_id)
+        )
+        totals_result = await session.execute(totals_statement)
+        total_contracts, total_capacity, total_cost = totals_result.one()
+
+        total_capacity = Decimal(total_capacity or 0)
+        total_cost = Decimal(total_cost or 0)
+        weighted_avg_price = (
+            total_cost / total_capacity if total_capacity > 0 else Decimal("0")
+        )
+
+        breakdown_statement = (
+            select(
+                Contract.energy_type,
+                func.count(Contract.id),
+                func.coalesce(func.sum(Contract.quantity_mwh), 0),
+                func.coalesce(func.sum(Contract.total_value), 0),
+            )
+            .select_from(PortfolioHolding)
+            .join(Portfolio)
+            .join(Contract)
+            .where(Portfolio.user_id == user_id)
+            .group_by(Contract.energy_type)
+            .order_by(Contract.energy_type)
+        )
+        breakdown_result = await session.execute(breakdown_statement)
+        breakdown_items = []
+        for energy_type, count, capacity, cost in breakdown_result.all():
+            capacity_decimal = Decimal(capacity or 0)
+            cost_decimal = Decimal(cost or 0)
+            breakdown_items.append(
+                {
+                    "energy_type": energy_type,
+                    "total_contracts": int(count),
+                    "total_capacity_mwh": capacity_decimal,
+                    "total_cost": cost_decimal,
+                    "weighted_avg_price_per_mwh": (
+                        cost_decimal / capacity_decimal
+                        if capacity_decimal > 0
+                        else Decimal("0")
+                    ),
+                }
+            )
+
+        return {
+            "total_contracts": int(total_contracts or 0),
+            "total_capacity_mwh": total_capacity,
+            "total_cost": total_cost,
+            "weighted_avg_price_per_mwh": weighted_avg_price,
+            "breakdown_by_energy_type": breakdown_items,
+        }
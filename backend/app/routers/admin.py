@@ -0,0 +1,75 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_read_session, get_session
+from app.schemas import (
+    EnergyTypeCommitmentRead,
+    HeldContractRead,
+    HolderCountBucket,
+    HoldingConcentration,
+    RollupRefreshResult,
+)
+from app.services.analytics_service import (
+    get_holding_concentration,
+    list_contracts_by_holder_count,
+    list_energy_type_commitments,
+    list_most_held_contracts,
+    refresh_holding_rollups,
+)
+
+
+def require_admin_token(
+    request: Request,
+    admin_token: str | None = Header(default=None, alias="X-Admin-Token"),
+) -> None:
+    """Requires ``X-Admin-Token``; the routes are hidden (404) until a token is configured."""
+    expected = getattr(request.app.state, "admin_token", "")
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not secrets.compare_digest(admin_token or "", expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+router = APIRouter(
+    prefix="/admin/analytics", tags=["admin"], dependencies=[Depends(require_admin_token)]
+)
+
+
+@router.get("/capacity-by-energy-type", response_model=list[EnergyTypeCommitmentRead])
+async def get_capacity_by_energy_type(
+    session: AsyncSession = Depends(get_read_session),
+) -> list[EnergyTypeCommitmentRead]:
+    """Capacity and value committed across all portfolios, largest first."""
+    return await list_energy_type_commitments(session=session)
+
+
+@router.get("/most-held-contracts", response_model=list[HeldContractRead])
+async def get_most_held_contracts(
+    limit: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[HeldContractRead]:
+    return await list_most_held_contracts(session=session, limit=limit)
+
+
+@router.get("/concentration", response_model=HoldingConcentration)
+async def get_concentration(
+    top: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_session),
+) -> HoldingConcentration:
+    return await get_holding_concentration(session=session, top=top)
+
+
+@router.get("/contracts-by-holders", response_model=list[HolderCountBucket])
+async def get_contracts_by_holders(
+    session: AsyncSession = Depends(get_read_session),
+) -> list[HolderCountBucket]:
+    """How many contracts have each number of holders."""
+    return await list_contracts_by_holder_count(session=session)
+
+
+@router.post("/refresh", response_model=RollupRefreshResult)
+async def refresh_rollups(session: AsyncSession = Depends(get_session)) -> RollupRefreshResult:
+    """Refresh the rollups now instead of waiting for the scheduled refresh."""
+    return await refresh_holding_rollups(session=session)
@@ -1,37 +1,57 @@
+from collections.abc import Sequence
 from datetime import date
 from decimal import Decimal
 
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import conint
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_session
+from app.db import get_read_session, get_session
 from app.schemas import (
+    ComparisonDistribution,
+    ComparisonMetricRanks,
+    ComparisonMetricScores,
     ComparisonRangeDecimal,
     ComparisonRangeInt,
+    ComparisonScoreColumns,
+    ContractBulkUpdateRequest,
+    ContractBulkUpdateResponse,
     ContractCreate,
     ContractComparisonItem,
     ContractComparisonMetrics,
     ContractComparisonResponse,
+    ContractComparisonSummaryResponse,
+    ContractDistributionResponse,
     ContractFilters,
     ContractRead,
     ContractSortBy,
     ContractSortDirection,
     ContractStatus,
+    ContractPriceHistoryRead,
     ContractUpdate,
     EnergyType,
+    SimilarContract,
 )
 from app.services.contracts_service import (
+    bulk_update_contracts,
     create_contract,
     delete_contract,
     get_contract_by_id,
+    get_contract_for_update,
+    list_contract_measures,
     list_contracts_by_ids,
     list_contracts,
     update_contract,
 )
+from app.services.distribution_service import get_contract_distribution
+from app.services.price_history_service import list_contract_price_history
+from app.services.recommendations_service import find_similar_contracts
 
 router = APIRouter(prefix="/contracts", tags=["contracts"])
 
+MAX_COMPARE_IDS = 500
+
 
 def get_contract_filters(
     energy_types: list[EnergyType] | None = Query(default=None),
@@ -39,10 +59,15 @@ def get_contract_filters(
     price_max: float | None = Query(default=None, ge=0),
     quantity_min: float | None = Query(default=None, ge=0),
     quantity_max: float | None = Query(default=None, ge=0),
+    total_value_min: float | None = Query(default=None, ge=0),
+    total_value_max: float | None = Query(default=None, ge=0),
+    duration_days_min: int | None = Query(default=None, ge=1),
+    duration_days_max: int | None = Query(default=None, ge=1),
     location: str | None = Query(default=None, min_length=2, max_length=80),
     delivery_start_from: date | None = Query(default=None),
     delivery_end_to: date | None = Query(default=None),
     status: ContractStatus | None = Query(default=None),
+    active_only: bool = Query(default=False),
     search: str | None = Query(default=None, min_length=2, max_length=120),
     sort_by: ContractSortBy | None = Query(default=None),
     sort_direction: ContractSortDirection | None = Query(default=None),
@@ -53,36 +78,104 @@ def get_contract_filters(
         price_max=price_max,
         quantity_min=quantity_min,
         quantity_max=quantity_max,
+        total_value_min=total_value_min,
+        total_value_max=total_value_max,
+        duration_days_min=duration_days_min,
+        duration_days_max=duration_days_max,
         location=location,
         delivery_start_from=delivery_start_from,
         delivery_end_to=delivery_end_to,
         status=status,
+        active_only=active_only,
         search=search,
         sort_by=sort_by,
         sort_direction=sort_direction,
     )
 
 
-def build_decimal_range(values: list[Decimal]) -> ComparisonRangeDecimal:
-    min_value = min(values)
-    max_value = max(values)
-    return ComparisonRangeDecimal(min=min_value, max=max_value, spread=max_value - min_value)
+COMPARISON_PERCENTILES = (10, 25, 50, 75, 90)
+COMPARISON_METRICS = ("price_per_mwh", "quantity_mwh", "duration_days", "total_cost")
+
+
+def build_distribution(values: np.ndarray) -> ComparisonDistribution:
+    p10, p25, p50, p75, p90 = np.percentile(values, COMPARISON_PERCENTILES).tolist()
+    return ComparisonDistribution(
+        mean=float(values.mean()),
+        stddev=float(values.std()),
+        p10=p10,
+        p25=p25,
+        p50=p50,
+        p75=p75,
+        p90=p90,
+    )
 
 
-def build_int_range(values: list[int]) -> ComparisonRangeInt:
-    min_value = min(values)
-    max_value = max(values)
-    return ComparisonRangeInt(min=min_value, max=max_value, spread=max_value - min_value)
+def build_decimal_range(values: Sequence[Decimal]) -> ComparisonRangeDecimal:
+    array = np.asarray(values, dtype=float)
+    # Report the exact Decimal extremes; floats are only used to locate them.
+    min_value = values[int(array.argmin())]
+    max_value = values[int(array.argmax())]
+    return ComparisonRangeDecimal(
+        min=min_value,
+        max=max_value,
+        spread=max_value - min_value,
+        distribution=build_distribution(array),
+    )
 
 
-def calculate_duration_days(delivery_start: date, delivery_end: date) -> int:
-    return (delivery_end - delivery_start).days + 1
+def build_int_range(values: Sequence[int] | np.ndarray) -> ComparisonRangeInt:
+    array = np.asarray(values, dtype=np.int64)
+    min_value = int(array.min())
+    max_value = int(array.max())
+    return ComparisonRangeInt(
+        min=min_value,
+        max=max_value,
+        spread=max_value - min_value,
+        distribution=build_distribution(array.astype(float)),
+    )
+
+
+def score_values(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return population z-scores and 1-based ascending ranks (ties share the lowest rank)."""
+    stddev = values.std()
+    z_scores = (values - values.mean()) / stddev if stddev > 0 else np.zeros_like(values)
+    sorted_values = np.sort(values)
+    ranks = np.searchsorted(sorted_values, values, side="left") + 1
+    return z_scores, ranks
+
+
+def build_comparison(
+    *,
+    prices: Sequence[Decimal],
+    quantities: Sequence[Decimal],
+    total_costs: Sequence[Decimal],
+    durations: np.ndarray,
+) -> tuple[ContractComparisonMetrics, dict[str, list[float]], dict[str, list[int]]]:
+    metrics = ContractComparisonMetrics(
+        price_per_mwh=build_decimal_range(prices),
+        quantity_mwh=build_decimal_range(quantities),
+        duration_days=build_int_range(durations),
+        total_cost=build_decimal_range(total_costs),
+    )
+    columns = {
+        "price_per_mwh": np.asarray(prices, dtype=float),
+        "quantity_mwh": np.asarray(quantities, dtype=float),
+        "duration_days": durations.astype(float),
+        "total_cost": np.asarray(total_costs, dtype=float),
+    }
+    z_scores: dict[str, list[float]] = {}
+    ranks: dict[str, list[int]] = {}
+    for metric_name in COMPARISON_METRICS:
+        metric_z_scores, metric_ranks = score_values(columns[metric_name])
+        z_scores[metric_name] = np.round(metric_z_scores, 6).tolist()
+        ranks[metric_name] = metric_ranks.tolist()
+    return metrics, z_scores, ranks
 
 
 @router.get("/compare", response_model=ContractComparisonResponse)
 async def compare_contracts(
-    ids: list[conint(ge=1)] = Query(..., min_length=2, max_length=3),
-    session: AsyncSession = Depends(get_session),
+    ids: list[conint(ge=1)] = Query(..., min_length=2, max_length=MAX_COMPARE_IDS),
+    session: AsyncSession = Depends(get_read_session),
 ) -> ContractComparisonResponse:
     if len(set(ids)) != len(ids):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Contract ids must be unique")
@@ -97,30 +190,82 @@ async def compare_contracts(
             detail=f"Contracts not found: {missing_str}",
         )
 
+    ordered_contracts = [contract_by_id[contract_id] for contract_id in ids]
+    prices = [contract.price_per_mwh for contract in ordered_contracts]
+    quantities = [contract.quantity_mwh for contract in ordered_contracts]
+    # Stored generated columns (total_value, duration_days); nothing is recomputed here.
+    total_costs = [contract.total_value for contract in ordered_contracts]
+    durations = np.asarray(
+        [contract.duration_days for contract in ordered_contracts], dtype=np.int64
+    )
+    metrics, z_scores, ranks = build_comparison(
+        prices=prices, quantities=quantities, total_costs=total_costs, durations=durations
+    )
+
     comparison_items: list[ContractComparisonItem] = []
-    for contract_id in ids:
-        contract = contract_by_id[contract_id]
+    for position, contract in enumerate(ordered_contracts):
         contract_read = ContractRead.model_validate(contract)
         comparison_items.append(
             ContractComparisonItem(
                 **contract_read.model_dump(),
-                duration_days=calculate_duration_days(
-                    delivery_start=contract.delivery_start,
-                    delivery_end=contract.delivery_end,
+                total_cost=total_costs[position],
+                z_scores=ComparisonMetricScores(
+                    **{name: z_scores[name][position] for name in COMPARISON_METRICS}
+                ),
+                ranks=ComparisonMetricRanks(
+                    **{name: ranks[name][position] for name in COMPARISON_METRICS}
                 ),
             )
         )
+    return ContractComparisonResponse(contracts=comparison_items, metrics=metrics)
 
-    price_values = [contract.price_per_mwh for contract in comparison_items]
-    quantity_values = [contract.quantity_mwh for contract in comparison_items]
-    duration_values = [contract.duration_days for contract in comparison_items]
 
-    metrics = ContractComparisonMetrics(
-        price_per_mwh=build_decimal_range(price_values),
-        quantity_mwh=build_decimal_range(quantity_values),
-        duration_days=build_int_range(duration_values),
+@router.get("/compare/summary", response_model=ContractComparisonSummaryResponse)
+async def compare_contract_set(
+    max_contracts: int = Query(10_000, ge=2, le=100_000),
+    include_scores: bool = Query(True),
+    filters: ContractFilters = Depends(get_contract_filters),
+    session: AsyncSession = Depends(get_read_session),
+) -> ContractComparisonSummaryResponse:
+    rows = await list_contract_measures(session=session, filters=filters, limit=max_contracts + 1)
+    truncated = len(rows) > max_contracts
+    rows = rows[:max_contracts]
+    if not rows:
+        return ContractComparisonSummaryResponse(count=0, truncated=False, metrics=None)
+
+    contract_ids, prices, quantities, total_costs, durations = map(list, zip(*rows))
+    metrics, z_scores, ranks = build_comparison(
+        prices=prices,
+        quantities=quantities,
+        total_costs=total_costs,
+        durations=np.asarray(durations, dtype=np.int64),
+    )
+    scores = (
+        ComparisonScoreColumns(contract_ids=contract_ids, z_scores=z_scores, ranks=ranks)
+        if include_scores
+        else None
+    )
+    return ContractComparisonSummaryResponse(
+        count=len(rows), truncated=truncated, metrics=metrics, scores=scores
+    )
+
+
+@router.get("/distribution", response_model=ContractDistributionResponse)
+async def get_contracts_distribution(
+    energy_types: list[EnergyType] | None = Query(default=None),
+    locations: list[str] | None = Query(default=None),
+    statuses: list[ContractStatus] | None = Query(default=None),
+    bins: int = Query(20, ge=1, le=200),
+    session: AsyncSession = Depends(get_read_session),
+) -> ContractDistributionResponse:
+    """Price and quantity percentiles and histograms from merged quantile sketches."""
+    return await get_contract_distribution(
+        session=session,
+        energy_types=energy_types,
+        locations=locations,
+        statuses=statuses,
+        bins=bins,
     )
-    return ContractComparisonResponse(contracts=comparison_items, metrics=metrics)
 
 
 @router.get("", response_model=list[ContractRead])
@@ -128,19 +273,55 @@ async def get_contracts(
     offset: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
     filters: ContractFilters = Depends(get_contract_filters),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ) -> list[ContractRead]:
     return list(await list_contracts(session=session, offset=offset, limit=limit, filters=filters))
 
 
 @router.get("/{contract_id}", response_model=ContractRead)
-async def get_contract(contract_id: int, session: AsyncSession = Depends(get_session)) -> ContractRead:
+async def get_contract(
+    contract_id: int, session: AsyncSession = Depends(get_read_session)
+) -> ContractRead:
     contract = await get_contract_by_id(session=session, contract_id=contract_id)
     if contract is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contract not found")
     return contract
 
 
+@router.get("/{contract_id}/similar", response_model=list[SimilarContract])
+async def get_similar_contracts(
+    contract_id: int,
+    k: int = Query(5, ge=1, le=50),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[SimilarContract]:
+    contract = await get_contract_by_id(session=session, contract_id=contract_id)
+    if contract is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contract not found")
+
+    neighbours = await find_similar_contracts(session=session, contract=contract, k=k)
+    similar_contracts = await list_contracts_by_ids(
+        session=session, contract_ids=[neighbour_id for neighbour_id, _ in neighbours]
+    )
+    contract_by_id = {similar.id: similar for similar in similar_contracts}
+    return [
+        SimilarContract(contract=contract_by_id[neighbour_id], distance=distance)
+        for neighbour_id, distance in neighbours
+        if neighbour_id in contract_by_id
+    ]
+
+
+@router.get("/{contract_id}/price-history", response_model=list[ContractPriceHistoryRead])
+async def get_contract_price_history(
+    contract_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[ContractPriceHistoryRead]:
+    """Recorded price and status changes, newest first; kept after the contract is deleted."""
+    return list(
+        await list_contract_price_history(session=session, contract_id=contract_id, limit=limit)
+    )
+
+
 @router.post("", response_model=ContractRead, status_code=status.HTTP_201_CREATED)
 async def create_contract_route(
     payload: ContractCreate, session: AsyncSession = Depends(get_session)
@@ -148,11 +329,24 @@ async def create_contract_route(
     return await create_contract(session=session, payload=payload)
 
 
+@router.post("/bulk-update", response_model=ContractBulkUpdateResponse)
+async def bulk_update_contracts_route(
+    payload: ContractBulkUpdateRequest, session: AsyncSession = Depends(get_session)
+) -> ContractBulkUpdateResponse:
+    contracts = await bulk_update_contracts(
+        session=session,
+        payload=payload.update,
+        contract_ids=payload.contract_ids,
+        filters=payload.filters,
+    )
+    return ContractBulkUpdateResponse(updated_count=len(contracts), contracts=list(contracts))
+
+
 @router.patch("/{contract_id}", response_model=ContractRead)
 async def update_contract_route(
     contract_id: int, payload: ContractUpdate, session: AsyncSession = Depends(get_session)
 ) -> ContractRead:
-    contract = await get_contract_by_id(session=session, contract_id=contract_id)
+    contract = await get_contract_for_update(session=session, contract_id=contract_id)
     if contract is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contract not found")
     return await update_contract(session=session, contract=contract, payload=payload)
@@ -162,7 +356,7 @@ async def update_contract_route(
 async def delete_contract_route(
     contract_id: int, session: AsyncSession = Depends(get_session)
 ) -> None:
-    contract = await get_contract_by_id(session=session, contract_id=contract_id)
+    contract = await get_contract_for_update(session=session, contract_id=contract_id)
     if contract is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contract not found")
     await delete_contract(session=session, contract=contract)
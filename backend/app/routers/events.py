@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+from app.services.events import change_feed
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("")
+async def stream_change_events(
+    user_id: int | None = Query(default=None),
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID", max_length=64),
+) -> StreamingResponse:
+    """Server-Sent Events feed of contract changes, plus holdings changes for ``user_id``."""
+    return StreamingResponse(
+        change_feed.subscribe(user_id=user_id, last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_snapshot_session
+from app.routers.contracts import get_contract_filters
+from app.schemas import ContractFilters, ExportFormat, ExportTable
+from app.services.export_service import EXPORT_FILE_EXTENSIONS, EXPORT_MEDIA_TYPES, export_table
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+
+def _export_response(chunks, *, table: ExportTable, export_format: ExportFormat) -> StreamingResponse:
+    filename = f"{table.value}.{EXPORT_FILE_EXTENSIONS[export_format]}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/contracts")
+async def export_contracts_route(
+    export_format: ExportFormat = Query(default=ExportFormat.arrow, alias="format"),
+    filters: ContractFilters = Depends(get_contract_filters),
+    session: AsyncSession = Depends(get_snapshot_session),
+) -> StreamingResponse:
+    """Filtered contracts as an Arrow IPC stream or Parquet file, ordered by id."""
+    return _export_response(
+        export_table(
+            session=session,
+            table=ExportTable.contracts,
+            filters=filters,
+            export_format=export_format,
+        ),
+        table=ExportTable.contracts,
+        export_format=export_format,
+    )
+
+
+@router.get("/portfolio-holdings")
+async def export_portfolio_holdings_route(
+    export_format: ExportFormat = Query(default=ExportFormat.arrow, alias="format"),
+    user_id: int | None = Query(default=None),
+    filters: ContractFilters = Depends(get_contract_filters),
+    session: AsyncSession = Depends(get_snapshot_session),
+) -> StreamingResponse:
+    """Holdings joined to their contracts, for every portfolio or just ``user_id``'s."""
+    return _export_response(
+        export_table(
+            session=session,
+            table=ExportTable.portfolio_holdings,
+            filters=filters,
+            export_format=export_format,
+            user_id=user_id,
+        ),
+        table=ExportTable.portfolio_holdings,
+        export_format=export_format,
+    )
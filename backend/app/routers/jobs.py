@@ -0,0 +1,90 @@
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_read_session, get_session
+from app.models import Job
+from app.schemas import JobCreate, JobRead, JobStatus
+from app.services.jobs import JobQueue, get_job, list_jobs
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def get_job_queue(request: Request) -> JobQueue:
+    job_queue = getattr(request.app.state, "job_queue", None)
+    if job_queue is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Job queue is disabled"
+        )
+    return job_queue
+
+
+async def _get_job_or_404(session: AsyncSession, job_id: int) -> Job:
+    job = await get_job(session=session, job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.post("", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    payload: JobCreate,
+    session: AsyncSession = Depends(get_session),
+    job_queue: JobQueue = Depends(get_job_queue),
+) -> JobRead:
+    return await job_queue.submit(session=session, kind=payload.kind, params=payload.params)
+
+
+@router.get("", response_model=list[JobRead])
+async def list_jobs_route(
+    job_status: JobStatus | None = Query(default=None, alias="status"),
+    limit: int = Query(50, ge=1, le=500),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[JobRead]:
+    return await list_jobs(session=session, status=job_status, limit=limit)
+
+
+@router.get("/{job_id}", response_model=JobRead)
+async def get_job_route(
+    job_id: int,
+    session: AsyncSession = Depends(get_read_session),
+) -> JobRead:
+    return await _get_job_or_404(session, job_id)
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(
+    job_id: int,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """The job's JSON result, or its file for exports; 409 until the job succeeds."""
+    job = await _get_job_or_404(session, job_id)
+    if job.status != JobStatus.succeeded.value:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=f"Job is {job.status}"
+        )
+    if job.result_path is None:
+        return job.result
+    if not Path(job.result_path).exists():
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Job result file expired")
+    return FileResponse(
+        job.result_path,
+        media_type=job.result["media_type"],
+        filename=job.result["filename"],
+    )
+
+
+@router.post("/{job_id}/cancel", response_model=JobRead)
+async def cancel_job(
+    job_id: int,
+    session: AsyncSession = Depends(get_session),
+    job_queue: JobQueue = Depends(get_job_queue),
+) -> JobRead:
+    job = await _get_job_or_404(session, job_id)
+    if job.status in {item.value for item in (JobStatus.succeeded, JobStatus.failed)}:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=f"Job already {job.status}"
+        )
+    return await job_queue.cancel(session=session, job=job)
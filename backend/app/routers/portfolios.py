@@ -1,14 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_session
-from app.schemas import PortfolioMetrics, PortfolioRead, PortfolioHoldingRead
+from app.db import get_read_session, get_session, get_snapshot_session
+from app.routers.contracts import get_contract_filters
+from app.schemas import (
+    ContractFilters,
+    ContractSortDirection,
+    PortfolioHoldingRead,
+    PortfolioHoldingsPage,
+    PortfolioMetrics,
+    PortfolioOptimizationRequest,
+    PortfolioOptimizationResponse,
+    PortfolioRead,
+    PortfolioSchedule,
+    PortfolioSnapshot,
+    PortfolioWhatIfResponse,
+    ScheduleGranularity,
+    WhatIfRankBy,
+)
+from app.services.optimizer_service import optimize_portfolio
 from app.services.portfolios_service import (
     add_contract_to_portfolio,
-    get_portfolio_metrics,
+    get_shared_portfolio_metrics,
+    get_portfolio_schedule,
+    get_portfolio_snapshot,
     list_portfolio_holdings,
+    list_portfolio_holdings_page,
     remove_contract_from_portfolio,
-    ensure_user_portfolio,
+    simulate_portfolio_additions,
+    stream_portfolio_holdings,
 )
 
 router = APIRouter(prefix="/portfolios", tags=["portfolios"])
@@ -30,16 +53,7 @@ async def add_contract(
         )
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
-
-    holding_with_contract = await list_portfolio_holdings(
-        session=session, user_id=user_id
-    )
-    holding_match = next(
-        (item for item in holding_with_contract if item.id == holding.id), None
-    )
-    if holding_match is None:
-        return holding
-    return holding_match
+    return holding
 
 
 @router.delete(
@@ -62,16 +76,118 @@ async def remove_contract(
 
 @router.get("/{user_id}", response_model=PortfolioRead)
 async def get_portfolio(
-    user_id: int, session: AsyncSession = Depends(get_session)
+    user_id: int, session: AsyncSession = Depends(get_snapshot_session)
 ) -> PortfolioRead:
-    portfolio = await ensure_user_portfolio(session=session, user_id=user_id)
+    # Unknown users get an empty portfolio; it is only created on the first add.
     holdings = await list_portfolio_holdings(session=session, user_id=user_id)
-    return PortfolioRead(user_id=portfolio.user_id, holdings=list(holdings))
+    return PortfolioRead(user_id=user_id, holdings=list(holdings))
 
 
 @router.get("/{user_id}/metrics", response_model=PortfolioMetrics)
 async def get_portfolio_metrics_route(
-    user_id: int, session: AsyncSession = Depends(get_session)
+    user_id: int, session: AsyncSession = Depends(get_snapshot_session)
 ) -> PortfolioMetrics:
-    metrics = await get_portfolio_metrics(session=session, user_id=user_id)
+    metrics = await get_shared_portfolio_metrics(session=session, user_id=user_id)
     return PortfolioMetrics(**metrics)
+
+
+@router.get("/{user_id}/holdings", response_model=PortfolioHoldingsPage)
+async def get_portfolio_holdings_page(
+    user_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(default=None, max_length=512),
+    filters: ContractFilters = Depends(get_contract_filters),
+    session: AsyncSession = Depends(get_read_session),
+) -> PortfolioHoldingsPage:
+    try:
+        holdings, next_cursor = await list_portfolio_holdings_page(
+            session=session, user_id=user_id, filters=filters, limit=limit, cursor=cursor
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return PortfolioHoldingsPage(user_id=user_id, holdings=list(holdings), next_cursor=next_cursor)
+
+
+@router.get("/{user_id}/holdings/stream")
+async def stream_portfolio_holdings_route(
+    user_id: int,
+    filters: ContractFilters = Depends(get_contract_filters),
+    session: AsyncSession = Depends(get_snapshot_session),
+) -> StreamingResponse:
+    async def ndjson_lines():
+        async for batch in stream_portfolio_holdings(
+            session=session, user_id=user_id, filters=filters
+        ):
+            yield "".join(
+                PortfolioHoldingRead(id=holding_id, added_at=added_at, contract=contract)
+                .model_dump_json()
+                + "\n"
+                for holding_id, added_at, contract in batch
+            )
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@router.get("/{user_id}/snapshot", response_model=PortfolioSnapshot)
+async def get_portfolio_snapshot_route(
+    user_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int | None = Query(default=None, ge=1, le=1000),
+    session: AsyncSession = Depends(get_snapshot_session),
+) -> PortfolioSnapshot:
+    snapshot = await get_portfolio_snapshot(
+        session=session, user_id=user_id, offset=offset, limit=limit
+    )
+    return PortfolioSnapshot(**snapshot)
+
+
+@router.get("/{user_id}/schedule", response_model=PortfolioSchedule)
+async def get_portfolio_schedule_route(
+    user_id: int,
+    granularity: ScheduleGranularity = Query(ScheduleGranularity.month),
+    start: date | None = Query(default=None),
+    end: date | None = Query(default=None),
+    session: AsyncSession = Depends(get_read_session),
+) -> PortfolioSchedule:
+    if start is not None and end is not None and start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="start must be on or before end"
+        )
+    buckets = await get_portfolio_schedule(
+        session=session,
+        user_id=user_id,
+        granularity=granularity,
+        window_start=start,
+        window_end=end,
+    )
+    return PortfolioSchedule(user_id=user_id, granularity=granularity, buckets=buckets)
+
+
+@router.get("/{user_id}/what-if", response_model=PortfolioWhatIfResponse)
+async def get_portfolio_what_if(
+    user_id: int,
+    rank_by: WhatIfRankBy = Query(WhatIfRankBy.weighted_avg_price),
+    rank_direction: ContractSortDirection = Query(ContractSortDirection.asc),
+    top: int = Query(50, ge=1, le=1000),
+    filters: ContractFilters = Depends(get_contract_filters),
+    session: AsyncSession = Depends(get_snapshot_session),
+) -> PortfolioWhatIfResponse:
+    simulation = await simulate_portfolio_additions(
+        session=session,
+        user_id=user_id,
+        filters=filters,
+        rank_by=rank_by,
+        sort_direction=rank_direction,
+        top=top,
+    )
+    return PortfolioWhatIfResponse(**simulation)
+
+
+@router.post("/{user_id}/optimize", response_model=PortfolioOptimizationResponse)
+async def optimize_portfolio_route(
+    user_id: int,
+    payload: PortfolioOptimizationRequest,
+    session: AsyncSession = Depends(get_session),
+) -> PortfolioOptimizationResponse:
+    optimization = await optimize_portfolio(session=session, user_id=user_id, payload=payload)
+    return PortfolioOptimizationResponse(**optimization)
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_read_session
+from app.schemas import EnergyType, PriceBucket, PriceRollupRead
+from app.services.price_history_service import MAX_ROLLUP_ROWS, as_utc, list_price_rollups
+
+router = APIRouter(prefix="/prices", tags=["prices"])
+
+
+@router.get("/ohlc", response_model=list[PriceRollupRead])
+async def get_price_ohlc(
+    bucket: PriceBucket = Query(PriceBucket.day),
+    energy_type: EnergyType | None = Query(default=None),
+    location: str | None = Query(default=None, min_length=2, max_length=80),
+    start: datetime | None = Query(default=None),
+    end: datetime | None = Query(default=None),
+    limit: int = Query(500, ge=1, le=MAX_ROLLUP_ROWS),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[PriceRollupRead]:
+    """Open/high/low/close contract prices per energy type and location for each bucket."""
+    # Bounds without an offset are UTC, so one naive and one aware bound still compare.
+    start = as_utc(start) if start is not None else None
+    end = as_utc(end) if end is not None else None
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end"
+        )
+    return await list_price_rollups(
+        session=session,
+        bucket=bucket,
+        energy_type=energy_type,
+        location=location,
+        start=start,
+        end=end,
+        limit=limit,
+    )
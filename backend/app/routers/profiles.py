@@ -0,0 +1,59 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.services.profiling import ProfileStore
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+def get_profile_store(
+    request: Request,
+    profile_token: str | None = Header(default=None, alias="X-Profile-Token"),
+) -> ProfileStore:
+    """The store when profiling is enabled and a token is configured (404 otherwise);
+    requires ``X-Profile-Token``."""
+    store = getattr(request.app.state, "profile_store", None)
+    expected = getattr(request.app.state, "profile_token", "")
+    if store is None or not expected:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    if not secrets.compare_digest(profile_token or "", expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profile token")
+    return store
+
+
+@router.get("")
+async def list_profiles(store: ProfileStore = Depends(get_profile_store)) -> list[dict]:
+    """Stored trace summaries, newest first."""
+    return store.list()
+
+
+@router.get("/{trace_id}")
+async def get_profile(trace_id: str, store: ProfileStore = Depends(get_profile_store)) -> dict:
+    summary = store.get(trace_id)
+    if summary is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return summary
+
+
+@router.get("/{trace_id}/report", response_class=PlainTextResponse)
+async def get_profile_report(
+    trace_id: str, store: ProfileStore = Depends(get_profile_store)
+) -> str:
+    """pstats listing sorted by cumulative time."""
+    report = store.text_report(trace_id)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return report
+
+
+@router.get("/{trace_id}/download")
+async def download_profile(
+    trace_id: str, store: ProfileStore = Depends(get_profile_store)
+) -> FileResponse:
+    """The raw cProfile dump, for snakeviz or ``python -m pstats``."""
+    path = store.profile_path(trace_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
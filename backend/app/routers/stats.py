@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+
+from app.services.admission import admission_stats
+from app.services.coalescing import coalescing_stats
+from app.services.contracts_service import contract_loader
+from app.services.events import change_feed
+from app.services.startup import startup_report
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("/coalescing")
+async def get_coalescing_stats() -> list[dict]:
+    return coalescing_stats()
+
+
+@router.get("/contract-loader")
+async def get_contract_loader_stats() -> dict:
+    return contract_loader.stats()
+
+
+@router.get("/admission")
+async def get_admission_stats() -> list[dict]:
+    return admission_stats()
+
+
+@router.get("/change-feed")
+async def get_change_feed_stats() -> dict:
+    return change_feed.stats()
+
+
+@router.get("/startup")
+async def get_startup_stats() -> dict:
+    return startup_report.as_dict()
@@ -4,20 +4,8 @@ from enum import Enum
 
 from pydantic import BaseModel, Field, model_validator
 
-
-class EnergyType(str, Enum):
-    solar = "Solar"
-    wind = "Wind"
-    natural_gas = "Natural Gas"
-    nuclear = "Nuclear"
-    coal = "Coal"
-    hydro = "Hydro"
-
-
-class ContractStatus(str, Enum):
-    available = "Available"
-    reserved = "Reserved"
-    sold = "Sold"
+# Shared with app.models, which must not import the API schemas; re-exported here.
+from app.enums import ContractStatus, EnergyType
 
 
 class ContractBase(BaseModel):
@@ -72,6 +60,8 @@ class ContractSortBy(str, Enum):
     price_per_mwh = "price_per_mwh"
     quantity_mwh = "quantity_mwh"
     delivery_start = "delivery_start"
+    total_value = "total_value"
+    duration_days = "duration_days"
 
 
 class ContractSortDirection(str, Enum):
@@ -85,11 +75,18 @@ class ContractFilters(BaseModel):
     price_max: Decimal | None = Field(default=None, ge=0, max_digits=18, decimal_places=6)
     quantity_min: Decimal | None = Field(default=None, ge=0, max_digits=18, decimal_places=3)
     quantity_max: Decimal | None = Field(default=None, ge=0, max_digits=18, decimal_places=3)
+    # total_value is quantity_mwh * price_per_mwh; duration_days counts both delivery dates.
+    total_value_min: Decimal | None = Field(default=None, ge=0)
+    total_value_max: Decimal | None = Field(default=None, ge=0)
+    duration_days_min: int | None = Field(default=None, ge=1)
+    duration_days_max: int | None = Field(default=None, ge=1)
     location: str | None = Field(default=None, min_length=2, max_length=80)
     delivery_start_from: date | None = None
     delivery_end_to: date | None = None
     # Optional status filter for list/search queries
     status: ContractStatus | None = None
+    # Only Available/Reserved contracts; on PostgreSQL this reads just the hot partition.
+    active_only: bool = False
     search: str | None = Field(default=None, min_length=2, max_length=120)
     sort_by: ContractSortBy | None = None
     sort_direction: ContractSortDirection | None = None
@@ -104,6 +101,18 @@ class ContractFilters(BaseModel):
             and self.quantity_min > self.quantity_max
         ):
             raise ValueError("quantity_min must be less than or equal to quantity_max")
+        if (
+            self.total_value_min is not None
+            and self.total_value_max is not None
+            and self.total_value_min > self.total_value_max
+        ):
+            raise ValueError("total_value_min must be less than or equal to total_value_max")
+        if (
+            self.duration_days_min is not None
+            and self.duration_days_max is not None
+            and self.duration_days_min > self.duration_days_max
+        ):
+            raise ValueError("duration_days_min must be less than or equal to duration_days_max")
         if (
             self.delivery_start_from is not None
             and self.delivery_end_to is not None
@@ -115,29 +124,99 @@ class ContractFilters(BaseModel):
 
 class ContractRead(ContractBase):
     id: int
+    total_value: Decimal
+    duration_days: int
     model_config = {"from_attributes": True}
 
 
+class ExportFormat(str, Enum):
+    arrow = "arrow"
+    parquet = "parquet"
+
+
+class ExportTable(str, Enum):
+    contracts = "contracts"
+    portfolio_holdings = "portfolio_holdings"
+
+
+class ContractBulkUpdateRequest(BaseModel):
+    """Apply one ``ContractUpdate`` to an explicit id list or a filtered selection."""
+
+    contract_ids: list[int] | None = Field(default=None, min_length=1, max_length=1000)
+    filters: ContractFilters | None = None
+    update: ContractUpdate
+
+    @model_validator(mode="after")
+    def validate_selection(self) -> "ContractBulkUpdateRequest":
+        if (self.contract_ids is None) == (self.filters is None):
+            raise ValueError("Provide exactly one of contract_ids or filters")
+        if self.filters is not None and not self.filters.model_dump(
+            exclude_defaults=True, exclude={"sort_by", "sort_direction"}
+        ):
+            raise ValueError("filters must select at least one condition")
+        if not self.update.model_fields_set:
+            raise ValueError("update must set at least one field")
+        if ("delivery_start" in self.update.model_fields_set) != (
+            "delivery_end" in self.update.model_fields_set
+        ):
+            raise ValueError("delivery_start and delivery_end must be updated together in bulk")
+        return self
+
+
+class ContractBulkUpdateResponse(BaseModel):
+    updated_count: int
+    contracts: list[ContractRead]
+
+
+class ComparisonDistribution(BaseModel):
+    mean: float
+    stddev: float
+    p10: float
+    p25: float
+    p50: float
+    p75: float
+    p90: float
+
+
 class ComparisonRangeDecimal(BaseModel):
     min: Decimal
     max: Decimal
     spread: Decimal
+    distribution: ComparisonDistribution | None = None
 
 
 class ComparisonRangeInt(BaseModel):
     min: int
     max: int
     spread: int
+    distribution: ComparisonDistribution | None = None
 
 
-class ContractComparisonItem(ContractRead):
+class ComparisonMetricScores(BaseModel):
+    price_per_mwh: float
+    quantity_mwh: float
+    duration_days: float
+    total_cost: float
+
+
+class ComparisonMetricRanks(BaseModel):
+    price_per_mwh: int
+    quantity_mwh: int
     duration_days: int
+    total_cost: int
+
+
+class ContractComparisonItem(ContractRead):
+    total_cost: Decimal | None = None
+    z_scores: ComparisonMetricScores | None = None
+    ranks: ComparisonMetricRanks | None = None
 
 
 class ContractComparisonMetrics(BaseModel):
     price_per_mwh: ComparisonRangeDecimal
     quantity_mwh: ComparisonRangeDecimal
     duration_days: ComparisonRangeInt
+    total_cost: ComparisonRangeDecimal | None = None
 
 
 class ContractComparisonResponse(BaseModel):
@@ -145,6 +224,88 @@ class ContractComparisonResponse(BaseModel):
     metrics: ContractComparisonMetrics
 
 
+class ComparisonScoreColumns(BaseModel):
+    # Column-oriented so thousands of contracts stay compact on the wire.
+    contract_ids: list[int]
+    z_scores: dict[str, list[float]]
+    ranks: dict[str, list[int]]
+
+
+class ContractComparisonSummaryResponse(BaseModel):
+    count: int
+    truncated: bool
+    metrics: ContractComparisonMetrics | None
+    scores: ComparisonScoreColumns | None = None
+
+
+class HistogramBin(BaseModel):
+    lower: float
+    upper: float
+    count: int
+
+
+class MetricDistribution(BaseModel):
+    min: float | None
+    p10: float | None
+    p50: float | None
+    p90: float | None
+    max: float | None
+    histogram: list[HistogramBin]
+
+
+class ContractDistributionResponse(BaseModel):
+    count: int
+    # Each reported value is within this relative error of the true value at its rank.
+    relative_accuracy: float
+    price_per_mwh: MetricDistribution
+    quantity_mwh: MetricDistribution
+
+
+class SimilarContract(BaseModel):
+    contract: ContractRead
+    distance: float
+
+
+class PriceChangeReason(str, Enum):
+    created = "created"
+    updated = "updated"
+    bulk_update = "bulk_update"
+    expired = "expired"
+    baseline = "baseline"
+
+
+class PriceBucket(str, Enum):
+    hour = "hour"
+    day = "day"
+    month = "month"
+
+
+class ContractPriceHistoryRead(BaseModel):
+    id: int
+    contract_id: int
+    recorded_at: datetime
+    reason: PriceChangeReason
+    energy_type: EnergyType
+    location: str
+    price_per_mwh: Decimal
+    status: ContractStatus
+    price_changed: bool
+    model_config = {"from_attributes": True}
+
+
+class PriceRollupRead(BaseModel):
+    bucket: PriceBucket
+    bucket_start: datetime
+    energy_type: EnergyType
+    location: str
+    open_price: Decimal
+    high_price: Decimal
+    low_price: Decimal
+    close_price: Decimal
+    average_price: Decimal
+    observations: int
+
+
 class PortfolioHoldingRead(BaseModel):
     id: int
     added_at: datetime
@@ -157,6 +318,12 @@ class PortfolioRead(BaseModel):
     holdings: list[PortfolioHoldingRead]
 
 
+class PortfolioHoldingsPage(BaseModel):
+    user_id: int
+    holdings: list[PortfolioHoldingRead]
+    next_cursor: str | None
+
+
 class PortfolioEnergyBreakdown(BaseModel):
     energy_type: EnergyType
     total_contracts: int
@@ -171,3 +338,236 @@ class PortfolioMetrics(BaseModel):
     total_cost: Decimal
     weighted_avg_price_per_mwh: Decimal
     breakdown_by_energy_type: list[PortfolioEnergyBreakdown]
+
+
+class HoldingsChangeAction(str, Enum):
+    added = "added"
+    removed = "removed"
+
+
+class ContractDeletedEvent(BaseModel):
+    id: int
+
+
+class PortfolioHoldingsChangedEvent(BaseModel):
+    user_id: int
+    action: HoldingsChangeAction
+    contract_ids: list[int]
+    # Set for single adds so clients can insert the holding without refetching.
+    holding: PortfolioHoldingRead | None = None
+    # Recomputed only while the user has a live subscriber; null means refetch.
+    metrics: PortfolioMetrics | None = None
+
+
+class PortfolioSnapshot(BaseModel):
+    user_id: int
+    total_holdings: int
+    holdings: list[PortfolioHoldingRead]
+    metrics: PortfolioMetrics
+
+
+class ScheduleGranularity(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
+class PortfolioScheduleBucket(BaseModel):
+    period_start: date
+    period_end: date
+    capacity_mwh: Decimal
+    cost: Decimal
+
+
+class PortfolioSchedule(BaseModel):
+    user_id: int
+    granularity: ScheduleGranularity
+    buckets: list[PortfolioScheduleBucket]
+
+
+class WhatIfRankBy(str, Enum):
+    weighted_avg_price = "weighted_avg_price"
+    total_cost = "total_cost"
+    total_capacity = "total_capacity"
+    energy_type_share = "energy_type_share"
+
+
+class PortfolioWhatIfCandidate(BaseModel):
+    contract_id: int
+    energy_type: EnergyType
+    quantity_mwh: Decimal
+    price_per_mwh: Decimal
+    total_cost_after: Decimal
+    total_cost_delta: Decimal
+    total_capacity_after: Decimal
+    total_capacity_delta: Decimal
+    weighted_avg_price_after: Decimal
+    weighted_avg_price_delta: Decimal
+    energy_type_share_after: float
+    energy_type_share_delta: float
+
+
+class PortfolioWhatIfResponse(BaseModel):
+    user_id: int
+    baseline: PortfolioMetrics
+    candidates_evaluated: int
+    candidates: list[PortfolioWhatIfCandidate]
+
+
+class OptimizerTarget(BaseModel):
+    quantity_mwh: Decimal = Field(gt=0, max_digits=18, decimal_places=3)
+    energy_type: EnergyType | None = None
+    # Any day within the month; the target covers the whole calendar month.
+    delivery_month: date | None = None
+
+
+class PortfolioOptimizationRequest(BaseModel):
+    target_mwh: Decimal | None = Field(default=None, gt=0, max_digits=18, decimal_places=3)
+    targets: list[OptimizerTarget] = Field(default_factory=list, max_length=60)
+    budget: Decimal | None = Field(default=None, gt=0, max_digits=18, decimal_places=6)
+    filters: ContractFilters = Field(
+        default_factory=lambda: ContractFilters(status=ContractStatus.available)
+    )
+    locations: list[str] | None = Field(default=None, max_length=200)
+    max_candidates: int = Field(default=100_000, ge=1, le=500_000)
+    apply: bool = False
+
+    @model_validator(mode="after")
+    def validate_targets(self) -> "PortfolioOptimizationRequest":
+        if self.target_mwh is None and not self.targets:
+            raise ValueError("target_mwh or targets must be provided")
+        return self
+
+
+class OptimizationStatus(str, Enum):
+    feasible = "feasible"
+    insufficient_supply = "insufficient_supply"
+    over_budget = "over_budget"
+
+
+class OptimizerTargetResult(BaseModel):
+    energy_type: EnergyType | None
+    delivery_month: date | None
+    target_mwh: float
+    covered_mwh: float
+
+
+class PortfolioOptimizationResponse(BaseModel):
+    user_id: int
+    status: OptimizationStatus
+    applied: bool
+    added_contract_ids: list[int] = []
+    candidates_considered: int
+    total_cost: float
+    total_capacity_mwh: float
+    lower_bound_cost: float
+    targets: list[OptimizerTargetResult]
+    contracts: list[ContractRead]
+
+
+class JobKind(str, Enum):
+    export = "export"
+    bulk_update_contracts = "bulk_update_contracts"
+    optimize_portfolio = "optimize_portfolio"
+    rebuild_similarity_index = "rebuild_similarity_index"
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class ExportJobParams(BaseModel):
+    table: ExportTable
+    format: ExportFormat = ExportFormat.parquet
+    filters: ContractFilters = Field(default_factory=ContractFilters)
+    user_id: int | None = None
+
+
+class OptimizePortfolioJobParams(BaseModel):
+    user_id: int
+    request: PortfolioOptimizationRequest
+
+
+class RebuildSimilarityIndexJobParams(BaseModel):
+    pass
+
+
+JOB_PARAMS_MODELS: dict[JobKind, type[BaseModel]] = {
+    JobKind.export: ExportJobParams,
+    JobKind.bulk_update_contracts: ContractBulkUpdateRequest,
+    JobKind.optimize_portfolio: OptimizePortfolioJobParams,
+    JobKind.rebuild_similarity_index: RebuildSimilarityIndexJobParams,
+}
+
+
+class JobCreate(BaseModel):
+    kind: JobKind
+    # Validated against the kind's params model and stored in its JSON form.
+    params: dict = Field(default_factory=dict)
+
+    @model_validator(mode="after")
+    def validate_params(self) -> "JobCreate":
+        params_model = JOB_PARAMS_MODELS[self.kind]
+        self.params = params_model.model_validate(self.params).model_dump(
+            mode="json", exclude_unset=True
+        )
+        return self
+
+
+class JobRead(BaseModel):
+    id: int
+    kind: JobKind
+    status: JobStatus
+    progress: float
+    progress_message: str | None
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+    model_config = {"from_attributes": True}
+
+
+class EnergyTypeCommitmentRead(BaseModel):
+    energy_type: EnergyType
+    holdings: int
+    contracts: int
+    portfolios: int
+    committed_capacity_mwh: Decimal
+    committed_value: Decimal
+    model_config = {"from_attributes": True}
+
+
+class HeldContractRead(BaseModel):
+    contract_id: int
+    energy_type: EnergyType
+    location: str
+    quantity_mwh: Decimal
+    price_per_mwh: Decimal
+    holders: int
+    # Fraction of all holdings that are of this contract.
+    holding_share: float
+
+
+class HoldingConcentration(BaseModel):
+    total_holdings: int
+    held_contracts: int
+    max_holders: int
+    # Share of all holdings in the ``top`` most-held contracts.
+    top: int
+    top_share: float
+    # Herfindahl-Hirschman index of holding shares per contract, 0-1.
+    herfindahl_index: float
+
+
+class HolderCountBucket(BaseModel):
+    holders: int
+    contracts: int
+
+
+class RollupRefreshResult(BaseModel):
+    refreshed_at: datetime
+    elapsed_ms: float
@@ -0,0 +1,211 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+import logging
+import math
+import os
+import re
+import time
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+# Clients may send their own remaining budget; requests that cannot start in time are shed.
+REQUEST_TIMEOUT_HEADER = b"x-request-timeout-ms"
+# Weight of the newest sample in the moving average of service time.
+SERVICE_TIME_SMOOTHING = 0.2
+
+# Routes that scan, aggregate, or stream many rows; everything else is a point read or write.
+HEAVY_ROUTE_PATTERNS = [
+    re.compile(pattern)
+    for pattern in (
+        r"^/contracts/?$",
+        r"^/contracts/compare(/summary)?$",
+        r"^/contracts/bulk-update$",
+        r"^/contracts/\d+/similar$",
+        r"^/contracts/distribution$",
+        r"^/exports/",
+        r"^/portfolios/\d+/?$",
+        r"^/portfolios/\d+/(metrics|snapshot|holdings|holdings/stream|schedule|what-if|optimize)$",
+    )
+]
+
+
+# Long-lived streams hold no database connection while idle and would pin a slot forever.
+UNMETERED_ROUTE_PATTERNS = [re.compile(r"^/events/?$")]
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, *, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class AdmissionBudget:
+    """Concurrency budget with a bounded FIFO queue and deadline-aware rejection.
+
+    Up to ``max_concurrency`` requests run at once and up to ``max_queue`` wait.
+    A request is shed immediately when the queue is full or when the expected
+    wait (queue position x average service time / concurrency) already exceeds
+    its deadline, and shed after waiting if its deadline passes in the queue.
+    """
+
+    name: str
+    max_concurrency: int
+    max_queue: int
+    max_wait_seconds: float
+    in_flight: int = 0
+    admitted: int = 0
+    shed: dict[str, int] = field(
+        default_factory=lambda: {"queue_full": 0, "deadline": 0, "timeout": 0}
+    )
+    _service_time: float = 0.0
+    _waiters: deque[asyncio.Future] = field(default_factory=deque)
+
+    def estimated_wait(self) -> float:
+        return (len(self._waiters) + 1) * self._service_time / self.max_concurrency
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.shed[reason] += 1
+        retry_after = max(1, math.ceil(self.estimated_wait()))
+        logger.warning(f"Request shed: {self.name = }, {reason = }, {len(self._waiters) = }")
+        return AdmissionRejected(reason=reason, retry_after=retry_after)
+
+    async def acquire(self, deadline_seconds: float | None = None) -> None:
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        max_wait = self.max_wait_seconds
+        if deadline_seconds is not None:
+            max_wait = min(max_wait, deadline_seconds)
+        if self.estimated_wait() > max_wait:
+            raise self._reject("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=max_wait)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not waiter.done():
+            self._abandon(waiter)
+            raise self._reject("timeout")
+        # release() handed its slot to this waiter, so in_flight is already counted.
+        self.admitted += 1
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            # The slot was handed over just as the request gave up; pass it on.
+            self._hand_off()
+            return
+        waiter.cancel()
+        self._waiters.remove(waiter)
+
+    def release(self, elapsed_seconds: float) -> None:
+        self._service_time += SERVICE_TIME_SMOOTHING * (elapsed_seconds - self._service_time)
+        self._hand_off()
+
+    def _hand_off(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "avg_service_ms": 1000 * self._service_time,
+        }
+
+
+def _budget_from_env(
+    name: str, *, concurrency: int, queue: int, max_wait_ms: int
+) -> AdmissionBudget:
+    prefix = f"ADMISSION_{name.upper()}"
+    return AdmissionBudget(
+        name=name,
+        max_concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+        max_queue=int(os.getenv(f"{prefix}_QUEUE", str(queue))),
+        max_wait_seconds=int(os.getenv(f"{prefix}_MAX_WAIT_MS", str(max_wait_ms))) / 1000,
+    )
+
+
+# Heavy routes get a smaller share of the connection pool so point reads keep flowing.
+heavy_budget = _budget_from_env("heavy", concurrency=8, queue=32, max_wait_ms=2000)
+light_budget = _budget_from_env("light", concurrency=32, queue=128, max_wait_ms=500)
+
+
+def budget_for(path: str) -> AdmissionBudget:
+    if any(pattern.search(path) for pattern in HEAVY_ROUTE_PATTERNS):
+        return heavy_budget
+    return light_budget
+
+
+def admission_stats() -> list[dict]:
+    return [heavy_budget.stats(), light_budget.stats()]
+
+
+def _request_deadline(scope: Scope) -> float | None:
+    for header_name, header_value in scope.get("headers", []):
+        if header_name == REQUEST_TIMEOUT_HEADER:
+            try:
+                return max(0.0, float(header_value) / 1000)
+            except ValueError:
+                return None
+    return None
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware that admits each HTTP request through its route's budget.
+
+    Shed requests get an immediate ``503`` with ``Retry-After`` instead of
+    queueing on the database pool until the client times out.
+    """
+
+    def __init__(self, app: ASGIApp, *, enabled: bool = ADMISSION_CONTROL_ENABLED) -> None:
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not self.enabled
+            or any(pattern.search(scope["path"]) for pattern in UNMETERED_ROUTE_PATTERNS)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        budget = budget_for(scope["path"])
+        try:
+            await budget.acquire(_request_deadline(scope))
+        except AdmissionRejected as exc:
+            response = JSONResponse(
+                {"detail": "Service overloaded, please retry"},
+                status_code=503,
+                headers={"Retry-After": str(exc.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release(time.perf_counter() - started)
@@ -0,0 +1,214 @@
+import asyncio
+from collections.abc import Sequence
+from datetime import datetime, timezone
+import logging
+import os
+import time
+
+from sqlalchemy import BigInteger, cast, delete, desc, distinct, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import (
+    Contract,
+    ContractHolderRollup,
+    EnergyTypeHoldingRollup,
+    PortfolioHolding,
+)
+from app.schemas import (
+    HeldContractRead,
+    HolderCountBucket,
+    HoldingConcentration,
+    RollupRefreshResult,
+)
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_REFRESH_ENABLED = os.getenv("ANALYTICS_REFRESH_ENABLED", "true").lower() == "true"
+ANALYTICS_REFRESH_INTERVAL_SECONDS = float(
+    os.getenv("ANALYTICS_REFRESH_INTERVAL_SECONDS", "300")
+)
+# Optional; the /admin routes return 404 while unset and require it in X-Admin-Token once set.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Refreshed in this order, in one transaction, so both reflect the same snapshot.
+ROLLUP_VIEWS = ("contract_holder_rollups", "energy_type_holding_rollups")
+
+# The view definitions in sql/schema.sql; SQLite rewrites its tables from these.
+contract_holder_rollup_select = (
+    select(
+        Contract.id,
+        Contract.energy_type,
+        Contract.location_id,
+        Contract.quantity_mwh,
+        Contract.price_per_mwh,
+        func.count(),
+    )
+    .join_from(PortfolioHolding, Contract, PortfolioHolding.contract_id == Contract.id)
+    .group_by(
+        Contract.id,
+        Contract.energy_type,
+        Contract.location_id,
+        Contract.quantity_mwh,
+        Contract.price_per_mwh,
+    )
+)
+energy_type_holding_rollup_select = (
+    select(
+        Contract.energy_type,
+        func.count(),
+        func.count(distinct(PortfolioHolding.contract_id)),
+        func.count(distinct(PortfolioHolding.portfolio_id)),
+        func.sum(Contract.quantity_mwh),
+        func.sum(Contract.total_value),
+    )
+    .join_from(PortfolioHolding, Contract, PortfolioHolding.contract_id == Contract.id)
+    .group_by(Contract.energy_type)
+)
+
+
+async def refresh_holding_rollups(*, session: AsyncSession) -> RollupRefreshResult:
+    """Recompute the holdings rollups from ``portfolio_holdings`` joined to ``contracts``.
+
+    On PostgreSQL this is ``REFRESH MATERIALIZED VIEW CONCURRENTLY``, so readers keep
+    seeing the previous contents until the refresh commits.
+    """
+    started = time.perf_counter()
+    try:
+        if session.bind is not None and session.bind.dialect.name == "postgresql":
+            for view in ROLLUP_VIEWS:
+                await session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+        else:
+            await session.execute(delete(ContractHolderRollup))
+            await session.execute(delete(EnergyTypeHoldingRollup))
+            await session.execute(
+                insert(ContractHolderRollup).from_select(
+                    [
+                        "contract_id",
+                        "energy_type",
+                        "location_id",
+                        "quantity_mwh",
+                        "price_per_mwh",
+                        "holders",
+                    ],
+                    contract_holder_rollup_select,
+                )
+            )
+            await session.execute(
+                insert(EnergyTypeHoldingRollup).from_select(
+                    [
+                        "energy_type",
+                        "holdings",
+                        "contracts",
+                        "portfolios",
+                        "committed_capacity_mwh",
+                        "committed_value",
+                    ],
+                    energy_type_holding_rollup_select,
+                )
+            )
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        logger.exception("Holding rollup refresh failed")
+        raise
+    elapsed_ms = round(1000 * (time.perf_counter() - started), 1)
+    logger.info(f"Holding rollups refreshed: {elapsed_ms = }")
+    return RollupRefreshResult(refreshed_at=datetime.now(timezone.utc), elapsed_ms=elapsed_ms)
+
+
+async def run_rollup_refresher(
+    *,
+    session_factory: async_sessionmaker[AsyncSession],
+    interval_seconds: float = ANALYTICS_REFRESH_INTERVAL_SECONDS,
+) -> None:
+    """Refresh every ``interval_seconds`` until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            async with session_factory() as session:
+                await refresh_holding_rollups(session=session)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Readers keep the last refreshed contents; retried next interval.
+            logger.exception("Scheduled holding rollup refresh failed")
+
+
+async def _total_holdings(session: AsyncSession) -> int:
+    # One row per energy type, so this never reads the per-contract rollup.
+    statement = select(func.coalesce(func.sum(EnergyTypeHoldingRollup.holdings), 0))
+    return int((await session.execute(statement)).scalar_one())
+
+
+async def list_energy_type_commitments(
+    *, session: AsyncSession
+) -> Sequence[EnergyTypeHoldingRollup]:
+    statement = select(EnergyTypeHoldingRollup).order_by(
+        desc(EnergyTypeHoldingRollup.committed_capacity_mwh), EnergyTypeHoldingRollup.energy_type
+    )
+    return (await session.execute(statement)).scalars().all()
+
+
+async def list_most_held_contracts(*, session: AsyncSession, limit: int) -> list[HeldContractRead]:
+    """Contracts with the most holders; ties go to the newest contract."""
+    total_holdings = await _total_holdings(session)
+    # Matches idx_contract_holder_rollups_holders read backwards, so top-N stops early.
+    statement = (
+        select(ContractHolderRollup)
+        .order_by(desc(ContractHolderRollup.holders), desc(ContractHolderRollup.contract_id))
+        .limit(limit)
+    )
+    rollups = (await session.execute(statement)).scalars().all()
+    return [
+        HeldContractRead(
+            contract_id=rollup.contract_id,
+            energy_type=rollup.energy_type,
+            location=rollup.location,
+            quantity_mwh=rollup.quantity_mwh,
+            price_per_mwh=rollup.price_per_mwh,
+            holders=rollup.holders,
+            holding_share=rollup.holders / total_holdings if total_holdings else 0.0,
+        )
+        for rollup in rollups
+    ]
+
+
+async def get_holding_concentration(*, session: AsyncSession, top: int) -> HoldingConcentration:
+    total_holdings = await _total_holdings(session)
+    summary_statement = select(
+        func.count(),
+        func.coalesce(func.max(ContractHolderRollup.holders), 0),
+        func.coalesce(
+            func.sum(cast(ContractHolderRollup.holders, BigInteger) * ContractHolderRollup.holders),
+            0,
+        ),
+    )
+    held_contracts, max_holders, sum_of_squares = (await session.execute(summary_statement)).one()
+    top_holders = (
+        select(ContractHolderRollup.holders)
+        .order_by(desc(ContractHolderRollup.holders), desc(ContractHolderRollup.contract_id))
+        .limit(top)
+        .subquery()
+    )
+    top_statement = select(func.coalesce(func.sum(top_holders.c.holders), 0))
+    top_total = (await session.execute(top_statement)).scalar_one()
+    return HoldingConcentration(
+        total_holdings=total_holdings,
+        held_contracts=held_contracts,
+        max_holders=max_holders,
+        top=top,
+        top_share=top_total / total_holdings if total_holdings else 0.0,
+        herfindahl_index=sum_of_squares / total_holdings**2 if total_holdings else 0.0,
+    )
+
+
+async def list_contracts_by_holder_count(*, session: AsyncSession) -> list[HolderCountBucket]:
+    statement = (
+        select(ContractHolderRollup.holders, func.count())
+        .group_by(ContractHolderRollup.holders)
+        .order_by(ContractHolderRollup.holders)
+    )
+    return [
+        HolderCountBucket(holders=holders, contracts=contracts)
+        for holders, contracts in (await session.execute(statement)).all()
+    ]
@@ -0,0 +1,129 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+import logging
+import os
+from typing import Any, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+COALESCING_ENABLED = os.getenv("READ_COALESCING_ENABLED", "true").lower() == "true"
+
+
+class LeaderCancelled(Exception):
+    """Raised to followers when the request running the shared query was cancelled."""
+
+
+@dataclass
+class _Flight:
+    future: asyncio.Future
+    followers: int = 0
+
+
+@dataclass
+class SingleFlight:
+    """Share one in-flight coroutine between concurrent callers with the same key.
+
+    The first caller (leader) runs the query; callers arriving while it is in flight
+    (followers) await the same result instead of issuing an identical query. Results
+    are shared objects and must be treated as read-only. If the leader is cancelled
+    (client disconnect), followers fall back to running their own query.
+    """
+
+    name: str
+    leaders: int = 0
+    followers: int = 0
+    _flights: dict[Hashable, _Flight] = field(default_factory=dict)
+
+    async def run(self, key: Hashable, query: Callable[[], Awaitable[T]]) -> T:
+        if not COALESCING_ENABLED:
+            return await query()
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.followers += 1
+            self.followers += 1
+            try:
+                return await asyncio.shield(flight.future)
+            except LeaderCancelled:
+                return await query()
+
+        flight = _Flight(future=asyncio.get_running_loop().create_future())
+        self._flights[key] = flight
+        self.leaders += 1
+        try:
+            result = await query()
+        except asyncio.CancelledError:
+            self._finish(key, flight, exception=LeaderCancelled())
+            raise
+        except Exception as exc:
+            self._finish(key, flight, exception=exc)
+            raise
+        self._finish(key, flight, result=result)
+        return result
+
+    def _finish(
+        self,
+        key: Hashable,
+        flight: _Flight,
+        *,
+        result: Any = None,
+        exception: BaseException | None = None,
+    ) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if exception is None:
+            flight.future.set_result(result)
+        elif flight.followers:
+            flight.future.set_exception(exception)
+        else:
+            # Nobody is waiting; cancelling avoids an "exception never retrieved" warning.
+            flight.future.cancel()
+
+    def stats(self) -> dict:
+        total = self.leaders + self.followers
+        return {
+            "name": self.name,
+            "in_flight": len(self._flights),
+            "queries_executed": self.leaders,
+            "requests_coalesced": self.followers,
+            "dedup_ratio": self.followers / total if total else 0.0,
+        }
+
+
+_registry: dict[str, SingleFlight] = {}
+
+
+def single_flight(name: str) -> SingleFlight:
+    if name not in _registry:
+        _registry[name] = SingleFlight(name=name)
+    return _registry[name]
+
+
+def coalescing_stats() -> list[dict]:
+    return [flight.stats() for flight in _registry.values()]
+
+
+# Execution options that change what a transaction may see or do.
+TRANSACTION_OPTIONS = ("isolation_level", "postgresql_readonly", "postgresql_deferrable")
+
+
+def bind_key(session: AsyncSession) -> Hashable:
+    """Key of the engine ``session`` runs on, including its transaction options.
+
+    Requests on different databases (primary vs replica) or different transaction
+    modes (read-write, ``READ ONLY``, ``SERIALIZABLE`` snapshot) never share results,
+    even when the engines have the same URL. Option views of one engine share its pool.
+    """
+    bind = session.bind
+    if bind is None:
+        return None
+    options = bind.sync_engine.get_execution_options()
+    return (
+        bind.sync_engine.pool,
+        tuple((name, options.get(name)) for name in TRANSACTION_OPTIONS),
+    )
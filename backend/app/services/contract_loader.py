@@ -0,0 +1,99 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.schemas import ContractRead
+from app.services.coalescing import bind_key
+
+logger = logging.getLogger(__name__)
+
+FetchContracts = Callable[[AsyncSession, Sequence[int]], Awaitable[Sequence[ContractRead]]]
+
+
+class _Batch:
+    def __init__(self, bind: AsyncEngine) -> None:
+        self.bind = bind
+        self.futures: dict[int, asyncio.Future] = {}
+
+
+class ContractLoader:
+    """Collect contract-by-id lookups from concurrent requests into one ``IN`` query.
+
+    Lookups against the same database that arrive within ``window_seconds`` (or the
+    same event-loop tick when the window is 0) share a batch, which is dispatched
+    when the window closes or it reaches ``max_batch_size`` ids. Each batch runs in
+    its own short-lived session on the caller's engine and returns ``ContractRead``
+    data, which is shared between requests and must be treated as read-only.
+    """
+
+    def __init__(
+        self, *, fetch: FetchContracts, max_batch_size: int, window_seconds: float
+    ) -> None:
+        self.fetch = fetch
+        self.max_batch_size = max_batch_size
+        self.window_seconds = window_seconds
+        self.batches_dispatched = 0
+        self.ids_requested = 0
+        self.ids_queried = 0
+        self._pending: dict[Hashable, _Batch] = {}
+        self._running: set[asyncio.Task] = set()
+
+    async def load(self, *, session: AsyncSession, contract_id: int) -> ContractRead | None:
+        loop = asyncio.get_running_loop()
+        key = bind_key(session)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _Batch(session.bind)
+            self._pending[key] = batch
+            if self.window_seconds > 0:
+                loop.call_later(self.window_seconds, self._dispatch, key, batch)
+            else:
+                loop.call_soon(self._dispatch, key, batch)
+
+        self.ids_requested += 1
+        future = batch.futures.get(contract_id)
+        if future is None:
+            future = loop.create_future()
+            batch.futures[contract_id] = future
+            if len(batch.futures) >= self.max_batch_size:
+                self._dispatch(key, batch)
+        # Shield so one cancelled request does not cancel the lookup for the others.
+        return await asyncio.shield(future)
+
+    def _dispatch(self, key: Hashable, batch: _Batch) -> None:
+        if self._pending.get(key) is not batch:
+            return
+        del self._pending[key]
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: _Batch) -> None:
+        contract_ids = list(batch.futures)
+        self.batches_dispatched += 1
+        self.ids_queried += len(contract_ids)
+        try:
+            async with AsyncSession(bind=batch.bind, expire_on_commit=False) as session:
+                contracts = await self.fetch(session, contract_ids)
+        except Exception as exc:
+            logger.exception(f"Contract batch load failed: {len(contract_ids) = }")
+            for future in batch.futures.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        contract_by_id = {contract.id: contract for contract in contracts}
+        for contract_id, future in batch.futures.items():
+            if not future.done():
+                future.set_result(contract_by_id.get(contract_id))
+
+    def stats(self) -> dict:
+        return {
+            "batches_dispatched": self.batches_dispatched,
+            "ids_requested": self.ids_requested,
+            "ids_queried": self.ids_queried,
+            "avg_batch_size": (
+                self.ids_queried / self.batches_dispatched if self.batches_dispatched else 0.0
+            ),
+        }
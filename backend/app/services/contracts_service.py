@@ -1,97 +1,138 @@
 from collections.abc import Sequence
 import logging
+import os
 from typing import Optional
 
-from sqlalchemy import asc, desc, or_, select
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Contract
-from app.schemas import ContractCreate, ContractFilters, ContractSortBy, ContractSortDirection, ContractUpdate
+from app.repositories import contract_repository
+from app.schemas import (
+    ContractCreate,
+    ContractDeletedEvent,
+    ContractFilters,
+    ContractRead,
+    ContractUpdate,
+)
+from app.services.coalescing import bind_key, single_flight
+from app.services.contract_loader import ContractLoader
+from app.services.distribution_service import distribution_index
+from app.services.events import change_feed
+from app.services.recommendations_service import similarity_index
 
 logger = logging.getLogger(__name__)
 
+# Identical concurrent reads (e.g. the default listing at market open) share one query.
+list_contracts_flight = single_flight("contracts.list")
+contracts_by_ids_flight = single_flight("contracts.by_ids")
+contract_measures_flight = single_flight("contracts.measures")
+# Concurrent by-id lookups are folded into one IN query. Lookups made in the same
+# event-loop tick share a batch; a time window (CONTRACT_LOADER_WINDOW_MS) is opt-in,
+# since it delays every lookup by up to that long.
+contract_loader = ContractLoader(
+    fetch=lambda session, contract_ids: list_contracts_by_ids(
+        session=session, contract_ids=contract_ids
+    ),
+    max_batch_size=int(os.getenv("CONTRACT_LOADER_MAX_BATCH_SIZE", "200")),
+    window_seconds=float(os.getenv("CONTRACT_LOADER_WINDOW_MS", "0")) / 1000,
+)
+
+
+def contract_filters_key(filters: ContractFilters) -> str:
+    """Canonical form of ``filters`` so equivalent queries share a coalescing key."""
+    normalized = filters.model_copy(
+        update={
+            "energy_types": (
+                sorted(set(filters.energy_types), key=lambda energy_type: energy_type.value)
+                if filters.energy_types
+                else None
+            ),
+            "location": filters.location.strip().lower() if filters.location else None,
+            "search": filters.search.strip().lower() if filters.search else None,
+        }
+    )
+    return normalized.model_dump_json()
+
 
 async def list_contracts(
     *, session: AsyncSession, offset: int, limit: int, filters: ContractFilters
-) -> Sequence[Contract]:
-    statement = select(Contract)
-    filter_conditions = []
-
-    if filters.energy_types:
-        filter_conditions.append(
-            Contract.energy_type.in_([energy_type.value for energy_type in filters.energy_types])
-        )
-    if filters.status:
-        filter_conditions.append(Contract.status == filters.status.value)
-    if filters.price_min is not None:
-        filter_conditions.append(Contract.price_per_mwh >= filters.price_min)
-    if filters.price_max is not None:
-        filter_conditions.append(Contract.price_per_mwh <= filters.price_max)
-    if filters.quantity_min is not None:
-        filter_conditions.append(Contract.quantity_mwh >= filters.quantity_min)
-    if filters.quantity_max is not None:
-        filter_conditions.append(Contract.quantity_mwh <= filters.quantity_max)
-    if filters.location:
-        filter_conditions.append(Contract.location.ilike(f"%{filters.location.strip()}%"))
-    if filters.delivery_start_from is not None:
-        filter_conditions.append(Contract.delivery_end >= filters.delivery_start_from)
-    if filters.delivery_end_to is not None:
-        filter_conditions.append(Contract.delivery_start <= filters.delivery_end_to)
-    if filters.search:
-        search_term = f"%{filters.search.strip()}%"
-        filter_conditions.append(
-            or_(
-                Contract.location.ilike(search_term),
-                Contract.energy_type.ilike(search_term),
-                Contract.status.ilike(search_term),
-            )
-        )
-
-    if filter_conditions:
-        statement = statement.where(*filter_conditions)
-
-    sort_column = Contract.id
-    if filters.sort_by == ContractSortBy.price_per_mwh:
-        sort_column = Contract.price_per_mwh
-    elif filters.sort_by == ContractSortBy.quantity_mwh:
-        sort_column = Contract.quantity_mwh
-    elif filters.sort_by == ContractSortBy.delivery_start:
-        sort_column = Contract.delivery_start
-
-    sort_direction = filters.sort_direction or ContractSortDirection.asc
-    order_clause = asc(sort_column) if sort_direction == ContractSortDirection.asc else desc(sort_column)
-
-    statement = statement.order_by(order_clause, Contract.id).offset(offset).limit(limit)
-    result = await session.execute(statement)
-    return result.scalars().all()
+) -> Sequence[ContractRead]:
+    """Filtered contract page, shared as detached ``ContractRead`` data."""
+    key = (bind_key(session), offset, limit, contract_filters_key(filters))
+    return await list_contracts_flight.run(
+        key,
+        lambda: _query_contracts(session=session, offset=offset, limit=limit, filters=filters),
+    )
+
+
+async def _query_contracts(
+    *, session: AsyncSession, offset: int, limit: int, filters: ContractFilters
+) -> list[ContractRead]:
+    # Followers get plain data, never instances attached to the leader's session.
+    contracts = await contract_repository(session).list(
+        filters=filters, offset=offset, limit=limit
+    )
+    return [ContractRead.model_validate(contract) for contract in contracts]
 
 
 async def list_contracts_by_ids(
     *, session: AsyncSession, contract_ids: Sequence[int]
-) -> Sequence[Contract]:
+) -> Sequence[ContractRead]:
     if not contract_ids:
         return []
-    statement = select(Contract).where(Contract.id.in_(contract_ids))
-    result = await session.execute(statement)
-    return result.scalars().all()
+    key = (bind_key(session), tuple(sorted(set(contract_ids))))
+    return await contracts_by_ids_flight.run(
+        key, lambda: _query_contracts_by_ids(session=session, contract_ids=contract_ids)
+    )
+
+
+async def _query_contracts_by_ids(
+    *, session: AsyncSession, contract_ids: Sequence[int]
+) -> list[ContractRead]:
+    contracts = await contract_repository(session).get_many(contract_ids)
+    return [ContractRead.model_validate(contract) for contract in contracts]
+
+
+async def list_contract_measures(
+    *, session: AsyncSession, filters: ContractFilters, limit: int
+) -> Sequence[Row]:
+    """Return (id, price, quantity, total_value, duration_days) rows for a filtered set."""
+    key = (bind_key(session), limit, contract_filters_key(filters))
+    return await contract_measures_flight.run(
+        key, lambda: _query_contract_measures(session=session, filters=filters, limit=limit)
+    )
 
 
-async def get_contract_by_id(*, session: AsyncSession, contract_id: int) -> Optional[Contract]:
-    statement = select(Contract).where(Contract.id == contract_id)
-    result = await session.execute(statement)
-    return result.scalar_one_or_none()
+async def _query_contract_measures(
+    *, session: AsyncSession, filters: ContractFilters, limit: int
+) -> Sequence[Row]:
+    return await contract_repository(session).list_measures(filters=filters, limit=limit)
+
+
+async def get_contract_by_id(
+    *, session: AsyncSession, contract_id: int
+) -> Optional[ContractRead]:
+    """Batched read-only lookup; the returned contract is plain data shared between requests."""
+    return await contract_loader.load(session=session, contract_id=contract_id)
+
+
+async def get_contract_for_update(
+    *, session: AsyncSession, contract_id: int
+) -> Optional[Contract]:
+    """Load a contract into ``session`` (row-locked on PostgreSQL) for update or delete."""
+    return await contract_repository(session).get_for_update(contract_id)
+
+
+def publish_contract_change(event_type: str, contract: Contract) -> None:
+    change_feed.publish(event_type, ContractRead.model_validate(contract).model_dump_json())
 
 
 async def create_contract(*, session: AsyncSession, payload: ContractCreate) -> Contract:
-    contract = Contract(**payload.model_dump())
-    session.add(contract)
-    try:
-        await session.commit()
-        await session.refresh(contract)
-    except Exception:
-        await session.rollback()
-        logger.exception("Create contract failed", extra={"payload": payload})
-        raise
+    contract = await contract_repository(session).add(payload.model_dump())
+    similarity_index.upsert(contract)
+    distribution_index.upsert(contract)
+    publish_contract_change("contract.created", contract)
     logger.info(f"Contract created: {contract.id = }")
     return contract
 
@@ -99,26 +140,39 @@ async def create_contract(*, session: AsyncSession, payload: ContractCreate) ->
 async def update_contract(
     *, session: AsyncSession, contract: Contract, payload: ContractUpdate
 ) -> Contract:
-    update_data = payload.model_dump(exclude_unset=True)
-    for field_name, field_value in update_data.items():
-        setattr(contract, field_name, field_value)
-    try:
-        await session.commit()
-        await session.refresh(contract)
-    except Exception:
-        await session.rollback()
-        logger.exception("Update contract failed", extra={"contract_id": contract.id})
-        raise
+    contract = await contract_repository(session).update(
+        contract, payload.model_dump(exclude_unset=True)
+    )
+    similarity_index.upsert(contract)
+    distribution_index.upsert(contract)
+    publish_contract_change("contract.updated", contract)
     logger.info(f"Contract updated: {contract.id = }")
     return contract
 
 
+async def bulk_update_contracts(
+    *,
+    session: AsyncSession,
+    payload: ContractUpdate,
+    contract_ids: Sequence[int] | None = None,
+    filters: ContractFilters | None = None,
+) -> Sequence[Contract]:
+    """Apply ``payload`` to ``contract_ids`` or, when None, to the ``filters`` selection."""
+    update_data = payload.model_dump(exclude_unset=True)
+    contracts = await contract_repository(session).bulk_update(
+        update_data, contract_ids=contract_ids, filters=filters
+    )
+    for contract in contracts:
+        similarity_index.upsert(contract)
+        distribution_index.upsert(contract)
+        publish_contract_change("contract.updated", contract)
+    logger.info(f"Contracts bulk updated: {len(contracts) = }, fields={sorted(update_data)}")
+    return contracts
+
+
 async def delete_contract(*, session: AsyncSession, contract: Contract) -> None:
-    await session.delete(contract)
-    try:
-        await session.commit()
-    except Exception:
-        await session.rollback()
-        logger.exception("Delete contract failed", extra={"contract_id": contract.id})
-        raise
+    await contract_repository(session).delete(contract)
+    similarity_index.remove(contract.id)
+    distribution_index.remove(contract.id)
+    change_feed.publish("contract.deleted", ContractDeletedEvent(id=contract.id).model_dump_json())
     logger.info(f"Contract deleted: {contract.id = }")
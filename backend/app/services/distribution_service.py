@@ -0,0 +1,254 @@
+import asyncio
+from collections.abc import Iterable
+import logging
+import math
+import os
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Contract
+from app.repositories import contract_repository
+from app.schemas import (
+    ContractDistributionResponse,
+    ContractStatus,
+    EnergyType,
+    HistogramBin,
+    MetricDistribution,
+)
+
+logger = logging.getLogger(__name__)
+
+# Quantile estimates are within this relative error of a value at the requested rank.
+DISTRIBUTION_RELATIVE_ACCURACY = float(os.getenv("DISTRIBUTION_RELATIVE_ACCURACY", "0.01"))
+DISTRIBUTION_REBUILD_BATCH_SIZE = 10_000
+REPORTED_QUANTILES = (0.1, 0.5, 0.9)
+
+# (energy_type, location, status): the finest cell; queries merge the matching cells.
+CellKey = tuple[str, str, str]
+
+
+class QuantileSketch:
+    """DDSketch: counts in logarithmic buckets ``(gamma**(k-1), gamma**k]``.
+
+    Every value in a bucket is within ``relative_accuracy`` of the bucket's
+    representative, which bounds the error of any quantile. Sketches merge by
+    adding bucket counts, and, unlike t-digest or KLL, a value can be removed
+    exactly by decrementing its bucket, so updates and deletes need no rebuild.
+    Values must be positive.
+    """
+
+    def __init__(self, relative_accuracy: float = DISTRIBUTION_RELATIVE_ACCURACY) -> None:
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._bins: dict[int, int] = {}
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _representative(self, key: int) -> float:
+        return 2 * self._gamma**key / (self._gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        key = self._key(value)
+        self._bins[key] = self._bins.get(key, 0) + count
+        self.count += count
+
+    def remove(self, value: float) -> None:
+        key = self._key(value)
+        remaining = self._bins.get(key, 0) - 1
+        if remaining < 0:
+            return
+        if remaining:
+            self._bins[key] = remaining
+        else:
+            del self._bins[key]
+        self.count -= 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for key, count in other._bins.items():
+            self._bins[key] = self._bins.get(key, 0) + count
+        self.count += other.count
+
+    def quantiles(self, qs: Iterable[float]) -> list[float | None]:
+        qs = list(qs)
+        if not self.count:
+            return [None] * len(qs)
+        ranks = sorted((q * (self.count - 1), position) for position, q in enumerate(qs))
+        estimates: list[float | None] = [None] * len(qs)
+        cumulative = 0
+        pending = iter(ranks)
+        rank, position = next(pending)
+        for key in sorted(self._bins):
+            cumulative += self._bins[key]
+            while cumulative > rank:
+                estimates[position] = self._representative(key)
+                try:
+                    rank, position = next(pending)
+                except StopIteration:
+                    return estimates
+        return estimates
+
+    def histogram(self, bins: int) -> list[HistogramBin]:
+        """``bins`` equal-width bins between the lowest and highest bucket."""
+        if not self.count:
+            return []
+        keys = sorted(self._bins)
+        low, high = self._representative(keys[0]), self._representative(keys[-1])
+        width = (high - low) / bins or 1.0
+        counts = [0] * bins
+        for key in keys:
+            position = min(int((self._representative(key) - low) / width), bins - 1)
+            counts[position] += self._bins[key]
+        return [
+            HistogramBin(
+                lower=low + position * width, upper=low + (position + 1) * width, count=count
+            )
+            for position, count in enumerate(counts)
+        ]
+
+    def describe(self, bins: int) -> MetricDistribution:
+        p10, p50, p90 = self.quantiles(REPORTED_QUANTILES)
+        low, high = self.quantiles((0.0, 1.0))
+        return MetricDistribution(
+            min=low, p10=p10, p50=p50, p90=p90, max=high, histogram=self.histogram(bins)
+        )
+
+
+class ContractDistributionIndex:
+    """Price and quantity sketches per (energy type, location, status) cell.
+
+    Writes in this process update the cells in place; like the similarity
+    index, the whole index is rebuilt from one scan when first used and once it
+    is older than ``max_age_seconds``, which picks up other workers' writes.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_age_seconds: float,
+        relative_accuracy: float = DISTRIBUTION_RELATIVE_ACCURACY,
+    ) -> None:
+        self.max_age_seconds = max_age_seconds
+        self.relative_accuracy = relative_accuracy
+        self._lock = asyncio.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._cells: dict[CellKey, tuple[QuantileSketch, QuantileSketch]] = {}
+        # Last indexed values per contract, so an update or delete removes exactly them.
+        self._entries: dict[int, tuple[CellKey, float, float]] = {}
+        self._built_at: float | None = None
+
+    @property
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _needs_rebuild(self) -> bool:
+        return self._built_at is None or time.monotonic() - self._built_at > self.max_age_seconds
+
+    async def ensure_ready(self, session: AsyncSession) -> None:
+        if not self._needs_rebuild():
+            return
+        async with self._lock:
+            if self._needs_rebuild():
+                await self.rebuild(session)
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        """Rebuild from one streamed scan of the contracts table."""
+        started = time.perf_counter()
+        self.reset()
+        batches = contract_repository(session).scan(batch_size=DISTRIBUTION_REBUILD_BATCH_SIZE)
+        async for rows in batches:
+            for row in rows:
+                cell = (row.energy_type, row.location, row.status)
+                self._add(row.id, cell, float(row.price_per_mwh), float(row.quantity_mwh))
+        self._built_at = time.monotonic()
+        logger.info(
+            f"Distribution index rebuilt: {self.size = }, "
+            f"elapsed_ms={1000 * (time.perf_counter() - started):.1f}"
+        )
+
+    def _add(self, contract_id: int, cell: CellKey, price: float, quantity: float) -> None:
+        sketches = self._cells.get(cell)
+        if sketches is None:
+            sketches = self._cells[cell] = (
+                QuantileSketch(self.relative_accuracy),
+                QuantileSketch(self.relative_accuracy),
+            )
+        sketches[0].add(price)
+        sketches[1].add(quantity)
+        self._entries[contract_id] = (cell, price, quantity)
+
+    def remove(self, contract_id: int) -> None:
+        entry = self._entries.pop(contract_id, None)
+        if entry is None:
+            return
+        cell, price, quantity = entry
+        price_sketch, quantity_sketch = self._cells[cell]
+        price_sketch.remove(price)
+        quantity_sketch.remove(quantity)
+        if not price_sketch.count:
+            del self._cells[cell]
+
+    def upsert(self, contract: Contract) -> None:
+        if self._built_at is None:
+            return
+        self.remove(contract.id)
+        self._add(
+            contract.id,
+            (contract.energy_type, contract.location, contract.status),
+            float(contract.price_per_mwh),
+            float(contract.quantity_mwh),
+        )
+
+    def query(
+        self,
+        *,
+        energy_types: Iterable[EnergyType] | None = None,
+        locations: Iterable[str] | None = None,
+        statuses: Iterable[ContractStatus] | None = None,
+        bins: int = 20,
+    ) -> ContractDistributionResponse:
+        """Merge the cells matching every given dimension (all cells when none are)."""
+        energy_type_values = {item.value for item in energy_types} if energy_types else None
+        location_values = {item.strip() for item in locations} if locations else None
+        status_values = {item.value for item in statuses} if statuses else None
+        prices = QuantileSketch(self.relative_accuracy)
+        quantities = QuantileSketch(self.relative_accuracy)
+        for (energy_type, location, status), (price_sketch, quantity_sketch) in self._cells.items():
+            if energy_type_values is not None and energy_type not in energy_type_values:
+                continue
+            if location_values is not None and location not in location_values:
+                continue
+            if status_values is not None and status not in status_values:
+                continue
+            prices.merge(price_sketch)
+            quantities.merge(quantity_sketch)
+        return ContractDistributionResponse(
+            count=prices.count,
+            relative_accuracy=self.relative_accuracy,
+            price_per_mwh=prices.describe(bins),
+            quantity_mwh=quantities.describe(bins),
+        )
+
+
+distribution_index = ContractDistributionIndex(
+    max_age_seconds=float(os.getenv("DISTRIBUTION_INDEX_MAX_AGE_SECONDS", "300"))
+)
+
+
+async def get_contract_distribution(
+    *,
+    session: AsyncSession,
+    energy_types: Iterable[EnergyType] | None = None,
+    locations: Iterable[str] | None = None,
+    statuses: Iterable[ContractStatus] | None = None,
+    bins: int = 20,
+) -> ContractDistributionResponse:
+    await distribution_index.ensure_ready(session)
+    return distribution_index.query(
+        energy_types=energy_types, locations=locations, statuses=statuses, bins=bins
+    )
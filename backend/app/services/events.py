@@ -0,0 +1,154 @@
+import asyncio
+from collections import Counter, deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+import logging
+import os
+import secrets
+
+logger = logging.getLogger(__name__)
+
+# Events are kept for resume after a reconnect; older Last-Event-IDs get a reset.
+CHANGE_FEED_REPLAY_SIZE = int(os.getenv("CHANGE_FEED_REPLAY_SIZE", "1024"))
+# Per-connection buffer; a client that falls this far behind is told to resync.
+CHANGE_FEED_QUEUE_SIZE = int(os.getenv("CHANGE_FEED_QUEUE_SIZE", "256"))
+CHANGE_FEED_KEEPALIVE_SECONDS = float(os.getenv("CHANGE_FEED_KEEPALIVE_SECONDS", "15"))
+
+RESET_EVENT = "reset"
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    epoch: str
+    sequence: int
+    type: str
+    data: str
+    # Portfolio events only go to subscribers of that user; contract events go to all.
+    user_id: int | None = None
+
+    @property
+    def id(self) -> str:
+        return f"{self.epoch}-{self.sequence}"
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n"
+
+
+@dataclass(eq=False)
+class Subscription:
+    user_id: int | None
+    queue: asyncio.Queue[ChangeEvent] = field(
+        default_factory=lambda: asyncio.Queue(maxsize=CHANGE_FEED_QUEUE_SIZE)
+    )
+
+    def wants(self, event: ChangeEvent) -> bool:
+        return event.user_id is None or event.user_id == self.user_id
+
+
+class ChangeFeed:
+    """In-process fan-out of change events to Server-Sent Events subscribers.
+
+    Publishing never blocks a write: each subscriber has a bounded queue, and one
+    that overflows (a stalled client) has its backlog dropped and receives a
+    ``reset`` event telling it to refetch. Event ids are ``<epoch>-<sequence>``;
+    a reconnect with a ``Last-Event-ID`` from this process that is still in the
+    replay buffer resumes exactly, anything else gets a ``reset``. Events are
+    per worker process, which matches the single-worker deployment.
+    """
+
+    def __init__(self, *, replay_size: int = CHANGE_FEED_REPLAY_SIZE) -> None:
+        self.epoch = secrets.token_hex(4)
+        self._sequence = 0
+        self._replay: deque[ChangeEvent] = deque(maxlen=replay_size)
+        self._subscribers: set[Subscription] = set()
+        self._subscribers_by_user: Counter[int | None] = Counter()
+        self.published = 0
+        self.overflows = 0
+
+    def has_subscribers(self, user_id: int | None = None) -> bool:
+        if user_id is None:
+            return bool(self._subscribers)
+        return self._subscribers_by_user[user_id] > 0
+
+    def publish(self, event_type: str, data: str, *, user_id: int | None = None) -> None:
+        self._sequence += 1
+        event = ChangeEvent(
+            epoch=self.epoch, sequence=self._sequence, type=event_type, data=data, user_id=user_id
+        )
+        self._replay.append(event)
+        self.published += 1
+        for subscriber in self._subscribers:
+            if not subscriber.wants(event):
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._overflow(subscriber)
+
+    def _overflow(self, subscriber: Subscription) -> None:
+        self.overflows += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        # The backlog is gone, so the client must refetch; later events queue as usual.
+        subscriber.queue.put_nowait(self._reset_event())
+        logger.warning(f"Change feed subscriber overflowed: {subscriber.user_id = }")
+
+    def _replay_after(self, last_event_id: str | None) -> list[ChangeEvent] | None:
+        """Events after ``last_event_id``, or None if it cannot be resumed from here."""
+        if last_event_id is None:
+            return []
+        epoch, _, sequence = last_event_id.partition("-")
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        sequence_number = int(sequence)
+        oldest_buffered = self._sequence - len(self._replay) + 1
+        if sequence_number > self._sequence or sequence_number + 1 < oldest_buffered:
+            return None
+        return [event for event in self._replay if event.sequence > sequence_number]
+
+    def _reset_event(self) -> ChangeEvent:
+        return ChangeEvent(epoch=self.epoch, sequence=self._sequence, type=RESET_EVENT, data="{}")
+
+    async def subscribe(
+        self,
+        *,
+        user_id: int | None = None,
+        last_event_id: str | None = None,
+        keepalive_seconds: float = CHANGE_FEED_KEEPALIVE_SECONDS,
+    ) -> AsyncIterator[str]:
+        """Yield encoded SSE frames for one client until it disconnects."""
+        subscriber = Subscription(user_id=user_id)
+        # Registered before replaying so nothing published in between is missed.
+        self._subscribers.add(subscriber)
+        self._subscribers_by_user[user_id] += 1
+        try:
+            missed = self._replay_after(last_event_id)
+            if missed is None:
+                yield self._reset_event().encode()
+            else:
+                for event in missed:
+                    if subscriber.wants(event):
+                        yield event.encode()
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), keepalive_seconds)
+                except TimeoutError:
+                    # Comment frames keep idle connections open through proxies.
+                    yield ": keepalive\n\n"
+                    continue
+                yield event.encode()
+        finally:
+            self._subscribers.discard(subscriber)
+            self._subscribers_by_user[user_id] -= 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "overflows": self.overflows,
+            "replay_buffered": len(self._replay),
+        }
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,181 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+import io
+import logging
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Row, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Contract, Location, Portfolio, PortfolioHolding
+from app.repositories.sql import build_contract_conditions
+from app.schemas import ContractFilters, ExportFormat, ExportTable
+
+logger = logging.getLogger(__name__)
+
+# Rows per record batch (and Parquet row group); memory stays at about one batch.
+EXPORT_BATCH_SIZE = 10_000
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.arrow: "application/vnd.apache.arrow.stream",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+EXPORT_FILE_EXTENSIONS = {ExportFormat.arrow: "arrows", ExportFormat.parquet: "parquet"}
+
+# Decimal precision and scale match the Numeric columns, so values round-trip exactly.
+CONTRACT_FIELDS = [
+    pa.field("id", pa.int64(), nullable=False),
+    pa.field("energy_type", pa.dictionary(pa.int8(), pa.string()), nullable=False),
+    pa.field("quantity_mwh", pa.decimal128(18, 3), nullable=False),
+    pa.field("price_per_mwh", pa.decimal128(18, 6), nullable=False),
+    pa.field("delivery_start", pa.date32(), nullable=False),
+    pa.field("delivery_end", pa.date32(), nullable=False),
+    pa.field("location", pa.dictionary(pa.int32(), pa.string()), nullable=False),
+    pa.field("status", pa.dictionary(pa.int8(), pa.string()), nullable=False),
+]
+CONTRACTS_SCHEMA = pa.schema(CONTRACT_FIELDS)
+PORTFOLIO_HOLDINGS_SCHEMA = pa.schema(
+    [
+        pa.field("holding_id", pa.int64(), nullable=False),
+        pa.field("user_id", pa.int64(), nullable=False),
+        pa.field("added_at", pa.timestamp("us", tz="UTC"), nullable=False),
+        pa.field("contract_id", pa.int64(), nullable=False),
+        *CONTRACT_FIELDS[1:],
+    ]
+)
+EXPORT_SCHEMAS = {
+    ExportTable.contracts: CONTRACTS_SCHEMA,
+    ExportTable.portfolio_holdings: PORTFOLIO_HOLDINGS_SCHEMA,
+}
+
+_CONTRACT_COLUMNS = (
+    Contract.energy_type,
+    Contract.quantity_mwh,
+    Contract.price_per_mwh,
+    Contract.delivery_start,
+    Contract.delivery_end,
+    Location.name,
+    Contract.status,
+)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that buffers encoded bytes until ``drain`` hands them out.
+
+    ``tell`` reports the total written so the Parquet writer's footer offsets stay
+    correct even though earlier chunks have already been sent.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _record_batch(rows: Sequence[Row], schema: pa.Schema) -> pa.RecordBatch:
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode().cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _encode_batch(writer, sink: _ChunkSink, rows: Sequence[Row], schema: pa.Schema) -> bytes:
+    writer.write_batch(_record_batch(rows, schema))
+    return sink.drain()
+
+
+def build_export_statement(
+    *, table: ExportTable, filters: ContractFilters, user_id: int | None = None
+) -> Select:
+    """Rows for ``table``; holdings (of every portfolio, or ``user_id``'s) are
+    denormalized with their contracts."""
+    conditions = build_contract_conditions(filters)
+    if table == ExportTable.contracts:
+        return (
+            select(Contract.id, *_CONTRACT_COLUMNS)
+            .join(Location, Contract.location_id == Location.id)
+            .where(*conditions)
+            .order_by(Contract.id)
+        )
+    if user_id is not None:
+        conditions.append(Portfolio.user_id == user_id)
+    return (
+        select(
+            PortfolioHolding.id,
+            Portfolio.user_id,
+            PortfolioHolding.added_at,
+            Contract.id,
+            *_CONTRACT_COLUMNS,
+        )
+        .join(Portfolio, PortfolioHolding.portfolio_id == Portfolio.id)
+        .join(Contract, PortfolioHolding.contract_id == Contract.id)
+        .join(Location, Contract.location_id == Location.id)
+        .where(*conditions)
+        .order_by(PortfolioHolding.id)
+    )
+
+
+async def count_export_rows(*, session: AsyncSession, statement: Select) -> int:
+    counted = select(func.count()).select_from(statement.order_by(None).subquery())
+    return (await session.execute(counted)).scalar_one()
+
+
+async def export_table(
+    *,
+    session: AsyncSession,
+    table: ExportTable,
+    filters: ContractFilters,
+    export_format: ExportFormat,
+    user_id: int | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    on_batch: Callable[[int], Awaitable[None]] | None = None,
+) -> AsyncIterator[bytes]:
+    """Stream ``table`` from a server-side cursor as Arrow IPC or Parquet bytes.
+
+    Each cursor partition becomes one record batch (one row group for Parquet)
+    that is encoded off the event loop and sent before the next is fetched.
+    ``on_batch`` is awaited with the running row count after each batch.
+    """
+    statement = build_export_statement(table=table, filters=filters, user_id=user_id)
+    schema = EXPORT_SCHEMAS[table]
+    sink = _ChunkSink()
+    if export_format == ExportFormat.parquet:
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    exported = 0
+    try:
+        # The IPC stream leads with its schema message; Parquet has written its magic.
+        yield sink.drain()
+        result = await session.stream(statement.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield await asyncio.to_thread(_encode_batch, writer, sink, rows, schema)
+            exported += len(rows)
+            if on_batch is not None:
+                await on_batch(exported)
+    finally:
+        writer.close()
+    yield sink.drain()
+    logger.info(f"Export finished: {table.value = }, {export_format.value = }, {exported = }")
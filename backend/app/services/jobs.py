@@ -0,0 +1,491 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+from pathlib import Path
+import secrets
+import socket
+import tempfile
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import Job
+from app.schemas import (
+    ContractBulkUpdateRequest,
+    ExportJobParams,
+    JobKind,
+    JobStatus,
+    OptimizePortfolioJobParams,
+    PortfolioOptimizationResponse,
+)
+from app.services.contracts_service import bulk_update_contracts
+from app.services.export_service import (
+    EXPORT_FILE_EXTENSIONS,
+    EXPORT_MEDIA_TYPES,
+    build_export_statement,
+    count_export_rows,
+    export_table,
+)
+from app.services.optimizer_service import optimize_portfolio
+from app.services.recommendations_service import similarity_index
+
+logger = logging.getLogger(__name__)
+
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+# Jobs running at once. A job holds its work session (an export keeps a server-side
+# cursor open throughout) and briefly a second connection per progress report, so
+# jobs can take 2 * JOBS_MAX_CONCURRENCY pooled connections plus one for the heartbeat.
+JOBS_MAX_CONCURRENCY = int(os.getenv("JOBS_MAX_CONCURRENCY", "2"))
+# Worker processes for CPU-heavy steps (the optimizer solve); 0 runs them inline.
+JOBS_PROCESS_POOL_WORKERS = int(os.getenv("JOBS_PROCESS_POOL_WORKERS", "2"))
+JOBS_RESULT_DIR = Path(
+    os.getenv("JOBS_RESULT_DIR", Path(tempfile.gettempdir()) / "energy-marketplace-jobs")
+)
+# A worker renews the leases of its running jobs every third of this; a job whose
+# lease lapses (its worker died) is queued again by any live worker.
+JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "60"))
+
+TERMINAL_JOB_STATUSES = (JobStatus.succeeded, JobStatus.failed, JobStatus.cancelled)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass
+class JobContext:
+    job_id: int
+    session_factory: async_sessionmaker[AsyncSession]
+    cpu_executor: Executor | None
+    result_dir: Path
+
+    async def report(
+        self, progress: float, message: str | None = None, *, cancellable: bool = True
+    ) -> None:
+        """Record progress (0-1); raises ``JobCancelled`` if a cancel was requested.
+
+        Pass ``cancellable=False`` once the job's writes are committed, so a late cancel
+        does not mark finished work as cancelled.
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(Job)
+                .where(Job.id == self.job_id)
+                .values(progress=min(max(progress, 0.0), 1.0), progress_message=message)
+                .returning(Job.cancel_requested)
+            )
+            cancel_requested = result.scalar_one()
+            await session.commit()
+        if cancel_requested and cancellable:
+            raise JobCancelled()
+
+
+@dataclass
+class JobOutcome:
+    result: dict = field(default_factory=dict)
+    result_path: str | None = None
+
+
+JobHandler = Callable[[JobContext, dict], Awaitable[JobOutcome]]
+
+
+async def run_export_job(context: JobContext, params: dict) -> JobOutcome:
+    job_params = ExportJobParams.model_validate(params)
+    extension = EXPORT_FILE_EXTENSIONS[job_params.format]
+    path = context.result_dir / f"job-{context.job_id}.{extension}"
+    async with context.session_factory() as session:
+        total = await count_export_rows(
+            session=session,
+            statement=build_export_statement(
+                table=job_params.table, filters=job_params.filters, user_id=job_params.user_id
+            ),
+        )
+        await context.report(0.0, f"Exporting {total} rows")
+
+        async def on_batch(exported: int) -> None:
+            await context.report(exported / total if total else 1.0, f"Exported {exported} rows")
+
+        chunks = export_table(
+            session=session,
+            table=job_params.table,
+            filters=job_params.filters,
+            export_format=job_params.format,
+            user_id=job_params.user_id,
+            on_batch=on_batch,
+        )
+        try:
+            with path.open("wb") as output:
+                async for chunk in chunks:
+                    await asyncio.to_thread(output.write, chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+    return JobOutcome(
+        result={
+            "rows": total,
+            "media_type": EXPORT_MEDIA_TYPES[job_params.format],
+            "filename": f"{job_params.table.value}.{extension}",
+        },
+        result_path=str(path),
+    )
+
+
+async def run_bulk_update_job(context: JobContext, params: dict) -> JobOutcome:
+    payload = ContractBulkUpdateRequest.model_validate(params)
+    await context.report(0.0, "Updating contracts")
+    async with context.session_factory() as session:
+        contracts = await bulk_update_contracts(
+            session=session,
+            payload=payload.update,
+            contract_ids=payload.contract_ids,
+            filters=payload.filters,
+        )
+    await context.report(1.0, f"Updated {len(contracts)} contracts", cancellable=False)
+    return JobOutcome(
+        result={
+            "updated_count": len(contracts),
+            "contract_ids": [contract.id for contract in contracts],
+        }
+    )
+
+
+async def run_optimize_portfolio_job(context: JobContext, params: dict) -> JobOutcome:
+    job_params = OptimizePortfolioJobParams.model_validate(params)
+    await context.report(0.0, "Loading candidates")
+    async with context.session_factory() as session:
+        optimization = await optimize_portfolio(
+            session=session,
+            user_id=job_params.user_id,
+            payload=job_params.request,
+            cpu_executor=context.cpu_executor,
+            on_progress=context.report,
+        )
+        response = PortfolioOptimizationResponse(**optimization)
+    await context.report(1.0, "Optimized", cancellable=False)
+    return JobOutcome(result=response.model_dump(mode="json"))
+
+
+async def run_rebuild_similarity_index_job(context: JobContext, params: dict) -> JobOutcome:
+    await context.report(0.0, "Rebuilding similarity index")
+    async with context.session_factory() as session:
+        await similarity_index.rebuild_now(session)
+    await context.report(1.0, f"Indexed {similarity_index.size} contracts")
+    return JobOutcome(result={"contracts_indexed": similarity_index.size})
+
+
+JOB_HANDLERS: dict[JobKind, JobHandler] = {
+    JobKind.export: run_export_job,
+    JobKind.bulk_update_contracts: run_bulk_update_job,
+    JobKind.optimize_portfolio: run_optimize_portfolio_job,
+    JobKind.rebuild_similarity_index: run_rebuild_similarity_index_job,
+}
+
+
+class JobQueue:
+    """Runs jobs from the ``jobs`` table on the event loop, no broker required.
+
+    ``submit`` inserts a queued row and wakes one of ``max_concurrency`` workers.
+    The row is the source of truth for status, progress, and results, so any
+    process can read it. Claiming a job takes a lease in ``lease_owner`` and
+    ``lease_expires_at`` that a heartbeat renews while the job runs; ``recover``
+    (at start and on every heartbeat) queues again only running jobs whose lease
+    lapsed, so jobs of a live worker in another process are never duplicated.
+    CPU-heavy steps run in a process pool via ``cpu_executor``. Cancelling a running
+    job cancels its task here and sets ``cancel_requested``, which the owning
+    process sees at the job's next progress report or heartbeat.
+    """
+
+    def __init__(
+        self,
+        *,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_concurrency: int = JOBS_MAX_CONCURRENCY,
+        process_pool_workers: int = JOBS_PROCESS_POOL_WORKERS,
+        result_dir: Path = JOBS_RESULT_DIR,
+        handlers: dict[JobKind, JobHandler] = JOB_HANDLERS,
+        lease_seconds: float = JOBS_LEASE_SECONDS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_concurrency = max_concurrency
+        self.process_pool_workers = process_pool_workers
+        self.result_dir = result_dir
+        self.handlers = handlers
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()[:60]}:{os.getpid()}:{secrets.token_hex(4)}"
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._enqueued: set[int] = set()
+        self._workers: list[asyncio.Task] = []
+        self._heartbeat: asyncio.Task | None = None
+        self._running: dict[int, asyncio.Task] = {}
+        self._cpu_executor: ProcessPoolExecutor | None = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        self.result_dir.mkdir(parents=True, exist_ok=True)
+        if self.process_pool_workers > 0:
+            self._cpu_executor = ProcessPoolExecutor(max_workers=self.process_pool_workers)
+        pending_ids = await self.recover()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)
+        ]
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        logger.info(
+            f"Job queue started: {self.worker_id = }, {self.max_concurrency = }, "
+            f"{len(pending_ids) = }"
+        )
+
+    async def stop(self) -> None:
+        """Stop workers; running jobs go back to queued and resume on the next start."""
+        self._stopping = True
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+        for task in self._running.values():
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._cpu_executor is not None:
+            self._cpu_executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Job queue stopped")
+
+    async def submit(self, *, session: AsyncSession, kind: JobKind, params: dict) -> Job:
+        job = Job(kind=kind.value, status=JobStatus.queued.value, params=params)
+        try:
+            session.add(job)
+            await session.commit()
+            await session.refresh(job)
+        except Exception:
+            await session.rollback()
+            logger.exception(f"Submit job failed: {kind = }")
+            raise
+        self._enqueue(job.id)
+        logger.info(f"Job submitted: {job.id = }, {kind.value = }")
+        return job
+
+    async def cancel(self, *, session: AsyncSession, job: Job) -> Job:
+        """Cancel a queued or running job; finished jobs are returned unchanged."""
+        if job.status in {status.value for status in TERMINAL_JOB_STATUSES}:
+            return job
+        try:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == JobStatus.queued.value)
+                .values(status=JobStatus.cancelled.value, finished_at=func.now())
+            )
+            await session.execute(
+                update(Job).where(Job.id == job.id).values(cancel_requested=True)
+            )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            logger.exception(f"Cancel job failed: {job.id = }")
+            raise
+        task = self._running.get(job.id)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            self._running.pop(job.id, None)
+        await session.refresh(job)
+        return job
+
+    async def recover(self) -> list[int]:
+        """Queue again running jobs whose lease lapsed, then enqueue every queued job.
+
+        A lapsed lease means the owning worker died without finishing or returning
+        the job (rows running without a lease predate leases and count as lapsed).
+        Queued jobs may also be in another process's queue; whichever claims first
+        runs them. Returns the newly enqueued ids.
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(Job)
+                .where(
+                    Job.status == JobStatus.running.value,
+                    or_(Job.lease_expires_at.is_(None), Job.lease_expires_at < _utcnow()),
+                )
+                .values(
+                    status=JobStatus.queued.value,
+                    started_at=None,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                )
+                .returning(Job.id)
+            )
+            lapsed_ids = result.scalars().all()
+            result = await session.execute(
+                select(Job.id).where(Job.status == JobStatus.queued.value).order_by(Job.id)
+            )
+            queued_ids = result.scalars().all()
+            await session.commit()
+        if lapsed_ids:
+            logger.warning(f"Jobs with lapsed leases queued again: {sorted(lapsed_ids) = }")
+        pending_ids = [
+            job_id
+            for job_id in queued_ids
+            if job_id not in self._enqueued and job_id not in self._running
+        ]
+        for job_id in pending_ids:
+            self._enqueue(job_id)
+        return pending_ids
+
+    def _enqueue(self, job_id: int) -> None:
+        self._enqueued.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self._renew_leases()
+                await self.recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Retried on the next beat; the leases outlast two missed beats.
+                logger.exception(f"Job heartbeat failed: {self.worker_id = }")
+
+    async def _renew_leases(self) -> None:
+        """Extend the leases of this worker's running jobs and apply remote cancels."""
+        job_ids = list(self._running)
+        if not job_ids:
+            return
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(Job)
+                .where(
+                    Job.id.in_(job_ids),
+                    Job.status == JobStatus.running.value,
+                    Job.lease_owner == self.worker_id,
+                )
+                .values(lease_expires_at=self._lease_deadline())
+                .returning(Job.id, Job.cancel_requested)
+            )
+            rows = result.all()
+            await session.commit()
+        for job_id, cancel_requested in rows:
+            task = self._running.get(job_id)
+            if cancel_requested and task is not None:
+                task.cancel()
+
+    def _lease_deadline(self) -> datetime:
+        return _utcnow() + timedelta(seconds=self.lease_seconds)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._enqueued.discard(job_id)
+            if job_id in self._running:
+                continue
+            task = asyncio.create_task(self._execute(job_id))
+            self._running[job_id] = task
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.done():
+                    raise
+            except Exception:
+                # Only bookkeeping writes can fail here; keep the worker alive.
+                logger.exception(f"Job worker error: {job_id = }")
+            finally:
+                self._running.pop(job_id, None)
+
+    async def _claim(self, job_id: int) -> Job | None:
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.queued.value)
+                .values(
+                    status=JobStatus.running.value,
+                    started_at=func.now(),
+                    progress=0.0,
+                    progress_message=None,
+                    lease_owner=self.worker_id,
+                    lease_expires_at=self._lease_deadline(),
+                )
+                .returning(Job)
+            )
+            job = result.scalar_one_or_none()
+            await session.commit()
+        return job
+
+    async def _finish(self, job_id: int, status: JobStatus, **values: object) -> None:
+        if status == JobStatus.queued:
+            values["started_at"] = None
+        else:
+            values["finished_at"] = func.now()
+        async with self.session_factory() as session:
+            # A worker whose lease lapsed no longer owns the row and leaves it alone.
+            result = await session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.lease_owner == self.worker_id)
+                .values(status=status.value, lease_owner=None, lease_expires_at=None, **values)
+            )
+            await session.commit()
+        if result.rowcount == 0:
+            logger.warning(f"Job lease lost before finishing: {job_id = }, {status.value = }")
+
+    async def _execute(self, job_id: int) -> None:
+        job = await self._claim(job_id)
+        if job is None:
+            # Cancelled (or claimed by another process) while it waited in the queue.
+            return
+        context = JobContext(
+            job_id=job_id,
+            session_factory=self.session_factory,
+            cpu_executor=self._cpu_executor,
+            result_dir=self.result_dir,
+        )
+        handler = self.handlers[JobKind(job.kind)]
+        try:
+            outcome = await handler(context, job.params)
+        except (asyncio.CancelledError, JobCancelled):
+            if self._stopping:
+                await self._finish(job_id, JobStatus.queued)
+                logger.info(f"Job interrupted by shutdown: {job_id = }")
+                return
+            await self._finish(job_id, JobStatus.cancelled)
+            logger.info(f"Job cancelled: {job_id = }")
+        except Exception as exc:
+            logger.exception(f"Job failed: {job_id = }, {job.kind = }")
+            await self._finish(job_id, JobStatus.failed, error=f"{type(exc).__name__}: {exc}")
+        else:
+            await self._finish(
+                job_id,
+                JobStatus.succeeded,
+                progress=1.0,
+                result=outcome.result,
+                result_path=outcome.result_path,
+            )
+            logger.info(f"Job succeeded: {job_id = }, {job.kind = }")
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers),
+            "running": len(self._running),
+            "queued": self._queue.qsize(),
+            "process_pool_workers": self.process_pool_workers,
+        }
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def get_job(*, session: AsyncSession, job_id: int) -> Job | None:
+    return await session.get(Job, job_id)
+
+
+async def list_jobs(
+    *, session: AsyncSession, status: JobStatus | None = None, limit: int = 50
+) -> list[Job]:
+    statement = select(Job).order_by(Job.id.desc()).limit(limit)
+    if status is not None:
+        statement = statement.where(Job.status == status.value)
+    result = await session.execute(statement)
+    return list(result.scalars().all())
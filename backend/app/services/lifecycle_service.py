@@ -0,0 +1,77 @@
+import asyncio
+from datetime import date
+import logging
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.repositories import contract_repository
+from app.services.contracts_service import publish_contract_change
+from app.services.distribution_service import distribution_index
+from app.services.recommendations_service import similarity_index
+
+logger = logging.getLogger(__name__)
+
+LIFECYCLE_SWEEP_ENABLED = os.getenv("LIFECYCLE_SWEEP_ENABLED", "true").lower() == "true"
+LIFECYCLE_SWEEP_INTERVAL_SECONDS = float(os.getenv("LIFECYCLE_SWEEP_INTERVAL_SECONDS", "3600"))
+LIFECYCLE_SWEEP_BATCH_SIZE = int(os.getenv("LIFECYCLE_SWEEP_BATCH_SIZE", "500"))
+# Pause between chunks so the sweep never holds the table's hot rows for long.
+LIFECYCLE_SWEEP_PAUSE_SECONDS = 0.05
+
+# Only hot (Available/Reserved) contracts can lapse; sold contracts keep their status
+# after delivery. Expiring a row moves it from the hot to the cold contracts partition
+# on PostgreSQL, so this sweep is also the archival job that keeps the hot partition small.
+
+
+async def expire_contract_batch(*, session: AsyncSession, today: date, batch_size: int) -> int:
+    """Mark up to ``batch_size`` undelivered contracts past ``delivery_end`` as expired.
+
+    On PostgreSQL each batch is one ``UPDATE ... RETURNING`` that skips rows locked
+    by requests (or another worker's sweep) instead of blocking on them.
+    """
+    contracts = await contract_repository(session).expire(today=today, batch_size=batch_size)
+    for contract in contracts:
+        similarity_index.upsert(contract)
+        distribution_index.upsert(contract)
+        publish_contract_change("contract.updated", contract)
+    return len(contracts)
+
+
+async def sweep_expired_contracts(
+    *,
+    session_factory: async_sessionmaker[AsyncSession],
+    today: date | None = None,
+    batch_size: int = LIFECYCLE_SWEEP_BATCH_SIZE,
+    pause_seconds: float = LIFECYCLE_SWEEP_PAUSE_SECONDS,
+) -> int:
+    """Expire every contract past delivery, committing one short transaction per batch."""
+    today = today or date.today()
+    total = 0
+    while True:
+        async with session_factory() as session:
+            expired = await expire_contract_batch(
+                session=session, today=today, batch_size=batch_size
+            )
+        total += expired
+        if expired < batch_size:
+            break
+        await asyncio.sleep(pause_seconds)
+    logger.info(f"Lifecycle sweep finished: {today = }, {total = }")
+    return total
+
+
+async def run_lifecycle_sweeper(
+    *,
+    session_factory: async_sessionmaker[AsyncSession],
+    interval_seconds: float = LIFECYCLE_SWEEP_INTERVAL_SECONDS,
+) -> None:
+    """Sweep on startup and then every ``interval_seconds`` until cancelled."""
+    while True:
+        try:
+            await sweep_expired_contracts(session_factory=session_factory)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # A failed sweep (e.g. database briefly unavailable) is retried next interval.
+            logger.exception("Lifecycle sweep failed")
+        await asyncio.sleep(interval_seconds)
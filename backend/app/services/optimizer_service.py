@@ -0,0 +1,296 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Sequence
+from concurrent.futures import Executor
+from datetime import date
+from functools import partial
+import heapq
+import logging
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories import portfolio_repository
+from app.schemas import OptimizationStatus, PortfolioOptimizationRequest
+from app.services.contracts_service import list_contracts_by_ids
+from app.services.portfolios_service import ENERGY_TYPE_INDEX, add_contracts_to_portfolio
+
+logger = logging.getLogger(__name__)
+
+COVERAGE_TOLERANCE = 1e-6
+
+
+def build_coverage_matrix(
+    *,
+    energy_type_codes: np.ndarray,
+    quantities: np.ndarray,
+    delivery_starts: np.ndarray,
+    delivery_ends: np.ndarray,
+    targets: Sequence[tuple[int | None, date | None]],
+) -> np.ndarray:
+    """Return an (contracts x targets) matrix of MWh each contract contributes to each target.
+
+    A target restricted to an energy type only counts matching contracts; a target
+    restricted to a delivery month counts the share of the contract's quantity
+    delivered in that month, assuming an even daily delivery rate.
+    """
+    starts = delivery_starts.astype("datetime64[D]")
+    ends = delivery_ends.astype("datetime64[D]")
+    durations = (ends - starts).astype(np.int64) + 1
+    coverage = np.zeros((len(quantities), len(targets)))
+    for column, (energy_type_code, delivery_month) in enumerate(targets):
+        contribution = quantities.copy()
+        if delivery_month is not None:
+            month_start = np.datetime64(delivery_month, "M").astype("datetime64[D]")
+            month_end = (np.datetime64(delivery_month, "M") + 1).astype("datetime64[D]") - 1
+            overlap_days = (
+                np.minimum(ends, month_end) - np.maximum(starts, month_start)
+            ).astype(np.int64) + 1
+            contribution = contribution * np.clip(overlap_days, 0, None) / durations
+        if energy_type_code is not None:
+            contribution = np.where(energy_type_codes == energy_type_code, contribution, 0.0)
+        coverage[:, column] = contribution
+    return coverage
+
+
+def _fractional_cover_cost(costs: np.ndarray, column_coverage: np.ndarray, target: float) -> float:
+    contributing = column_coverage > 0
+    if not contributing.any():
+        return 0.0
+    column_costs = costs[contributing]
+    column_coverage = column_coverage[contributing]
+    order = np.argsort(column_costs / column_coverage, kind="stable")
+    cumulative_coverage = np.cumsum(column_coverage[order])
+    cumulative_costs = np.cumsum(column_costs[order])
+    position = int(np.searchsorted(cumulative_coverage, target))
+    if position >= len(order):
+        return float(cumulative_costs[-1])
+    covered_before = cumulative_coverage[position - 1] if position > 0 else 0.0
+    cost_before = cumulative_costs[position - 1] if position > 0 else 0.0
+    marginal_price = column_costs[order[position]] / column_coverage[order[position]]
+    return float(cost_before + (target - covered_before) * marginal_price)
+
+
+def lp_lower_bound(*, costs: np.ndarray, coverage: np.ndarray, targets: np.ndarray) -> float:
+    """Lower bound on the cost of any feasible selection from LP relaxations.
+
+    Each target alone must be covered, and so must the surrogate constraint that
+    sums every target with per-contract coverage capped at each target; the
+    fractional (cost per MWh) cover of each is a valid bound, and the largest wins.
+    """
+    bound = 0.0
+    for column, target in enumerate(targets):
+        bound = max(bound, _fractional_cover_cost(costs, coverage[:, column], float(target)))
+    if len(targets) > 1:
+        surrogate_coverage = np.minimum(coverage, targets).sum(axis=1)
+        bound = max(bound, _fractional_cover_cost(costs, surrogate_coverage, float(targets.sum())))
+    return bound
+
+
+def _ratio_heap(
+    candidates: np.ndarray, costs: np.ndarray, coverage: np.ndarray, remaining: np.ndarray
+) -> list[tuple[float, int]]:
+    gains = np.minimum(coverage[candidates], remaining).sum(axis=1)
+    useful = gains > COVERAGE_TOLERANCE
+    heap = list(
+        zip((costs[candidates][useful] / gains[useful]).tolist(), candidates[useful].tolist())
+    )
+    heapq.heapify(heap)
+    return heap
+
+
+def select_min_cost_cover(
+    *,
+    costs: np.ndarray,
+    coverage: np.ndarray,
+    targets: np.ndarray,
+    budget: float | None = None,
+) -> tuple[list[int], OptimizationStatus]:
+    """Pick whole contracts covering every target at (approximately) minimum cost.
+
+    Lazy greedy on cost per MWh of still-needed coverage: useful coverage only
+    shrinks as targets fill, so a popped ratio is re-scored and only taken if it
+    still beats the heap top. When a target closes or the residual demand halves,
+    all ratios are refreshed in one vectorized pass instead of draining stale
+    entries. A final pass drops the most expensive picks that turned out redundant.
+
+    ``budget`` does not steer the selection: it is checked against the finished cover,
+    and ``over_budget`` means the greedy cover exceeds it, not that no cover fits.
+    """
+    remaining = targets.astype(float).copy()
+    heap = _ratio_heap(np.arange(len(costs)), costs, coverage, remaining)
+    selected: list[int] = []
+    open_targets = int((remaining > COVERAGE_TOLERANCE).sum())
+    refresh_below = float(remaining.sum()) / 2
+
+    while heap and open_targets:
+        _, index = heapq.heappop(heap)
+        gain = float(np.minimum(coverage[index], remaining).sum())
+        if gain <= COVERAGE_TOLERANCE:
+            continue
+        ratio = costs[index] / gain
+        if heap and ratio > heap[0][0]:
+            heapq.heappush(heap, (ratio, index))
+            continue
+
+        selected.append(index)
+        remaining = np.maximum(remaining - coverage[index], 0.0)
+        still_open = int((remaining > COVERAGE_TOLERANCE).sum())
+        remaining_total = float(remaining.sum())
+        # Rescoring everything at once is cheaper than popping stale entries one by
+        # one once a target closes or the residual demand has halved.
+        if heap and still_open and (still_open < open_targets or remaining_total <= refresh_below):
+            candidates = np.fromiter((item[1] for item in heap), dtype=np.int64, count=len(heap))
+            heap = _ratio_heap(candidates, costs, coverage, remaining)
+            refresh_below = remaining_total / 2
+        open_targets = still_open
+
+    if remaining.max() > COVERAGE_TOLERANCE:
+        return selected, OptimizationStatus.insufficient_supply
+
+    covered = coverage[selected].sum(axis=0)
+    for index in sorted(selected, key=lambda item: costs[item], reverse=True):
+        reduced = covered - coverage[index]
+        if (reduced >= targets - COVERAGE_TOLERANCE).all():
+            covered = reduced
+            selected.remove(index)
+
+    if budget is not None and float(costs[selected].sum()) > budget:
+        return selected, OptimizationStatus.over_budget
+    return selected, OptimizationStatus.feasible
+
+
+def solve_portfolio_cover(
+    *,
+    energy_type_codes: np.ndarray,
+    quantities: np.ndarray,
+    costs: np.ndarray,
+    delivery_starts: np.ndarray,
+    delivery_ends: np.ndarray,
+    target_specs: list[tuple[int | None, date | None]],
+    target_quantities: list[float],
+    budget: float | None,
+) -> dict:
+    """The CPU-bound part of ``optimize_portfolio``; plain arrays in and out so it can
+    run in a worker process."""
+    coverage = build_coverage_matrix(
+        energy_type_codes=energy_type_codes,
+        quantities=quantities,
+        delivery_starts=delivery_starts,
+        delivery_ends=delivery_ends,
+        targets=target_specs,
+    )
+    targets = np.array(target_quantities)
+    selected, optimization_status = select_min_cost_cover(
+        costs=costs, coverage=coverage, targets=targets, budget=budget
+    )
+    return {
+        "selected": selected,
+        "status": optimization_status,
+        "covered": coverage[selected].sum(axis=0),
+        "total_cost": float(costs[selected].sum()),
+        "total_capacity_mwh": float(quantities[selected].sum()),
+        "lower_bound_cost": lp_lower_bound(costs=costs, coverage=coverage, targets=targets),
+    }
+
+
+async def optimize_portfolio(
+    *,
+    session: AsyncSession,
+    user_id: int,
+    payload: PortfolioOptimizationRequest,
+    cpu_executor: Executor | None = None,
+    on_progress: Callable[[float, str], Awaitable[None]] | None = None,
+) -> dict:
+    """Pick contracts covering the requested targets; ``cpu_executor`` (e.g. the job
+    queue's process pool) runs the solve off the event loop. ``on_progress`` is
+    awaited before and after the solve, before anything is applied."""
+    # Candidates are taken in id order whatever sort the filters carry.
+    candidate_rows = await portfolio_repository(session).list_candidates(
+        user_id=user_id,
+        filters=payload.filters.model_copy(update={"sort_by": None, "sort_direction": None}),
+        limit=payload.max_candidates,
+        locations=payload.locations,
+    )
+    rows = [row for row in candidate_rows if row[1] in ENERGY_TYPE_INDEX]
+
+    target_specs: list[tuple[int | None, date | None]] = []
+    target_quantities: list[float] = []
+    if payload.target_mwh is not None:
+        target_specs.append((None, None))
+        target_quantities.append(float(payload.target_mwh))
+    for target in payload.targets:
+        energy_type_code = (
+            ENERGY_TYPE_INDEX[target.energy_type.value] if target.energy_type else None
+        )
+        target_specs.append((energy_type_code, target.delivery_month))
+        target_quantities.append(float(target.quantity_mwh))
+
+    contract_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    solve = partial(
+        solve_portfolio_cover,
+        energy_type_codes=np.array([ENERGY_TYPE_INDEX[row[1]] for row in rows], dtype=np.int64),
+        quantities=np.array([float(row[2]) for row in rows]),
+        costs=np.array([float(row[6]) for row in rows]),
+        delivery_starts=np.array([row[4] for row in rows], dtype="datetime64[D]"),
+        delivery_ends=np.array([row[5] for row in rows], dtype="datetime64[D]"),
+        target_specs=target_specs,
+        target_quantities=target_quantities,
+        budget=float(payload.budget) if payload.budget is not None else None,
+    )
+    if on_progress is not None:
+        await on_progress(0.1, f"Solving over {len(rows)} candidates")
+    if cpu_executor is None:
+        solution = solve()
+    else:
+        solution = await asyncio.get_running_loop().run_in_executor(cpu_executor, solve)
+    optimization_status = solution["status"]
+    if on_progress is not None:
+        await on_progress(0.9, f"Solved: {optimization_status.value}")
+    selected_ids = contract_ids[solution["selected"]].tolist()
+    covered = solution["covered"]
+
+    applied = False
+    added_ids: list[int] = []
+    if payload.apply and optimization_status == OptimizationStatus.feasible and selected_ids:
+        # Contracts sold or deleted since the candidates were read are skipped, not added.
+        added_ids = await add_contracts_to_portfolio(
+            session=session, user_id=user_id, contract_ids=selected_ids, available_only=True
+        )
+        applied = True
+    logger.info(
+        f"Portfolio optimized: {user_id = }, {len(rows) = }, {len(selected_ids) = }, "
+        f"{optimization_status.value = }, {applied = }, {len(added_ids) = }"
+    )
+
+    contracts = await list_contracts_by_ids(session=session, contract_ids=selected_ids)
+    contract_by_id = {contract.id: contract for contract in contracts}
+    return {
+        "user_id": user_id,
+        "status": optimization_status,
+        "applied": applied,
+        "added_contract_ids": added_ids,
+        "candidates_considered": len(rows),
+        "total_cost": solution["total_cost"],
+        "total_capacity_mwh": solution["total_capacity_mwh"],
+        "lower_bound_cost": solution["lower_bound_cost"],
+        "targets": [
+            {
+                "energy_type": (
+                    list(ENERGY_TYPE_INDEX)[energy_type_code]
+                    if energy_type_code is not None
+                    else None
+                ),
+                "delivery_month": (
+                    delivery_month.replace(day=1) if delivery_month is not None else None
+                ),
+                "target_mwh": target_quantities[column],
+                "covered_mwh": float(covered[column]),
+            }
+            for column, (energy_type_code, delivery_month) in enumerate(target_specs)
+        ],
+        "contracts": [
+            contract_by_id[contract_id]
+            for contract_id in selected_ids
+            if contract_id in contract_by_id
+        ],
+    }
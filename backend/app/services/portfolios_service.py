@@ -1,181 +1,556 @@
-from collections.abc import Sequence
+from collections.abc import AsyncIterator, Sequence
+from datetime import date
 import logging
 from decimal import Decimal
 
-from sqlalchemy import func, select
+import numpy as np
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from app.models import Contract, Portfolio, PortfolioHolding, User
+from app.models import PortfolioHolding
+from app.repositories import portfolio_repository
+from app.repositories.keyset import (
+    decode_holdings_cursor,
+    encode_holdings_cursor,
+    holding_sort_value,
+)
+from app.schemas import (
+    ContractFilters,
+    ContractSortDirection,
+    EnergyType,
+    HoldingsChangeAction,
+    PortfolioHoldingRead,
+    PortfolioHoldingsChangedEvent,
+    PortfolioMetrics,
+    ScheduleGranularity,
+    WhatIfRankBy,
+)
+from app.services.coalescing import bind_key, single_flight
+from app.services.events import change_feed
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_IN_MEMORY_METRICS_MAX_HOLDINGS = 500
+# Schedule buckets are counted in whole units of the columns they are spread from
+# (quantity_mwh and total_value), so they add up exactly to the portfolio totals.
+SCHEDULE_CAPACITY_QUANTUM = Decimal("0.001")
+SCHEDULE_COST_QUANTUM = Decimal("0.000000001")
+# Candidates ranked per what-if batch, on top of the running best ``top``.
+WHAT_IF_BATCH_SIZE = 10_000
 
-async def ensure_user_portfolio(*, session: AsyncSession, user_id: int) -> Portfolio:
-    user = await session.get(User, user_id)
-    if user is None:
-        user = User(id=user_id)
-        session.add(user)
-        await session.flush()
-        logger.info(f"User portfolio created: {user_id = }")
+portfolio_metrics_flight = single_flight("portfolios.metrics")
 
-    statement = select(Portfolio).where(Portfolio.user_id == user_id)
-    result = await session.execute(statement)
-    portfolio = result.scalar_one_or_none()
-    if portfolio is not None:
-        return portfolio
 
-    portfolio = Portfolio(user_id=user_id)
-    session.add(portfolio)
-    try:
-        await session.commit()
-        await session.refresh(portfolio)
-    except Exception:
-        await session.rollback()
-        logger.exception(f"Create portfolio failed: {user_id = }")
-        raise
-    logger.info(f"Portfolio created: {user_id = }, {portfolio.id = }")
-    return portfolio
-
-
-async def get_contract(*, session: AsyncSession, contract_id: int) -> Contract | None:
-    statement = select(Contract).where(Contract.id == contract_id)
-    result = await session.execute(statement)
-    return result.scalar_one_or_none()
+async def publish_holdings_change(
+    *,
+    session: AsyncSession,
+    user_id: int,
+    action: HoldingsChangeAction,
+    contract_ids: Sequence[int],
+    holding: PortfolioHolding | None = None,
+) -> None:
+    # Metrics cost a query, so they are only recomputed while someone is listening.
+    metrics = (
+        PortfolioMetrics(**await get_portfolio_metrics(session=session, user_id=user_id))
+        if change_feed.has_subscribers(user_id)
+        else None
+    )
+    event = PortfolioHoldingsChangedEvent(
+        user_id=user_id,
+        action=action,
+        contract_ids=list(contract_ids),
+        holding=PortfolioHoldingRead.model_validate(holding) if holding is not None else None,
+        metrics=metrics,
+    )
+    change_feed.publish("portfolio.holdings_changed", event.model_dump_json(), user_id=user_id)
 
 
 async def add_contract_to_portfolio(
     *, session: AsyncSession, user_id: int, contract_id: int
 ) -> PortfolioHolding:
-    contract = await get_contract(session=session, contract_id=contract_id)
-    if contract is None:
+    """Idempotently add a contract, creating the user and portfolio on first use."""
+    holding = await portfolio_repository(session).add_holding(
+        user_id=user_id, contract_id=contract_id
+    )
+    if holding is None:
         raise ValueError("Contract not found")
-
-    portfolio = await ensure_user_portfolio(session=session, user_id=user_id)
-
-    statement = select(PortfolioHolding).where(
-        PortfolioHolding.portfolio_id == portfolio.id,
-        PortfolioHolding.contract_id == contract_id,
-    )
-    result = await session.execute(statement)
-    existing_holding = result.scalar_one_or_none()
-    if existing_holding is not None:
-        return existing_holding
-
-    holding = PortfolioHolding(portfolio_id=portfolio.id, contract_id=contract_id)
-    session.add(holding)
-    try:
-        await session.commit()
-        await session.refresh(holding)
-    except Exception:
-        await session.rollback()
-        logger.exception(f"Add contract to portfolio failed: {user_id = }, {contract_id = }")
-        raise
     logger.info(f"Contract added to portfolio: {user_id = }, {contract_id = }, {holding.id = }")
+    await publish_holdings_change(
+        session=session,
+        user_id=user_id,
+        action=HoldingsChangeAction.added,
+        contract_ids=[contract_id],
+        holding=holding,
+    )
     return holding
 
 
+async def add_contracts_to_portfolio(
+    *,
+    session: AsyncSession,
+    user_id: int,
+    contract_ids: Sequence[int],
+    available_only: bool = False,
+) -> list[int]:
+    """Add several contracts in a single transaction; returns the newly added ids."""
+    new_ids = await portfolio_repository(session).add_holdings(
+        user_id=user_id, contract_ids=contract_ids, available_only=available_only
+    )
+    logger.info(f"Contracts added to portfolio: {user_id = }, {len(new_ids) = }")
+    if new_ids:
+        await publish_holdings_change(
+            session=session,
+            user_id=user_id,
+            action=HoldingsChangeAction.added,
+            contract_ids=new_ids,
+        )
+    return new_ids
+
+
 async def remove_contract_from_portfolio(
     *, session: AsyncSession, user_id: int, contract_id: int
 ) -> bool:
-    statement = (
-        select(PortfolioHolding)
-        .join(Portfolio)
-        .where(
-            Portfolio.user_id == user_id,
-            PortfolioHolding.contract_id == contract_id,
-        )
+    removed = await portfolio_repository(session).remove_holding(
+        user_id=user_id, contract_id=contract_id
     )
-    result = await session.execute(statement)
-    holding = result.scalar_one_or_none()
-    if holding is None:
+    if not removed:
         return False
-
-    await session.delete(holding)
-    try:
-        await session.commit()
-    except Exception:
-        await session.rollback()
-        logger.exception(f"Remove contract from portfolio failed: {user_id = }, {contract_id = }")
-        raise
     logger.info(f"Contract removed from portfolio: {user_id = }, {contract_id = }")
+    await publish_holdings_change(
+        session=session,
+        user_id=user_id,
+        action=HoldingsChangeAction.removed,
+        contract_ids=[contract_id],
+    )
     return True
 
 
 async def list_portfolio_holdings(
-    *, session: AsyncSession, user_id: int
+    *,
+    session: AsyncSession,
+    user_id: int,
+    offset: int = 0,
+    limit: int | None = None,
 ) -> Sequence[PortfolioHolding]:
-    statement = (
-        select(PortfolioHolding)
-        .join(Portfolio)
-        .where(Portfolio.user_id == user_id)
-        .options(selectinload(PortfolioHolding.contract))
-        .order_by(PortfolioHolding.added_at.desc())
+    return await portfolio_repository(session).list_holdings(
+        user_id=user_id, offset=offset, limit=limit
     )
-    result = await session.execute(statement)
-    return result.scalars().all()
 
 
-async def get_portfolio_metrics(*, session: AsyncSession, user_id: int) -> dict:
-    await ensure_user_portfolio(session=session, user_id=user_id)
+async def list_portfolio_holdings_page(
+    *,
+    session: AsyncSession,
+    user_id: int,
+    filters: ContractFilters,
+    limit: int,
+    cursor: str | None = None,
+) -> tuple[Sequence[PortfolioHolding], str | None]:
+    """Keyset-paginated holdings filtered and sorted by contract attributes.
 
-    totals_statement = (
-        select(
-            func.count(Contract.id),
-            func.coalesce(func.sum(Contract.quantity_mwh), 0),
-            func.coalesce(func.sum(Contract.quantity_mwh * Contract.price_per_mwh), 0),
-        )
-        .select_from(PortfolioHolding)
-        .join(Portfolio)
-        .join(Contract)
-        .where(Portfolio.user_id == user_id)
-    )
-    totals_result = await session.execute(totals_statement)
-    total_contracts, total_capacity, total_cost = totals_result.one()
-
-    total_capacity = Decimal(total_capacity or 0)
-    total_cost = Decimal(total_cost or 0)
-    weighted_avg_price = (
-        total_cost / total_capacity if total_capacity > 0 else Decimal("0")
-    )
-
-    breakdown_statement = (
-        select(
-            Contract.energy_type,
-            func.count(Contract.id),
-            func.coalesce(func.sum(Contract.quantity_mwh), 0),
-            func.coalesce(func.sum(Contract.quantity_mwh * Contract.price_per_mwh), 0),
-        )
-        .select_from(PortfolioHolding)
-        .join(Portfolio)
-        .join(Contract)
-        .where(Portfolio.user_id == user_id)
-        .group_by(Contract.energy_type)
-        .order_by(Contract.energy_type)
-    )
-    breakdown_result = await session.execute(breakdown_statement)
-    breakdown_items = []
-    for energy_type, count, capacity, cost in breakdown_result.all():
-        capacity_decimal = Decimal(capacity or 0)
-        cost_decimal = Decimal(cost or 0)
-        breakdown_items.append(
-            {
-                "energy_type": energy_type,
-                "total_contracts": int(count),
-                "total_capacity_mwh": capacity_decimal,
-                "total_cost": cost_decimal,
-                "weighted_avg_price_per_mwh": (
-                    cost_decimal / capacity_decimal
-                    if capacity_decimal > 0
-                    else Decimal("0")
-                ),
-            }
+    The cursor carries the last row's (sort value, holding id), so each page is an
+    index range scan rather than an ``OFFSET`` that re-reads every earlier row.
+    """
+    after = None
+    if cursor is not None:
+        after = decode_holdings_cursor(cursor, filters)
+    holdings = await portfolio_repository(session).list_holdings_after(
+        user_id=user_id, filters=filters, limit=limit + 1, after=after
+    )
+    if len(holdings) <= limit:
+        return holdings, None
+    holdings = holdings[:limit]
+    last = holdings[-1]
+    return holdings, encode_holdings_cursor(holding_sort_value(last, filters), last.id)
+
+
+async def stream_portfolio_holdings(
+    *, session: AsyncSession, user_id: int, filters: ContractFilters, batch_size: int = 500
+) -> AsyncIterator[Sequence[Row]]:
+    """Yield batches of (holding id, added_at, Contract) rows; memory stays at one batch."""
+    batches = portfolio_repository(session).stream_holdings(
+        user_id=user_id, filters=filters, batch_size=batch_size
+    )
+    async for batch in batches:
+        yield batch
+
+
+def summarize_holdings(holdings: Sequence[PortfolioHolding]) -> dict:
+    """Compute the same metrics as ``get_portfolio_metrics`` from already loaded holdings."""
+    total_capacity = Decimal("0")
+    total_cost = Decimal("0")
+    totals_by_type: dict[str, list] = {}
+    for holding in holdings:
+        contract = holding.contract
+        cost = contract.total_value
+        total_capacity += contract.quantity_mwh
+        total_cost += cost
+        type_totals = totals_by_type.setdefault(
+            contract.energy_type, [0, Decimal("0"), Decimal("0")]
         )
+        type_totals[0] += 1
+        type_totals[1] += contract.quantity_mwh
+        type_totals[2] += cost
 
+    breakdown_items = [
+        {
+            "energy_type": energy_type,
+            "total_contracts": count,
+            "total_capacity_mwh": capacity,
+            "total_cost": cost,
+            "weighted_avg_price_per_mwh": cost / capacity if capacity > 0 else Decimal("0"),
+        }
+        for energy_type, (count, capacity, cost) in sorted(totals_by_type.items())
+    ]
     return {
-        "total_contracts": int(total_contracts or 0),
+        "total_contracts": len(holdings),
         "total_capacity_mwh": total_capacity,
         "total_cost": total_cost,
-        "weighted_avg_price_per_mwh": weighted_avg_price,
+        "weighted_avg_price_per_mwh": (
+            total_cost / total_capacity if total_capacity > 0 else Decimal("0")
+        ),
         "breakdown_by_energy_type": breakdown_items,
     }
+
+
+async def get_portfolio_snapshot(
+    *,
+    session: AsyncSession,
+    user_id: int,
+    offset: int = 0,
+    limit: int | None = None,
+) -> dict:
+    """Holdings page plus metrics from one session (and so one snapshot).
+
+    The holdings are counted first. Portfolios up to
+    ``SNAPSHOT_IN_MEMORY_METRICS_MAX_HOLDINGS`` are loaded once and the metrics are
+    summed in Python from those rows; larger ones use the SQL aggregates and only
+    load the requested page.
+    """
+    holdings_count = await portfolio_repository(session).count_holdings(user_id=user_id)
+    if holdings_count <= SNAPSHOT_IN_MEMORY_METRICS_MAX_HOLDINGS:
+        holdings = await list_portfolio_holdings(session=session, user_id=user_id)
+        metrics = summarize_holdings(holdings)
+        page_end = None if limit is None else offset + limit
+        page = holdings[offset:page_end]
+    else:
+        metrics = await get_portfolio_metrics(session=session, user_id=user_id)
+        page = await list_portfolio_holdings(
+            session=session, user_id=user_id, offset=offset, limit=limit
+        )
+    return {
+        "user_id": user_id,
+        "total_holdings": metrics["total_contracts"],
+        "holdings": list(page),
+        "metrics": metrics,
+    }
+
+
+async def get_shared_portfolio_metrics(*, session: AsyncSession, user_id: int) -> dict:
+    """``get_portfolio_metrics`` with concurrent requests for one user sharing a query.
+
+    Used by the standalone metrics route only; snapshot reads keep their own query so
+    holdings and metrics come from the same transaction.
+    """
+    return await portfolio_metrics_flight.run(
+        (bind_key(session), user_id),
+        lambda: get_portfolio_metrics(session=session, user_id=user_id),
+    )
+
+
+async def get_portfolio_metrics(*, session: AsyncSession, user_id: int) -> dict:
+    return await portfolio_repository(session).metrics(user_id=user_id)
+
+
+def _spread_units(
+    units: np.ndarray,
+    durations: np.ndarray,
+    start_offsets: np.ndarray,
+    horizon: int,
+) -> np.ndarray:
+    """Per-day totals of whole ``units`` spread over each holding's delivery days.
+
+    Each day gets ``units // days``, and the first ``units % days`` days one unit
+    more, so a holding's days add up to exactly its ``units``. Both parts go on one
+    sweep line (amount added on the first day, removed the day after the last) and a
+    single cumulative sum. ``start_offsets`` are relative to the first horizon day and
+    may fall outside it; days outside ``[0, horizon)`` are dropped.
+    """
+    # Python ints only when int64 could overflow (costs past ~4.6e9 in nano units).
+    dtype = np.int64 if sum(units.tolist()) < 2**62 else object
+    units = units.astype(dtype)
+    base, remainder = units // durations, units % durations
+    deltas = np.zeros(horizon + 1, dtype=dtype)
+    for amounts, first, after in (
+        (base, start_offsets, start_offsets + durations),
+        (np.ones_like(units), start_offsets, start_offsets + remainder),
+    ):
+        first = np.clip(first, 0, horizon).astype(np.int64)
+        after = np.clip(after, 0, horizon).astype(np.int64)
+        active = first < after
+        np.add.at(deltas, first[active], amounts[active])
+        np.add.at(deltas, after[active], -amounts[active])
+    return np.cumsum(deltas[:-1])
+
+
+def build_delivery_schedule(
+    *,
+    delivery_starts: np.ndarray,
+    delivery_ends: np.ndarray,
+    quantity_units: np.ndarray,
+    cost_units: np.ndarray,
+    granularity: ScheduleGranularity,
+    window_start: date | None = None,
+    window_end: date | None = None,
+) -> list[dict]:
+    """Spread holdings evenly over their delivery days and bucket the daily totals.
+
+    Quantities and costs come in whole ``SCHEDULE_CAPACITY_QUANTUM`` and
+    ``SCHEDULE_COST_QUANTUM`` units and stay integers until each bucket is converted
+    to ``Decimal`` once, so buckets covering every delivery day sum exactly to the
+    portfolio's total capacity and cost. Cost is O(holdings + days).
+    """
+    if len(quantity_units) == 0:
+        return []
+
+    starts = delivery_starts.astype("datetime64[D]")
+    ends = delivery_ends.astype("datetime64[D]")
+    first_day = starts.min() if window_start is None else np.datetime64(window_start, "D")
+    last_day = ends.max() if window_end is None else np.datetime64(window_end, "D")
+    if last_day < first_day:
+        return []
+
+    durations = (ends - starts).astype(np.int64) + 1
+    horizon = int((last_day - first_day).astype(np.int64)) + 1
+    start_offsets = (starts - first_day).astype(np.int64)
+    quantity_per_day = _spread_units(quantity_units, durations, start_offsets, horizon)
+    cost_per_day = _spread_units(cost_units, durations, start_offsets, horizon)
+
+    days = first_day + np.arange(horizon)
+    if granularity == ScheduleGranularity.day:
+        period_starts = days
+    elif granularity == ScheduleGranularity.week:
+        # numpy's day epoch (1970-01-01) is a Thursday; shift so weeks start on Monday.
+        weekday = (days.astype(np.int64) + 3) % 7
+        period_starts = days - weekday
+    else:
+        period_starts = days.astype("datetime64[M]").astype("datetime64[D]")
+
+    bucket_starts, bucket_index = np.unique(period_starts, return_inverse=True)
+    # np.add.at rather than bincount, which would sum in float64.
+    bucket_quantity = np.zeros(len(bucket_starts), dtype=quantity_per_day.dtype)
+    bucket_cost = np.zeros(len(bucket_starts), dtype=cost_per_day.dtype)
+    np.add.at(bucket_quantity, bucket_index, quantity_per_day)
+    np.add.at(bucket_cost, bucket_index, cost_per_day)
+
+    if granularity == ScheduleGranularity.day:
+        bucket_ends = bucket_starts
+    elif granularity == ScheduleGranularity.week:
+        bucket_ends = bucket_starts + 6
+    else:
+        bucket_ends = (
+            bucket_starts.astype("datetime64[M]") + 1
+        ).astype("datetime64[D]") - 1
+
+    return [
+        {
+            "period_start": period_start,
+            "period_end": period_end,
+            "capacity_mwh": int(capacity) * SCHEDULE_CAPACITY_QUANTUM,
+            "cost": int(cost) * SCHEDULE_COST_QUANTUM,
+        }
+        for period_start, period_end, capacity, cost in zip(
+            bucket_starts.tolist(),
+            bucket_ends.tolist(),
+            bucket_quantity.tolist(),
+            bucket_cost.tolist(),
+        )
+    ]
+
+
+async def get_portfolio_schedule(
+    *,
+    session: AsyncSession,
+    user_id: int,
+    granularity: ScheduleGranularity,
+    window_start: date | None = None,
+    window_end: date | None = None,
+) -> list[dict]:
+    # The window is the contract filters' overlap test: delivery_end >= start, start <= end.
+    window = ContractFilters(delivery_start_from=window_start, delivery_end_to=window_end)
+    rows = await portfolio_repository(session).list_holding_measures(
+        user_id=user_id, filters=window
+    )
+    if not rows:
+        return []
+
+    delivery_starts = np.array([row[0] for row in rows], dtype="datetime64[D]")
+    delivery_ends = np.array([row[1] for row in rows], dtype="datetime64[D]")
+    quantity_units = np.array(
+        [int((Decimal(row[2]) / SCHEDULE_CAPACITY_QUANTUM).to_integral_value()) for row in rows],
+        dtype=object,
+    )
+    cost_units = np.array(
+        [int((Decimal(row[3]) / SCHEDULE_COST_QUANTUM).to_integral_value()) for row in rows],
+        dtype=object,
+    )
+    return build_delivery_schedule(
+        delivery_starts=delivery_starts,
+        delivery_ends=delivery_ends,
+        quantity_units=quantity_units,
+        cost_units=cost_units,
+        granularity=granularity,
+        window_start=window_start,
+        window_end=window_end,
+    )
+
+
+ENERGY_TYPE_INDEX = {energy_type.value: index for index, energy_type in enumerate(EnergyType)}
+
+
+def rank_candidate_additions(
+    *,
+    baseline: dict,
+    energy_type_codes: np.ndarray,
+    quantities: np.ndarray,
+    costs: np.ndarray,
+    rank_by: WhatIfRankBy,
+    sort_direction: ContractSortDirection,
+) -> np.ndarray:
+    """The ascending rank key of every candidate, in one array pass.
+
+    Only the baseline aggregates (totals plus capacity per energy type) are needed,
+    so the cost is O(candidates) regardless of how many holdings the portfolio has.
+    """
+    base_capacity = float(baseline["total_capacity_mwh"])
+    base_cost = float(baseline["total_cost"])
+    capacity_after = base_capacity + quantities
+
+    if rank_by == WhatIfRankBy.weighted_avg_price:
+        rank_key = np.divide(
+            base_cost + costs,
+            capacity_after,
+            out=np.zeros_like(capacity_after),
+            where=capacity_after > 0,
+        )
+    elif rank_by == WhatIfRankBy.total_cost:
+        rank_key = costs
+    elif rank_by == WhatIfRankBy.total_capacity:
+        rank_key = quantities
+    else:
+        capacity_by_type = _capacity_by_energy_type(baseline)
+        type_capacity_before = capacity_by_type[energy_type_codes]
+        share_after = np.divide(
+            type_capacity_before + quantities,
+            capacity_after,
+            out=np.zeros_like(capacity_after),
+            where=capacity_after > 0,
+        )
+        share_before = (
+            type_capacity_before / base_capacity if base_capacity > 0 else 0.0
+        )
+        rank_key = share_after - share_before
+    return -rank_key if sort_direction == ContractSortDirection.desc else rank_key
+
+
+def top_rank_positions(rank_key: np.ndarray, contract_ids: np.ndarray, top: int) -> np.ndarray:
+    """Positions of the ``top`` smallest keys, ties broken by contract id.
+
+    A partition finds the cut-off key in O(n); only rows at or under it are sorted.
+    """
+    if len(rank_key) > top:
+        threshold = np.partition(rank_key, top - 1)[top - 1]
+        (positions,) = np.nonzero(rank_key <= threshold)
+    else:
+        positions = np.arange(len(rank_key))
+    order = np.lexsort((contract_ids[positions], rank_key[positions]))[:top]
+    return positions[order]
+
+
+def _capacity_by_energy_type(baseline: dict) -> np.ndarray:
+    capacity_by_type = np.zeros(len(ENERGY_TYPE_INDEX))
+    for item in baseline["breakdown_by_energy_type"]:
+        type_index = ENERGY_TYPE_INDEX.get(item["energy_type"])
+        if type_index is not None:
+            capacity_by_type[type_index] = float(item["total_capacity_mwh"])
+    return capacity_by_type
+
+
+def describe_candidate_addition(*, baseline: dict, row: Sequence) -> dict:
+    """The post-add metrics for one candidate row, exact in ``Decimal`` like the baseline."""
+    contract_id, energy_type, quantity, price, total_value = row
+    base_capacity = Decimal(baseline["total_capacity_mwh"])
+    base_cost = Decimal(baseline["total_cost"])
+    capacity_after = base_capacity + quantity
+    cost_after = base_cost + total_value
+    avg_price_after = cost_after / capacity_after if capacity_after > 0 else Decimal("0")
+
+    type_capacity_before = float(
+        _capacity_by_energy_type(baseline)[ENERGY_TYPE_INDEX[energy_type]]
+    )
+    share_before = type_capacity_before / float(base_capacity) if base_capacity > 0 else 0.0
+    share_after = (
+        (type_capacity_before + float(quantity)) / float(capacity_after)
+        if capacity_after > 0
+        else 0.0
+    )
+    return {
+        "contract_id": contract_id,
+        "energy_type": energy_type,
+        "quantity_mwh": quantity,
+        "price_per_mwh": price,
+        "total_cost_after": cost_after,
+        "total_cost_delta": total_value,
+        "total_capacity_after": capacity_after,
+        "total_capacity_delta": quantity,
+        "weighted_avg_price_after": avg_price_after,
+        "weighted_avg_price_delta": (
+            avg_price_after - Decimal(baseline["weighted_avg_price_per_mwh"])
+        ),
+        "energy_type_share_after": share_after,
+        "energy_type_share_delta": share_after - share_before,
+    }
+
+
+async def simulate_portfolio_additions(
+    *,
+    session: AsyncSession,
+    user_id: int,
+    filters: ContractFilters,
+    rank_by: WhatIfRankBy,
+    sort_direction: ContractSortDirection,
+    top: int,
+) -> dict:
+    baseline = await get_portfolio_metrics(session=session, user_id=user_id)
+
+    # The rank key depends on the baseline, so every filtered candidate is ranked;
+    # cutting the set in filter order first would drop the best additions. Batches
+    # are merged into a running top, so memory is bounded by batch size + ``top``.
+    best_rows: list[Sequence] = []
+    candidates_evaluated = 0
+    async for batch in portfolio_repository(session).stream_candidates(
+        user_id=user_id, filters=filters, batch_size=WHAT_IF_BATCH_SIZE
+    ):
+        batch_rows = [row for row in batch if row[1] in ENERGY_TYPE_INDEX]
+        candidates_evaluated += len(batch_rows)
+        rows = best_rows + batch_rows
+        rank_key = rank_candidate_additions(
+            baseline=baseline,
+            energy_type_codes=np.array(
+                [ENERGY_TYPE_INDEX[row[1]] for row in rows], dtype=np.int64
+            ),
+            quantities=np.array([float(row[2]) for row in rows]),
+            costs=np.array([float(row[4]) for row in rows]),
+            rank_by=rank_by,
+            sort_direction=sort_direction,
+        )
+        contract_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        best_rows = [rows[position] for position in top_rank_positions(rank_key, contract_ids, top)]
+
+    return {
+        "user_id": user_id,
+        "baseline": baseline,
+        "candidates_evaluated": candidates_evaluated,
+        "candidates": [
+            describe_candidate_addition(baseline=baseline, row=row) for row in best_rows
+        ],
+    }
@@ -0,0 +1,216 @@
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timezone
+from decimal import Decimal
+import logging
+
+from sqlalchemy import case, desc, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import dialect_insert
+from app.models import Contract, ContractPriceHistory, ContractPriceRollup, Location
+from app.schemas import EnergyType, PriceBucket, PriceChangeReason, PriceRollupRead
+
+logger = logging.getLogger(__name__)
+
+MAX_ROLLUP_ROWS = 1000
+
+
+def as_utc(moment: datetime) -> datetime:
+    # Naive datetimes (query parameters without an offset) are taken as UTC.
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def bucket_start(moment: datetime, bucket: PriceBucket) -> datetime:
+    """Start of the UTC ``bucket`` containing ``moment`` (``date_trunc`` semantics)."""
+    moment = as_utc(moment).replace(minute=0, second=0, microsecond=0)
+    if bucket == PriceBucket.hour:
+        return moment
+    moment = moment.replace(hour=0)
+    if bucket == PriceBucket.day:
+        return moment
+    return moment.replace(day=1)
+
+
+def _rollup_rows(history_rows: Sequence[dict]) -> list[dict]:
+    """Pre-aggregate new prices per rollup key so each key is upserted once."""
+    rollups: dict[tuple, dict] = {}
+    for row in history_rows:
+        if not row["price_changed"]:
+            continue
+        price, recorded_at = row["price_per_mwh"], row["recorded_at"]
+        for bucket in PriceBucket:
+            key = (
+                bucket.value,
+                row["energy_type"],
+                row["location_id"],
+                bucket_start(recorded_at, bucket),
+            )
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollups[key] = {
+                    "bucket": key[0],
+                    "energy_type": key[1],
+                    "location_id": key[2],
+                    "bucket_start": key[3],
+                    "open_price": price,
+                    "open_at": recorded_at,
+                    "high_price": price,
+                    "low_price": price,
+                    "close_price": price,
+                    "close_at": recorded_at,
+                    "observations": 1,
+                    "price_sum": price,
+                }
+                continue
+            rollup["high_price"] = max(rollup["high_price"], price)
+            rollup["low_price"] = min(rollup["low_price"], price)
+            rollup["close_price"] = price
+            rollup["close_at"] = recorded_at
+            rollup["observations"] += 1
+            rollup["price_sum"] += price
+    # A fixed upsert order keeps concurrent writers from deadlocking on rollup rows.
+    return [rollups[key] for key in sorted(rollups)]
+
+
+async def _upsert_rollups(*, session: AsyncSession, rows: list[dict]) -> None:
+    postgres = session.bind is not None and session.bind.dialect.name == "postgresql"
+    greatest, least = (func.greatest, func.least) if postgres else (func.max, func.min)
+    statement = dialect_insert(session)(ContractPriceRollup).values(rows)
+    new, current = statement.excluded, ContractPriceRollup
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                ContractPriceRollup.bucket,
+                ContractPriceRollup.energy_type,
+                ContractPriceRollup.location_id,
+                ContractPriceRollup.bucket_start,
+            ],
+            set_={
+                "open_price": case(
+                    (new.open_at < current.open_at, new.open_price), else_=current.open_price
+                ),
+                "open_at": least(new.open_at, current.open_at),
+                "high_price": greatest(new.high_price, current.high_price),
+                "low_price": least(new.low_price, current.low_price),
+                "close_price": case(
+                    (new.close_at >= current.close_at, new.close_price),
+                    else_=current.close_price,
+                ),
+                "close_at": greatest(new.close_at, current.close_at),
+                "observations": current.observations + new.observations,
+                "price_sum": current.price_sum + new.price_sum,
+            },
+        )
+    )
+
+
+async def record_price_history(
+    *,
+    session: AsyncSession,
+    contracts: Sequence[Contract],
+    reason: PriceChangeReason,
+    previous: Mapping[int, tuple[Decimal, str | None]] | None = None,
+    recorded_at: datetime | None = None,
+) -> int:
+    """Append history rows for contracts whose price or status changed; caller commits.
+
+    ``previous`` maps contract id to its ``(price_per_mwh, status)`` before the
+    change; contracts missing from it (all of them when it is None) are recorded
+    as new prices. The rollups for new prices are upserted in the same
+    transaction. Returns the number of history rows written.
+    """
+    recorded_at = recorded_at or datetime.now(timezone.utc)
+    previous = previous or {}
+    history_rows = []
+    for contract in contracts:
+        old_price, old_status = previous.get(contract.id, (None, None))
+        price_changed = old_price is None or old_price != contract.price_per_mwh
+        if not price_changed and old_status == contract.status:
+            continue
+        history_rows.append(
+            {
+                "contract_id": contract.id,
+                "recorded_at": recorded_at,
+                "reason": reason.value,
+                "energy_type": contract.energy_type,
+                "location_id": contract.location_id,
+                "price_per_mwh": contract.price_per_mwh,
+                "status": contract.status,
+                "price_changed": price_changed,
+            }
+        )
+    if not history_rows:
+        return 0
+    await session.execute(insert(ContractPriceHistory), history_rows)
+    rollup_rows = _rollup_rows(history_rows)
+    if rollup_rows:
+        await _upsert_rollups(session=session, rows=rollup_rows)
+    return len(history_rows)
+
+
+async def list_contract_price_history(
+    *, session: AsyncSession, contract_id: int, limit: int
+) -> Sequence[ContractPriceHistory]:
+    """Newest first, from the (contract_id, recorded_at) index."""
+    statement = (
+        select(ContractPriceHistory)
+        .where(ContractPriceHistory.contract_id == contract_id)
+        .order_by(desc(ContractPriceHistory.recorded_at), desc(ContractPriceHistory.id))
+        .limit(limit)
+    )
+    result = await session.execute(statement)
+    return result.scalars().all()
+
+
+async def list_price_rollups(
+    *,
+    session: AsyncSession,
+    bucket: PriceBucket,
+    energy_type: EnergyType | None = None,
+    location: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = MAX_ROLLUP_ROWS,
+) -> list[PriceRollupRead]:
+    """OHLC buckets in ``[start, end)`` read straight from ``contract_price_rollups``."""
+    conditions = [ContractPriceRollup.bucket == bucket.value]
+    if energy_type is not None:
+        conditions.append(ContractPriceRollup.energy_type == energy_type.value)
+    if location is not None:
+        conditions.append(
+            ContractPriceRollup.location_id.in_(
+                select(Location.id).where(Location.name == location.strip())
+            )
+        )
+    if start is not None:
+        conditions.append(ContractPriceRollup.bucket_start >= bucket_start(start, bucket))
+    if end is not None:
+        conditions.append(ContractPriceRollup.bucket_start < as_utc(end))
+    statement = (
+        select(ContractPriceRollup)
+        .where(*conditions)
+        .order_by(
+            ContractPriceRollup.bucket_start,
+            ContractPriceRollup.energy_type,
+            ContractPriceRollup.location_id,
+        )
+        .limit(limit)
+    )
+    result = await session.execute(statement)
+    return [
+        PriceRollupRead(
+            bucket=rollup.bucket,
+            bucket_start=rollup.bucket_start,
+            energy_type=rollup.energy_type,
+            location=rollup.location,
+            open_price=rollup.open_price,
+            high_price=rollup.high_price,
+            low_price=rollup.low_price,
+            close_price=rollup.close_price,
+            average_price=(rollup.price_sum / rollup.observations).quantize(Decimal("0.000001")),
+            observations=rollup.observations,
+        )
+        for rollup in result.scalars()
+    ]
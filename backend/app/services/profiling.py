@@ -0,0 +1,276 @@
+import asyncio
+import contextvars
+import cProfile
+from dataclasses import dataclass
+import io
+import json
+import logging
+import os
+from pathlib import Path
+import pstats
+import random
+import re
+import secrets
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Off by default; when off the middleware is not installed at all.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Requests carrying this value in X-Profile-Token are profiled; it also guards /profiles.
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_DIR = Path(
+    os.getenv("PROFILING_DIR", Path(tempfile.gettempdir()) / "energy-marketplace-profiles")
+)
+PROFILING_MAX_TRACES = int(os.getenv("PROFILING_MAX_TRACES", "100"))
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+PROFILE_ID_HEADER = b"x-profile-id"
+TOP_FUNCTIONS = 30
+
+TRACE_ID_PATTERN = re.compile(r"^\d{19}-[0-9a-f]{8}$")
+
+
+@dataclass
+class DatabaseTimer:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# Set only while a profiled request runs, so other requests' queries are not counted.
+_database_timer: contextvars.ContextVar[DatabaseTimer | None] = contextvars.ContextVar(
+    "profiling_database_timer", default=None
+)
+_listeners_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _database_timer.get() is not None:
+        conn.info.setdefault("profiling_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    timer = _database_timer.get()
+    if timer is None:
+        return
+    started = conn.info.get("profiling_query_started")
+    if started:
+        timer.queries += 1
+        timer.seconds += time.perf_counter() - started.pop()
+
+
+def install_database_timing() -> None:
+    """Time cursor executions on every engine; wall time around the awaited DB call."""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _listeners_installed = True
+
+
+def _bucket(filename: str, function_name: str) -> str:
+    if "epoll" in function_name or "kqueue" in function_name or "select.select" in function_name:
+        return "event_loop_wait"
+    if "pydantic" in filename or "pydantic_core" in function_name:
+        return "pydantic"
+    if "fastapi/encoders" in filename or "/json/" in filename or "json" in function_name:
+        return "serialization"
+    if "sqlalchemy" in filename:
+        return "sqlalchemy"
+    if any(driver in filename for driver in ("asyncpg", "aiosqlite", "sqlite3")):
+        return "db_driver"
+    if "starlette" in filename or "fastapi" in filename or "uvicorn" in filename:
+        return "framework"
+    if f"{os.sep}app{os.sep}" in filename:
+        return "app"
+    return "other"
+
+
+def summarize_profile(profiler: cProfile.Profile) -> dict:
+    """Own time per bucket plus the top functions by cumulative time."""
+    stats = pstats.Stats(profiler)
+    buckets: dict[str, float] = {}
+    functions = []
+    for (filename, line, function_name), (_, calls, own, cumulative, _) in stats.stats.items():
+        bucket = _bucket(filename, function_name)
+        buckets[bucket] = buckets.get(bucket, 0.0) + own
+        functions.append((cumulative, own, calls, f"{filename}:{line}({function_name})"))
+    functions.sort(reverse=True)
+    return {
+        "own_time_ms_by_bucket": {
+            bucket: round(1000 * seconds, 3) for bucket, seconds in sorted(buckets.items())
+        },
+        "top_functions": [
+            {
+                "function": name,
+                "calls": calls,
+                "own_ms": round(1000 * own, 3),
+                "cumulative_ms": round(1000 * cumulative, 3),
+            }
+            for cumulative, own, calls, name in functions[:TOP_FUNCTIONS]
+        ],
+    }
+
+
+class ProfileStore:
+    """Directory of ``<id>.prof`` (pstats) and ``<id>.json`` (summary) pairs.
+
+    Ids start with a nanosecond timestamp, so name order is age order; writing
+    past ``max_traces`` deletes the oldest.
+    """
+
+    def __init__(self, directory: Path = PROFILING_DIR, max_traces: int = PROFILING_MAX_TRACES):
+        self.directory = directory
+        self.max_traces = max_traces
+
+    @staticmethod
+    def new_trace_id() -> str:
+        return f"{time.time_ns():019d}-{secrets.token_hex(4)}"
+
+    def save(self, trace_id: str, profiler: cProfile.Profile, summary: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(self.directory / f"{trace_id}.prof")
+        (self.directory / f"{trace_id}.json").write_text(json.dumps(summary))
+        for stale in self._trace_ids()[: -self.max_traces]:
+            (self.directory / f"{stale}.prof").unlink(missing_ok=True)
+            (self.directory / f"{stale}.json").unlink(missing_ok=True)
+
+    def _trace_ids(self) -> list[str]:
+        if not self.directory.exists():
+            return []
+        return sorted(path.stem for path in self.directory.glob("*.json"))
+
+    def list(self) -> list[dict]:
+        summaries = []
+        for trace_id in reversed(self._trace_ids()):
+            summary = self.get(trace_id)
+            if summary is not None:
+                summary.pop("top_functions", None)
+                summaries.append(summary)
+        return summaries
+
+    def get(self, trace_id: str) -> dict | None:
+        if not TRACE_ID_PATTERN.match(trace_id):
+            return None
+        try:
+            return json.loads((self.directory / f"{trace_id}.json").read_text())
+        except FileNotFoundError:
+            return None
+
+    def profile_path(self, trace_id: str) -> Path | None:
+        if not TRACE_ID_PATTERN.match(trace_id):
+            return None
+        path = self.directory / f"{trace_id}.prof"
+        return path if path.exists() else None
+
+    def text_report(self, trace_id: str, limit: int = 60) -> str | None:
+        path = self.profile_path(trace_id)
+        if path is None:
+            return None
+        output = io.StringIO()
+        pstats.Stats(str(path), stream=output).sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+
+profile_store = ProfileStore()
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for header_name, header_value in scope.get("headers", []):
+        if header_name == name:
+            return header_value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that cProfiles requests opted in by token header or sampling.
+
+    cProfile follows the whole thread, so one request is profiled at a time and
+    other requests are not sampled meanwhile; work interleaved on the event loop
+    still shows up and idle time lands in the ``event_loop_wait`` bucket. Query
+    time is measured per request with SQLAlchemy cursor events. The trace id is
+    returned in ``X-Profile-Id``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        token: str = PROFILING_TOKEN,
+        sample_rate: float = PROFILING_SAMPLE_RATE,
+        store: ProfileStore | None = None,
+    ) -> None:
+        self.app = app
+        self.token = token
+        self.sample_rate = sample_rate
+        self.store = store or profile_store
+        self._active = False
+        install_database_timing()
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        if self._active or scope["path"].startswith("/profiles"):
+            return False
+        if self.token and secrets.compare_digest(
+            _header(scope, PROFILE_TOKEN_HEADER) or "", self.token
+        ):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = self.store.new_trace_id()
+        status_code = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER, trace_id.encode()),
+                ]
+            await send(message)
+
+        self._active = True
+        timer = DatabaseTimer()
+        token = _database_timer.set(timer)
+        profiler = cProfile.Profile()
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            wall_seconds = time.perf_counter() - wall_started
+            cpu_seconds = time.thread_time() - cpu_started
+            _database_timer.reset(token)
+            self._active = False
+            summary = {
+                "id": trace_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": scope.get("query_string", b"").decode("latin-1"),
+                "status_code": status_code,
+                "created_at": time.time(),
+                "wall_ms": round(1000 * wall_seconds, 3),
+                "cpu_ms": round(1000 * cpu_seconds, 3),
+                "db_ms": round(1000 * timer.seconds, 3),
+                "db_queries": timer.queries,
+                **summarize_profile(profiler),
+            }
+            try:
+                await asyncio.to_thread(self.store.save, trace_id, profiler, summary)
+            except Exception:
+                logger.exception(f"Saving profile failed: {trace_id = }")
+            else:
+                logger.info(f"Request profiled: {trace_id = }, {scope['path'] = }")
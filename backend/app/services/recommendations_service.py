@@ -0,0 +1,235 @@
+import asyncio
+from collections.abc import Sequence
+import logging
+import os
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Contract
+from app.repositories import contract_repository
+from app.schemas import ContractRead, EnergyType
+
+logger = logging.getLogger(__name__)
+
+ENERGY_TYPE_CODES = {energy_type.value: code for code, energy_type in enumerate(EnergyType)}
+# One-hot energy types are scaled so a type mismatch outweighs most numeric gaps.
+ENERGY_TYPE_WEIGHT = 1.5
+# Locations are categorical with many values, so they are not embedded in the tree;
+# a location id mismatch is applied as a distance penalty when re-ranking instead.
+LOCATION_MISMATCH_PENALTY = 1.0
+CANDIDATE_MULTIPLIER = 4
+NUMERIC_FEATURES = 4
+SIMILARITY_REBUILD_BATCH_SIZE = 5000
+
+
+def _numeric_features(
+    prices: np.ndarray,
+    quantities: np.ndarray,
+    delivery_starts: np.ndarray,
+    delivery_ends: np.ndarray,
+) -> np.ndarray:
+    starts = delivery_starts.astype("datetime64[D]").astype(np.int64)
+    durations = delivery_ends.astype("datetime64[D]").astype(np.int64) - starts + 1
+    return np.column_stack(
+        [np.log1p(prices), np.log1p(quantities), starts.astype(float), np.log1p(durations)]
+    )
+
+
+def _energy_type_features(energy_types: Sequence[str]) -> np.ndarray:
+    one_hot = np.zeros((len(energy_types), len(ENERGY_TYPE_CODES)))
+    for row, energy_type in enumerate(energy_types):
+        code = ENERGY_TYPE_CODES.get(energy_type)
+        if code is not None:
+            one_hot[row, code] = ENERGY_TYPE_WEIGHT
+    return one_hot
+
+
+class ContractSimilarityIndex:
+    """KD-tree over normalized contract features with an incremental write buffer.
+
+    The tree is immutable, so writes between rebuilds are tracked as tombstones
+    (ids whose tree row is stale) plus a small pending matrix that is scanned by
+    brute force at query time. The tree is rebuilt lazily once the buffer grows
+    past ``rebuild_ratio`` of the indexed rows or the index is older than
+    ``max_age_seconds`` (which also picks up writes made by other workers).
+    """
+
+    def __init__(self, *, max_age_seconds: float, rebuild_ratio: float = 0.1) -> None:
+        self.max_age_seconds = max_age_seconds
+        self.rebuild_ratio = rebuild_ratio
+        self._lock = asyncio.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._tree: cKDTree | None = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._indexed_ids: set[int] = set()
+        self._mean = np.zeros(NUMERIC_FEATURES)
+        self._std = np.ones(NUMERIC_FEATURES)
+        self._built_at = 0.0
+        self._pending: dict[int, np.ndarray] = {}
+        self._removed: set[int] = set()
+        self._location_ids: dict[int, int] = {}
+
+    @property
+    def is_built(self) -> bool:
+        return self._tree is not None
+
+    @property
+    def size(self) -> int:
+        return len(self._ids)
+
+    def _needs_rebuild(self) -> bool:
+        if self._tree is None:
+            return True
+        if time.monotonic() - self._built_at > self.max_age_seconds:
+            return True
+        churn = len(self._pending) + len(self._removed)
+        return churn > max(self.rebuild_ratio * len(self._ids), 64)
+
+    def _encode(
+        self,
+        *,
+        energy_types: Sequence[str],
+        prices: np.ndarray,
+        quantities: np.ndarray,
+        delivery_starts: np.ndarray,
+        delivery_ends: np.ndarray,
+    ) -> np.ndarray:
+        numeric = _numeric_features(prices, quantities, delivery_starts, delivery_ends)
+        return np.hstack([(numeric - self._mean) / self._std, _energy_type_features(energy_types)])
+
+    def _encode_contract(self, contract: Contract) -> np.ndarray:
+        return self._encode(
+            energy_types=[contract.energy_type],
+            prices=np.array([float(contract.price_per_mwh)]),
+            quantities=np.array([float(contract.quantity_mwh)]),
+            delivery_starts=np.array([contract.delivery_start], dtype="datetime64[D]"),
+            delivery_ends=np.array([contract.delivery_end], dtype="datetime64[D]"),
+        )[0]
+
+    async def ensure_ready(self, session: AsyncSession) -> None:
+        if not self._needs_rebuild():
+            return
+        async with self._lock:
+            if self._needs_rebuild():
+                await self.rebuild(session)
+
+    async def rebuild_now(self, session: AsyncSession) -> None:
+        """Rebuild regardless of age, serialized with lazy rebuilds."""
+        async with self._lock:
+            await self.rebuild(session)
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        started = time.perf_counter()
+        rows = []
+        batches = contract_repository(session).scan(batch_size=SIMILARITY_REBUILD_BATCH_SIZE)
+        async for batch in batches:
+            rows.extend(
+                (
+                    row.id,
+                    row.energy_type,
+                    row.price_per_mwh,
+                    row.quantity_mwh,
+                    row.delivery_start,
+                    row.delivery_end,
+                    row.location_id,
+                )
+                for row in batch
+            )
+
+        self.reset()
+        self._ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self._indexed_ids = set(self._ids.tolist())
+        self._location_ids = {row[0]: row[6] for row in rows}
+        numeric = _numeric_features(
+            np.array([float(row[2]) for row in rows]),
+            np.array([float(row[3]) for row in rows]),
+            np.array([row[4] for row in rows], dtype="datetime64[D]"),
+            np.array([row[5] for row in rows], dtype="datetime64[D]"),
+        )
+        if len(rows):
+            self._mean = numeric.mean(axis=0)
+            std = numeric.std(axis=0)
+            self._std = np.where(std > 0, std, 1.0)
+        features = np.hstack(
+            [(numeric - self._mean) / self._std, _energy_type_features([row[1] for row in rows])]
+        )
+        self._tree = cKDTree(features) if len(rows) else cKDTree(np.zeros((0, features.shape[1])))
+        self._built_at = time.monotonic()
+        logger.info(
+            f"Similarity index rebuilt: {len(rows) = }, "
+            f"elapsed_ms={1000 * (time.perf_counter() - started):.1f}"
+        )
+
+    def upsert(self, contract: Contract) -> None:
+        if self._tree is None:
+            return
+        if contract.id in self._indexed_ids:
+            self._removed.add(contract.id)
+        self._pending[contract.id] = self._encode_contract(contract)
+        self._location_ids[contract.id] = contract.location_id
+
+    def remove(self, contract_id: int) -> None:
+        if self._tree is None:
+            return
+        self._pending.pop(contract_id, None)
+        self._location_ids.pop(contract_id, None)
+        if contract_id in self._indexed_ids:
+            self._removed.add(contract_id)
+
+    def query(self, contract: ContractRead, k: int) -> list[tuple[int, float]]:
+        """Return up to ``k`` (contract_id, distance) pairs nearest to ``contract``."""
+        if self._tree is None:
+            return []
+        location_id = self._location_ids.get(contract.id)
+        vector = self._encode_contract(contract)
+        candidates: dict[int, float] = {}
+
+        fetch = min(len(self._ids), (k + 1) * CANDIDATE_MULTIPLIER + len(self._removed))
+        if fetch:
+            distances, positions = self._tree.query(vector, k=fetch)
+            for distance, position in zip(np.atleast_1d(distances), np.atleast_1d(positions)):
+                contract_id = int(self._ids[position])
+                if contract_id in self._removed or contract_id == contract.id:
+                    continue
+                candidates[contract_id] = float(distance)
+
+        if self._pending:
+            pending_ids = list(self._pending)
+            pending_distances = np.linalg.norm(
+                np.stack(list(self._pending.values())) - vector, axis=1
+            )
+            for contract_id, distance in zip(pending_ids, pending_distances.tolist()):
+                if contract_id != contract.id:
+                    candidates[contract_id] = distance
+
+        scored = [
+            (
+                contract_id,
+                distance
+                + (
+                    LOCATION_MISMATCH_PENALTY
+                    if self._location_ids.get(contract_id) != location_id
+                    else 0.0
+                ),
+            )
+            for contract_id, distance in candidates.items()
+        ]
+        scored.sort(key=lambda item: (item[1], item[0]))
+        return scored[:k]
+
+
+similarity_index = ContractSimilarityIndex(
+    max_age_seconds=float(os.getenv("SIMILARITY_INDEX_MAX_AGE_SECONDS", "300"))
+)
+
+
+async def find_similar_contracts(
+    *, session: AsyncSession, contract: ContractRead, k: int
+) -> list[tuple[int, float]]:
+    await similarity_index.ensure_ready(session)
+    return similarity_index.query(contract, k)
@@ -0,0 +1,235 @@
+from dataclasses import dataclass
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import re
+
+from sqlalchemy import MetaData, Row, UniqueConstraint, delete, inspect, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.models import Base, SchemaVersion
+
+logger = logging.getLogger(__name__)
+
+# Bump together with a new sql/migrations/NNN_*.sql file and the row in sql/schema.sql.
+SCHEMA_VERSION = 9
+# strict: refuse to start on a mismatch; warn: log and continue; off: skip the query.
+SCHEMA_CHECK_MODE = os.getenv("SCHEMA_CHECK", "strict").lower()
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "sql"
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_\w+\.sql$")
+
+
+class SchemaMismatch(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    path: Path
+
+
+def metadata_fingerprint(metadata: MetaData = Base.metadata) -> str:
+    """Hash of the tables, columns, indexes, and unique constraints the models declare.
+
+    Types are rendered for PostgreSQL so the value does not depend on the database
+    the app happens to be pointed at.
+    """
+    dialect = postgresql.dialect()
+    tables = []
+    for table in sorted(metadata.tables.values(), key=lambda item: item.name):
+        tables.append(
+            {
+                "name": table.name,
+                "columns": [
+                    [column.name, column.type.compile(dialect=dialect), column.nullable]
+                    for column in table.columns
+                ],
+                "primary_key": [column.name for column in table.primary_key.columns],
+                "indexes": sorted(
+                    [index.name, [column.name for column in index.columns], index.unique]
+                    for index in table.indexes
+                ),
+                "unique": sorted(
+                    sorted(column.name for column in constraint.columns)
+                    for constraint in table.constraints
+                    if isinstance(constraint, UniqueConstraint)
+                ),
+            }
+        )
+    return hashlib.sha256(json.dumps(tables, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def discover_migrations(migrations_dir: Path = SQL_DIR / "migrations") -> list[Migration]:
+    migrations = []
+    for path in migrations_dir.glob("*.sql"):
+        match = MIGRATION_FILE_PATTERN.match(path.name)
+        if match:
+            migrations.append(Migration(version=int(match.group(1)), path=path))
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+async def read_schema_version(connection: AsyncConnection) -> Row | None:
+    """The recorded version row, or None when the table does not exist yet."""
+    try:
+        result = await connection.execute(
+            select(SchemaVersion.version, SchemaVersion.fingerprint).where(SchemaVersion.id == 1)
+        )
+    except DBAPIError:
+        await connection.rollback()
+        return None
+    return result.first()
+
+
+async def check_schema(engine: AsyncEngine, *, mode: str = SCHEMA_CHECK_MODE) -> int | None:
+    """Compare the recorded schema version and fingerprint with this code, in one query.
+
+    Replaces ``create_all`` at startup: no catalog introspection and no DDL, so
+    every worker boots with a single round trip. Returns the recorded version.
+    """
+    if mode == "off":
+        return None
+    async with engine.connect() as connection:
+        recorded = await read_schema_version(connection)
+    expected = metadata_fingerprint()
+    if recorded is None:
+        problem = "database has no schema_version row"
+    elif recorded.version != SCHEMA_VERSION:
+        problem = f"database is at version {recorded.version}, code expects {SCHEMA_VERSION}"
+    elif recorded.fingerprint != expected:
+        problem = f"fingerprint {recorded.fingerprint} does not match models ({expected})"
+    else:
+        logger.info(f"Schema check passed: {recorded.version = }")
+        return recorded.version
+
+    message = f"Schema mismatch: {problem}; run `python -m app.migrate_cli`"
+    if mode == "strict":
+        raise SchemaMismatch(message)
+    logger.warning(message)
+    return recorded.version if recorded is not None else None
+
+
+async def _has_table(connection: AsyncConnection, name: str) -> bool:
+    return await connection.run_sync(
+        lambda sync_connection: inspect(sync_connection).has_table(name)
+    )
+
+
+async def _execute_script(connection: AsyncConnection, path: Path) -> None:
+    raw_connection = await connection.get_raw_connection()
+    # asyncpg runs a multi-statement script (DO blocks, functions) in one simple query.
+    await raw_connection.driver_connection.execute(path.read_text())
+
+
+async def record_schema_version(connection: AsyncConnection, version: int) -> None:
+    await connection.run_sync(
+        lambda sync_connection: SchemaVersion.__table__.create(sync_connection, checkfirst=True)
+    )
+    await connection.execute(delete(SchemaVersion))
+    await connection.execute(
+        SchemaVersion.__table__.insert().values(
+            id=1, version=version, fingerprint=metadata_fingerprint()
+        )
+    )
+
+
+async def migrate(
+    engine: AsyncEngine,
+    *,
+    baseline: int | None = None,
+    dry_run: bool = False,
+    sql_dir: Path = SQL_DIR,
+) -> list[int]:
+    """Bring the database to ``SCHEMA_VERSION``; returns the migration versions applied.
+
+    An empty database gets the full ``sql/schema.sql`` (``create_all`` on SQLite).
+    A database that predates ``schema_version`` needs ``baseline``: the last
+    migration already applied to it by hand.
+    """
+    migrations = discover_migrations(sql_dir / "migrations")
+    if migrations and migrations[-1].version != SCHEMA_VERSION:
+        raise SchemaMismatch(
+            f"Latest migration is {migrations[-1].version}, SCHEMA_VERSION is {SCHEMA_VERSION}"
+        )
+
+    async with engine.connect() as connection:
+        recorded = await read_schema_version(connection)
+        fresh = recorded is None and not await _has_table(connection, "contracts")
+    if recorded is not None:
+        current = recorded.version
+    elif fresh:
+        current = None
+    elif baseline is not None:
+        current = baseline
+    else:
+        raise SchemaMismatch(
+            "Database predates schema_version; rerun with --baseline <last applied migration>"
+        )
+
+    if current is None:
+        logger.info(f"Migrate: creating schema at version {SCHEMA_VERSION}: {dry_run = }")
+        applied = []
+    else:
+        applied = [migration.version for migration in migrations if migration.version > current]
+        logger.info(f"Migrate: {current = }, pending={applied}, {dry_run = }")
+    if dry_run:
+        return applied
+
+    if current is None:
+        if engine.dialect.name == "postgresql":
+            async with engine.connect() as connection:
+                await _execute_script(connection, sql_dir / "schema.sql")
+        else:
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+    else:
+        for migration in migrations:
+            if migration.version not in applied:
+                continue
+            if engine.dialect.name != "postgresql":
+                raise SchemaMismatch("SQL migrations only run on PostgreSQL")
+            # Each file wraps itself in BEGIN/COMMIT.
+            async with engine.connect() as connection:
+                await _execute_script(connection, migration.path)
+            logger.info(f"Migrate: applied {migration.path.name}")
+
+    async with engine.begin() as connection:
+        await record_schema_version(connection, SCHEMA_VERSION)
+    return applied
+
+
+async def verify_schema(engine: AsyncEngine) -> list[str]:
+    """Full catalog comparison with the models (slow; for the migrate command only)."""
+
+    def compare(sync_connection) -> list[str]:
+        inspector = inspect(sync_connection)
+        problems = []
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                problems.append(f"missing table {table.name}")
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            problems.extend(
+                f"missing column {table.name}.{column.name}"
+                for column in table.columns
+                if column.name not in columns
+            )
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            declared = {index.name for index in table.indexes}
+            problems.extend(
+                f"missing index {table.name}.{name}" for name in sorted(declared - indexes)
+            )
+            problems.extend(
+                f"undeclared index {table.name}.{name}"
+                for name in sorted(indexes - declared)
+                if name is not None
+            )
+        return problems
+
+    async with engine.connect() as connection:
+        return await connection.run_sync(compare)
@@ -0,0 +1,128 @@
+import asyncio
+from dataclasses import asdict, dataclass
+import logging
+import os
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.schemas import ContractFilters
+from app.services.contracts_service import list_contracts
+from app.services.distribution_service import distribution_index
+from app.services.recommendations_service import similarity_index
+
+logger = logging.getLogger(__name__)
+
+# Imported at the top of app/main.py, so this approximates process start.
+PROCESS_STARTED = time.perf_counter()
+
+# Pages of the default and active-only contract listings read before serving traffic.
+STARTUP_PREWARM_PAGES = int(os.getenv("STARTUP_PREWARM_PAGES", "3"))
+STARTUP_PREWARM_PAGE_SIZE = 50
+STARTUP_PREWARM_TIMEOUT_SECONDS = float(os.getenv("STARTUP_PREWARM_TIMEOUT_SECONDS", "5"))
+
+
+def _elapsed_ms(since: float) -> float:
+    return round(1000 * (time.perf_counter() - since), 1)
+
+
+@dataclass
+class StartupReport:
+    schema_version: int | None = None
+    schema_check_ms: float | None = None
+    prewarm_ms: float | None = None
+    prewarmed_pages: int = 0
+    # Process start to the end of the lifespan startup, and to the first response.
+    ready_ms: float | None = None
+    time_to_first_request_ms: float | None = None
+    first_request_path: str | None = None
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+startup_report = StartupReport()
+
+
+async def prewarm_contract_pages(
+    *,
+    session_factory: async_sessionmaker[AsyncSession],
+    pages: int = STARTUP_PREWARM_PAGES,
+    page_size: int = STARTUP_PREWARM_PAGE_SIZE,
+) -> int:
+    """Read the hottest contract pages and build the similarity index before traffic.
+
+    Pages run concurrently on separate sessions, so the same queries open pool
+    connections and pull the hot partition and its indexes into the database's
+    buffer cache; the first user requests then skip both cold paths.
+    """
+
+    async def read_page(filters: ContractFilters, offset: int) -> None:
+        async with session_factory() as session:
+            await list_contracts(session=session, offset=offset, limit=page_size, filters=filters)
+
+    listings = [ContractFilters(), ContractFilters(active_only=True)]
+    await asyncio.gather(
+        *(
+            read_page(filters, page * page_size)
+            for filters in listings
+            for page in range(pages)
+        )
+    )
+    async with session_factory() as session:
+        await similarity_index.ensure_ready(session)
+        await distribution_index.ensure_ready(session)
+    return pages * len(listings)
+
+
+async def run_prewarm(
+    *,
+    session_factory: async_sessionmaker[AsyncSession],
+    timeout_seconds: float = STARTUP_PREWARM_TIMEOUT_SECONDS,
+) -> None:
+    """Pre-warm with a deadline; a slow or failed warm-up never blocks startup."""
+    if STARTUP_PREWARM_PAGES <= 0:
+        return
+    started = time.perf_counter()
+    try:
+        startup_report.prewarmed_pages = await asyncio.wait_for(
+            prewarm_contract_pages(session_factory=session_factory), timeout_seconds
+        )
+    except TimeoutError:
+        logger.warning(f"Startup pre-warm timed out: {timeout_seconds = }")
+    except Exception:
+        logger.exception("Startup pre-warm failed")
+    startup_report.prewarm_ms = _elapsed_ms(started)
+
+
+def mark_ready() -> None:
+    startup_report.ready_ms = _elapsed_ms(PROCESS_STARTED)
+    logger.info(f"Startup: ready in {startup_report.ready_ms} ms")
+
+
+class FirstRequestTimer:
+    """ASGI middleware recording time from process start to the first response."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or startup_report.time_to_first_request_ms is not None:
+            await self.app(scope, receive, send)
+            return
+
+        async def timed_send(message) -> None:
+            if (
+                message["type"] == "http.response.start"
+                and startup_report.time_to_first_request_ms is None
+            ):
+                startup_report.time_to_first_request_ms = _elapsed_ms(PROCESS_STARTED)
+                startup_report.first_request_path = scope["path"]
+                logger.info(
+                    f"Startup: first response after "
+                    f"{startup_report.time_to_first_request_ms} ms, {scope['path'] = }"
+                )
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
@@ -0,0 +1,83 @@
+"""Benchmark the portfolio optimizer on generated contract data.
+
+Run from the backend directory:
+
+    python -m benchmarks.optimizer_benchmark --contracts 100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.optimizer_service import (
+    build_coverage_matrix,
+    lp_lower_bound,
+    select_min_cost_cover,
+)
+from app.services.portfolios_service import ENERGY_TYPE_INDEX
+
+
+def generate_contracts(count: int, seed: int) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    delivery_starts = np.datetime64("2026-01-01") + rng.integers(0, 730, count)
+    return {
+        "energy_type_codes": rng.integers(0, len(ENERGY_TYPE_INDEX), count),
+        "quantities": np.round(rng.uniform(50, 1500, count), 3),
+        "prices": np.round(rng.uniform(20, 120, count), 6),
+        "delivery_starts": delivery_starts,
+        "delivery_ends": delivery_starts + rng.integers(30, 365, count),
+    }
+
+
+def run_scenario(name: str, contracts: dict[str, np.ndarray], targets: list, quantities: list) -> None:
+    started = time.perf_counter()
+    coverage = build_coverage_matrix(
+        energy_type_codes=contracts["energy_type_codes"],
+        quantities=contracts["quantities"],
+        delivery_starts=contracts["delivery_starts"],
+        delivery_ends=contracts["delivery_ends"],
+        targets=targets,
+    )
+    costs = contracts["quantities"] * contracts["prices"]
+    built = time.perf_counter()
+    selected, status = select_min_cost_cover(
+        costs=costs, coverage=coverage, targets=np.array(quantities)
+    )
+    solved = time.perf_counter()
+    lower_bound = lp_lower_bound(costs=costs, coverage=coverage, targets=np.array(quantities))
+    total_cost = float(costs[selected].sum())
+    gap = (total_cost - lower_bound) / lower_bound * 100 if lower_bound else 0.0
+    print(
+        f"{name:<28} status={status.value:<20} picks={len(selected):>5} "
+        f"cost={total_cost:>16,.2f} lp_gap={gap:6.2f}% "
+        f"matrix={1000 * (built - started):7.1f}ms solve={1000 * (solved - built):8.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contracts", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    contracts = generate_contracts(args.contracts, args.seed)
+    print(f"Generated {args.contracts:,} contracts")
+
+    run_scenario("total 250k MWh", contracts, [(None, None)], [250_000])
+    run_scenario(
+        "per energy type 40k MWh",
+        contracts,
+        [(code, None) for code in range(len(ENERGY_TYPE_INDEX))],
+        [40_000] * len(ENERGY_TYPE_INDEX),
+    )
+    months = np.arange(np.datetime64("2026-01"), np.datetime64("2028-01")).astype(object)
+    run_scenario(
+        "per month (24) 20k MWh",
+        contracts,
+        [(None, month) for month in months],
+        [20_000] * len(months),
+    )
+
+
+if __name__ == "__main__":
+    main()
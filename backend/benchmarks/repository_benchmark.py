@@ -0,0 +1,108 @@
+"""Benchmark the in-memory contract and portfolio repositories on generated data.
+
+Run from the backend directory:
+
+    python -m benchmarks.repository_benchmark --contracts 100000
+"""
+import argparse
+import asyncio
+from datetime import date, timedelta
+from decimal import Decimal
+import time
+
+import numpy as np
+
+from app.repositories import InMemoryStore
+from app.schemas import ContractFilters, ContractSortBy, ContractSortDirection, EnergyType
+
+LOCATIONS = ("Texas", "Ohio", "California", "Quebec", "Ontario", "Arizona")
+
+
+def generate_contract_fields(count: int, seed: int) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    energy_types = [energy_type.value for energy_type in EnergyType]
+    quantities = np.round(rng.uniform(50, 1500, count), 3)
+    prices = np.round(rng.uniform(20, 120, count), 6)
+    offsets = rng.integers(0, 730, count)
+    durations = rng.integers(30, 365, count)
+    return [
+        {
+            "energy_type": energy_types[index % len(energy_types)],
+            "quantity_mwh": Decimal(str(quantities[index])),
+            "price_per_mwh": Decimal(str(prices[index])),
+            "delivery_start": date(2026, 1, 1) + timedelta(days=int(offsets[index])),
+            "delivery_end": date(2026, 1, 1)
+            + timedelta(days=int(offsets[index] + durations[index])),
+            "location": LOCATIONS[index % len(LOCATIONS)],
+        }
+        for index in range(count)
+    ]
+
+
+async def timed(name: str, repeat: int, operation) -> None:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await operation()
+    elapsed_ms = 1000 * (time.perf_counter() - started) / repeat
+    print(f"{name:<40} {elapsed_ms:9.3f}ms")
+
+
+async def run(count: int, seed: int) -> None:
+    store = InMemoryStore()
+    fields = generate_contract_fields(count, seed)
+    started = time.perf_counter()
+    for item in fields:
+        await store.contracts.add(item)
+    print(f"Loaded {count:,} contracts in {1000 * (time.perf_counter() - started):,.1f}ms")
+
+    cheapest = ContractFilters(sort_by=ContractSortBy.price_per_mwh, price_max=40)
+    largest = ContractFilters(
+        sort_by=ContractSortBy.quantity_mwh, sort_direction=ContractSortDirection.desc
+    )
+    texas_solar = ContractFilters(location="texas", energy_types=[EnergyType.solar])
+    await timed(
+        "list default page",
+        100,
+        lambda: store.contracts.list(filters=ContractFilters(), offset=0, limit=50),
+    )
+    await timed(
+        "list by price, price_max=40",
+        100,
+        lambda: store.contracts.list(filters=cheapest, offset=0, limit=50),
+    )
+    await timed(
+        "list by quantity desc, deep page",
+        100,
+        lambda: store.contracts.list(filters=largest, offset=5_000, limit=50),
+    )
+    await timed(
+        "list location + energy type",
+        100,
+        lambda: store.contracts.list(filters=texas_solar, offset=0, limit=50),
+    )
+
+    for contract_id in range(1, min(count, 2_000) + 1):
+        await store.portfolios.add_holding(user_id=contract_id % 20, contract_id=contract_id)
+    await timed(
+        "portfolio metrics (running totals)",
+        1_000,
+        lambda: store.portfolios.metrics(user_id=1),
+    )
+    contract = await store.contracts.get_for_update(1)
+    await timed(
+        "update held contract price",
+        1_000,
+        lambda: store.contracts.update(contract, {"price_per_mwh": Decimal("55")}),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contracts", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(run(args.contracts, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+-- Convert an existing unpartitioned contracts table into the hot/cold layout from
+-- schema.sql. Run once against databases created before partitioning:
+--   psql -d energy_contracts -f backend/sql/migrations/001_partition_contracts.sql
+-- The whole move is one transaction: readers keep seeing the old table until COMMIT,
+-- and portfolio_holdings rows keep pointing at the same contract ids throughout.
+BEGIN;
+
+LOCK TABLE contracts IN SHARE ROW EXCLUSIVE MODE;
+
+ALTER TABLE portfolio_holdings DROP CONSTRAINT IF EXISTS portfolio_holdings_contract_id_fkey;
+ALTER TABLE contracts RENAME TO contracts_unpartitioned;
+ALTER INDEX IF EXISTS idx_contracts_energy_type RENAME TO idx_contracts_unpartitioned_energy_type;
+ALTER INDEX IF EXISTS idx_contracts_location RENAME TO idx_contracts_unpartitioned_location;
+ALTER INDEX IF EXISTS idx_contracts_delivery_dates RENAME TO idx_contracts_unpartitioned_delivery_dates;
+
+CREATE TABLE contracts (
+  id INTEGER NOT NULL DEFAULT nextval('contracts_id_seq'),
+  energy_type VARCHAR(50) NOT NULL,
+  quantity_mwh NUMERIC(18, 3) NOT NULL,
+  price_per_mwh NUMERIC(18, 6) NOT NULL,
+  delivery_start DATE NOT NULL,
+  delivery_end DATE NOT NULL,
+  location VARCHAR(80) NOT NULL,
+  status VARCHAR(20) NOT NULL DEFAULT 'Available',
+  PRIMARY KEY (id, status)
+) PARTITION BY LIST (status);
+
+CREATE TABLE contracts_hot PARTITION OF contracts FOR VALUES IN ('Available', 'Reserved');
+CREATE TABLE contracts_cold PARTITION OF contracts FOR VALUES IN ('Sold', 'Expired');
+CREATE TABLE contracts_other PARTITION OF contracts DEFAULT;
+
+-- Rows are routed to their partition on insert, so the cold history lands in contracts_cold.
+INSERT INTO contracts (id, energy_type, quantity_mwh, price_per_mwh, delivery_start, delivery_end, location, status)
+SELECT id, energy_type, quantity_mwh, price_per_mwh, delivery_start, delivery_end, location, status
+FROM contracts_unpartitioned;
+
+ALTER SEQUENCE contracts_id_seq OWNED BY contracts.id;
+DROP TABLE contracts_unpartitioned;
+
+CREATE INDEX idx_contracts_energy_type ON contracts (energy_type);
+CREATE INDEX idx_contracts_location ON contracts (location);
+CREATE INDEX idx_contracts_delivery_dates ON contracts (delivery_start, delivery_end);
+
+-- Equivalent of REFERENCES contracts(id) ON DELETE CASCADE for the partitioned table.
+-- The key-share lock matches what a real foreign key takes on the referenced row.
+CREATE OR REPLACE FUNCTION portfolio_holdings_check_contract() RETURNS trigger AS $$
+BEGIN
+  PERFORM 1 FROM contracts WHERE id = NEW.contract_id FOR KEY SHARE;
+  IF NOT FOUND THEN
+    RAISE foreign_key_violation USING MESSAGE = format('contract %s does not exist', NEW.contract_id);
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_portfolio_holdings_contract_fk
+  BEFORE INSERT OR UPDATE OF contract_id ON portfolio_holdings
+  FOR EACH ROW EXECUTE FUNCTION portfolio_holdings_check_contract();
+
+-- A status change that moves a row between partitions also fires DELETE triggers;
+-- AFTER triggers run once the row exists in its new partition, so only real
+-- deletes cascade to holdings.
+CREATE OR REPLACE FUNCTION contracts_cascade_holdings() RETURNS trigger AS $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM contracts WHERE id = OLD.id) THEN
+    DELETE FROM portfolio_holdings WHERE contract_id = OLD.id;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_contracts_cascade_holdings
+  AFTER DELETE ON contracts
+  FOR EACH ROW EXECUTE FUNCTION contracts_cascade_holdings();
+
+COMMIT;
+
+ANALYZE contracts;
@@ -0,0 +1,84 @@
+-- Move contracts to compact encodings: energy_type/status as native enums and
+-- location as an integer id into the locations dimension table. Run once after
+-- 001_partition_contracts.sql:
+--   psql -d energy_contracts -f backend/sql/migrations/002_compact_contract_encodings.sql
+-- status is the partition key and cannot change type in place, so the table is
+-- rebuilt in one transaction; contract ids (and so portfolio_holdings) are unchanged.
+BEGIN;
+
+LOCK TABLE contracts IN SHARE ROW EXCLUSIVE MODE;
+
+DO $$
+BEGIN
+  CREATE TYPE energy_type_enum AS ENUM ('Solar', 'Wind', 'Natural Gas', 'Nuclear', 'Coal', 'Hydro');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+DO $$
+BEGIN
+  CREATE TYPE contract_status_enum AS ENUM ('Available', 'Reserved', 'Sold', 'Expired');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE TABLE IF NOT EXISTS locations (
+  id SERIAL PRIMARY KEY,
+  name VARCHAR(80) NOT NULL UNIQUE
+);
+
+INSERT INTO locations (name)
+SELECT DISTINCT btrim(location) FROM contracts
+ON CONFLICT (name) DO NOTHING;
+
+ALTER TABLE contracts RENAME TO contracts_text;
+ALTER TABLE contracts_hot RENAME TO contracts_text_hot;
+ALTER TABLE contracts_cold RENAME TO contracts_text_cold;
+ALTER TABLE contracts_other RENAME TO contracts_text_other;
+DROP INDEX IF EXISTS idx_contracts_energy_type;
+DROP INDEX IF EXISTS idx_contracts_location;
+DROP INDEX IF EXISTS idx_contracts_delivery_dates;
+
+CREATE TABLE contracts (
+  id INTEGER NOT NULL DEFAULT nextval('contracts_id_seq'),
+  energy_type energy_type_enum NOT NULL,
+  quantity_mwh NUMERIC(18, 3) NOT NULL,
+  price_per_mwh NUMERIC(18, 6) NOT NULL,
+  delivery_start DATE NOT NULL,
+  delivery_end DATE NOT NULL,
+  location_id INTEGER NOT NULL REFERENCES locations(id),
+  status contract_status_enum NOT NULL DEFAULT 'Available',
+  PRIMARY KEY (id, status)
+) PARTITION BY LIST (status);
+
+CREATE TABLE contracts_hot PARTITION OF contracts FOR VALUES IN ('Available', 'Reserved');
+CREATE TABLE contracts_cold PARTITION OF contracts FOR VALUES IN ('Sold', 'Expired');
+CREATE TABLE contracts_other PARTITION OF contracts DEFAULT;
+
+INSERT INTO contracts (id, energy_type, quantity_mwh, price_per_mwh, delivery_start, delivery_end, location_id, status)
+SELECT
+  contracts_text.id,
+  contracts_text.energy_type::energy_type_enum,
+  contracts_text.quantity_mwh,
+  contracts_text.price_per_mwh,
+  contracts_text.delivery_start,
+  contracts_text.delivery_end,
+  locations.id,
+  contracts_text.status::contract_status_enum
+FROM contracts_text
+JOIN locations ON locations.name = btrim(contracts_text.location);
+
+ALTER SEQUENCE contracts_id_seq OWNED BY contracts.id;
+DROP TABLE contracts_text;
+
+CREATE INDEX idx_contracts_energy_type ON contracts (energy_type);
+CREATE INDEX idx_contracts_location_id ON contracts (location_id);
+CREATE INDEX idx_contracts_delivery_dates ON contracts (delivery_start, delivery_end);
+
+-- Triggers are per table, so the cascade to holdings is attached to the new table.
+CREATE OR REPLACE TRIGGER trg_contracts_cascade_holdings
+  AFTER DELETE ON contracts
+  FOR EACH ROW EXECUTE FUNCTION contracts_cascade_holdings();
+
+COMMIT;
+
+ANALYZE locations;
+ANALYZE contracts;
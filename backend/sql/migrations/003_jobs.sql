@@ -0,0 +1,23 @@
+-- Add the jobs table used by the in-process background job queue. Run once:
+--   psql -d energy_contracts -f backend/sql/migrations/003_jobs.sql
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS jobs (
+  id SERIAL PRIMARY KEY,
+  kind VARCHAR(40) NOT NULL,
+  status VARCHAR(16) NOT NULL DEFAULT 'queued',
+  params JSON NOT NULL DEFAULT '{}',
+  progress DOUBLE PRECISION NOT NULL DEFAULT 0,
+  progress_message VARCHAR(200),
+  cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+  result JSON,
+  result_path VARCHAR(500),
+  error TEXT,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  started_at TIMESTAMPTZ,
+  finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status);
+
+COMMIT;
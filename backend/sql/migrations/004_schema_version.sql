@@ -0,0 +1,30 @@
+-- Add schema_version (checked at startup instead of create_all) and align index
+-- names with the models. Applied by `python -m app.migrate_cli`, which records
+-- the version and fingerprint once this file commits.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS schema_version (
+  id INTEGER PRIMARY KEY,
+  version INTEGER NOT NULL,
+  fingerprint VARCHAR(64) NOT NULL,
+  migrated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Indexes create_all added under default ORM names before the models declared
+-- the ones in schema.sql; primary keys already cover the id columns.
+DROP INDEX IF EXISTS ix_contracts_id;
+DROP INDEX IF EXISTS ix_contracts_location_id;
+DROP INDEX IF EXISTS ix_users_id;
+DROP INDEX IF EXISTS ix_portfolios_id;
+DROP INDEX IF EXISTS ix_portfolio_holdings_id;
+DROP INDEX IF EXISTS ix_jobs_id;
+
+CREATE INDEX IF NOT EXISTS idx_contracts_energy_type ON contracts (energy_type);
+CREATE INDEX IF NOT EXISTS idx_contracts_location_id ON contracts (location_id);
+CREATE INDEX IF NOT EXISTS idx_contracts_delivery_dates ON contracts (delivery_start, delivery_end);
+CREATE INDEX IF NOT EXISTS idx_portfolios_user_id ON portfolios (user_id);
+CREATE INDEX IF NOT EXISTS idx_portfolio_holdings_portfolio_id ON portfolio_holdings (portfolio_id);
+CREATE INDEX IF NOT EXISTS idx_portfolio_holdings_contract_id ON portfolio_holdings (contract_id);
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status);
+
+COMMIT;
@@ -0,0 +1,77 @@
+-- Add the append-only contract price history and its OHLC rollups, seeded with
+-- one baseline row per existing contract. Applied by `python -m app.migrate_cli`.
+BEGIN;
+
+-- Append-only price and status log (app/services/price_history_service.py). No
+-- foreign key to contracts, so history outlives deleted contracts.
+CREATE TABLE IF NOT EXISTS contract_price_history (
+  id BIGSERIAL PRIMARY KEY,
+  contract_id INTEGER NOT NULL,
+  recorded_at TIMESTAMPTZ NOT NULL,
+  reason VARCHAR(16) NOT NULL,
+  energy_type energy_type_enum NOT NULL,
+  location_id INTEGER NOT NULL REFERENCES locations(id),
+  price_per_mwh NUMERIC(18, 6) NOT NULL,
+  status contract_status_enum NOT NULL,
+  price_changed BOOLEAN NOT NULL
+);
+
+-- OHLC per bucket width ('hour', 'day', 'month'), upserted with each history row.
+CREATE TABLE IF NOT EXISTS contract_price_rollups (
+  bucket VARCHAR(8) NOT NULL,
+  energy_type energy_type_enum NOT NULL,
+  location_id INTEGER NOT NULL REFERENCES locations(id),
+  bucket_start TIMESTAMPTZ NOT NULL,
+  open_price NUMERIC(18, 6) NOT NULL,
+  open_at TIMESTAMPTZ NOT NULL,
+  high_price NUMERIC(18, 6) NOT NULL,
+  low_price NUMERIC(18, 6) NOT NULL,
+  close_price NUMERIC(18, 6) NOT NULL,
+  close_at TIMESTAMPTZ NOT NULL,
+  observations INTEGER NOT NULL,
+  price_sum NUMERIC(24, 6) NOT NULL,
+  PRIMARY KEY (bucket, energy_type, location_id, bucket_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_contract_price_history_recorded_at ON contract_price_history USING brin (recorded_at);
+CREATE INDEX IF NOT EXISTS idx_contract_price_history_contract ON contract_price_history (contract_id, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_contract_price_rollups_bucket_start ON contract_price_rollups (bucket, bucket_start);
+
+-- Recompute every rollup from history (after a backfill or a bulk load such as
+-- seed.sql); the app maintains them incrementally otherwise.
+CREATE OR REPLACE FUNCTION rebuild_contract_price_rollups() RETURNS void AS $$
+BEGIN
+  TRUNCATE contract_price_rollups;
+  INSERT INTO contract_price_rollups (
+    bucket, energy_type, location_id, bucket_start, open_price, open_at, high_price,
+    low_price, close_price, close_at, observations, price_sum
+  )
+  SELECT
+    buckets.bucket,
+    history.energy_type,
+    history.location_id,
+    date_trunc(buckets.bucket, history.recorded_at, 'UTC'),
+    (array_agg(history.price_per_mwh ORDER BY history.recorded_at, history.id))[1],
+    min(history.recorded_at),
+    max(history.price_per_mwh),
+    min(history.price_per_mwh),
+    (array_agg(history.price_per_mwh ORDER BY history.recorded_at DESC, history.id DESC))[1],
+    max(history.recorded_at),
+    count(*),
+    sum(history.price_per_mwh)
+  FROM contract_price_history AS history
+  CROSS JOIN (VALUES ('hour'), ('day'), ('month')) AS buckets (bucket)
+  WHERE history.price_changed
+  GROUP BY 1, 2, 3, 4;
+END;
+$$ LANGUAGE plpgsql;
+
+INSERT INTO contract_price_history (
+  contract_id, recorded_at, reason, energy_type, location_id, price_per_mwh, status, price_changed
+)
+SELECT id, NOW(), 'baseline', energy_type, location_id, price_per_mwh, status, TRUE
+FROM contracts;
+
+SELECT rebuild_contract_price_rollups();
+
+COMMIT;
@@ -0,0 +1,40 @@
+-- Add the materialized views behind the /admin/analytics routes, populated from
+-- the current holdings. Applied by `python -m app.migrate_cli`.
+BEGIN;
+
+-- Cross-user holdings analytics (app/services/analytics_service.py). Refreshed with
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY, which the unique indexes make possible.
+CREATE MATERIALIZED VIEW IF NOT EXISTS contract_holder_rollups AS
+SELECT
+  contracts.id AS contract_id,
+  contracts.energy_type,
+  contracts.location_id,
+  contracts.quantity_mwh,
+  contracts.price_per_mwh,
+  count(*)::INTEGER AS holders
+FROM portfolio_holdings
+JOIN contracts ON contracts.id = portfolio_holdings.contract_id
+GROUP BY
+  contracts.id,
+  contracts.energy_type,
+  contracts.location_id,
+  contracts.quantity_mwh,
+  contracts.price_per_mwh;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS energy_type_holding_rollups AS
+SELECT
+  contracts.energy_type,
+  count(*)::INTEGER AS holdings,
+  count(DISTINCT portfolio_holdings.contract_id)::INTEGER AS contracts,
+  count(DISTINCT portfolio_holdings.portfolio_id)::INTEGER AS portfolios,
+  sum(contracts.quantity_mwh)::NUMERIC(24, 3) AS committed_capacity_mwh,
+  sum(contracts.quantity_mwh * contracts.price_per_mwh)::NUMERIC(28, 6) AS committed_value
+FROM portfolio_holdings
+JOIN contracts ON contracts.id = portfolio_holdings.contract_id
+GROUP BY contracts.energy_type;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_contract_holder_rollups_contract ON contract_holder_rollups (contract_id);
+CREATE INDEX IF NOT EXISTS idx_contract_holder_rollups_holders ON contract_holder_rollups (holders, contract_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_energy_type_holding_rollups_energy_type ON energy_type_holding_rollups (energy_type);
+
+COMMIT;
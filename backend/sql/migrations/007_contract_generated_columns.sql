@@ -0,0 +1,16 @@
+-- Add stored generated total_value and duration_days columns to contracts, with
+-- indexes for sorting and range filters. Applied by `python -m app.migrate_cli`.
+-- Adding a stored generated column rewrites every contracts partition under an
+-- ACCESS EXCLUSIVE lock; run it in a maintenance window on large tables.
+BEGIN;
+
+ALTER TABLE contracts
+  ADD COLUMN IF NOT EXISTS total_value NUMERIC(36, 9)
+    GENERATED ALWAYS AS (quantity_mwh * price_per_mwh) STORED NOT NULL,
+  ADD COLUMN IF NOT EXISTS duration_days INTEGER
+    GENERATED ALWAYS AS (delivery_end - delivery_start + 1) STORED NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_contracts_total_value ON contracts (total_value);
+CREATE INDEX IF NOT EXISTS idx_contracts_duration_days ON contracts (duration_days);
+
+COMMIT;
@@ -0,0 +1,10 @@
+-- Add the worker lease to jobs: the claiming worker's id and when its lease lapses.
+-- Applied by `python -m app.migrate_cli`. Running rows without a lease (claimed
+-- before this migration) count as lapsed and are queued again by the next worker.
+BEGIN;
+
+ALTER TABLE jobs
+  ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(100),
+  ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- Sum the stored contracts.total_value column in energy_type_holding_rollups
+-- instead of multiplying quantity by price per row. Applied by
+-- `python -m app.migrate_cli`; recreating the view repopulates it.
+BEGIN;
+
+DROP MATERIALIZED VIEW IF EXISTS energy_type_holding_rollups;
+
+CREATE MATERIALIZED VIEW energy_type_holding_rollups AS
+SELECT
+  contracts.energy_type,
+  count(*)::INTEGER AS holdings,
+  count(DISTINCT portfolio_holdings.contract_id)::INTEGER AS contracts,
+  count(DISTINCT portfolio_holdings.portfolio_id)::INTEGER AS portfolios,
+  sum(contracts.quantity_mwh)::NUMERIC(24, 3) AS committed_capacity_mwh,
+  sum(contracts.total_value)::NUMERIC(28, 6) AS committed_value
+FROM portfolio_holdings
+JOIN contracts ON contracts.id = portfolio_holdings.contract_id
+GROUP BY contracts.energy_type;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_energy_type_holding_rollups_energy_type ON energy_type_holding_rollups (energy_type);
+
+COMMIT;
@@ -1,13 +1,45 @@
-CREATE TABLE IF NOT EXISTS contracts (
+-- Low-cardinality columns are stored compactly: energy type and status as native
+-- enums (4 bytes), locations as integer ids into a dimension table. The API still
+-- reads and writes the string values. Add new values with ALTER TYPE ... ADD VALUE.
+DO $$
+BEGIN
+  CREATE TYPE energy_type_enum AS ENUM ('Solar', 'Wind', 'Natural Gas', 'Nuclear', 'Coal', 'Hydro');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+DO $$
+BEGIN
+  CREATE TYPE contract_status_enum AS ENUM ('Available', 'Reserved', 'Sold', 'Expired');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE TABLE IF NOT EXISTS locations (
   id SERIAL PRIMARY KEY,
-  energy_type VARCHAR(50) NOT NULL,
+  name VARCHAR(80) NOT NULL UNIQUE
+);
+
+-- Contracts are list-partitioned by status: open contracts (hot) stay small and
+-- indexed separately from the sold/expired history (cold). Status predicates
+-- (ContractFilters.status / active_only) prune partitions; changing a contract's
+-- status moves its row. The partition key must be part of the primary key.
+CREATE TABLE IF NOT EXISTS contracts (
+  id SERIAL,
+  energy_type energy_type_enum NOT NULL,
   quantity_mwh NUMERIC(18, 3) NOT NULL,
   price_per_mwh NUMERIC(18, 6) NOT NULL,
   delivery_start DATE NOT NULL,
   delivery_end DATE NOT NULL,
-  location VARCHAR(80) NOT NULL,
-  status VARCHAR(20) NOT NULL DEFAULT 'Available'
-);
+  location_id INTEGER NOT NULL REFERENCES locations(id),
+  status contract_status_enum NOT NULL DEFAULT 'Available',
+  -- Stored generated columns, so sorts, range filters, and aggregates read them.
+  total_value NUMERIC(36, 9) GENERATED ALWAYS AS (quantity_mwh * price_per_mwh) STORED NOT NULL,
+  duration_days INTEGER GENERATED ALWAYS AS (delivery_end - delivery_start + 1) STORED NOT NULL,
+  PRIMARY KEY (id, status)
+) PARTITION BY LIST (status);
+
+CREATE TABLE IF NOT EXISTS contracts_hot PARTITION OF contracts FOR VALUES IN ('Available', 'Reserved');
+CREATE TABLE IF NOT EXISTS contracts_cold PARTITION OF contracts FOR VALUES IN ('Sold', 'Expired');
+CREATE TABLE IF NOT EXISTS contracts_other PARTITION OF contracts DEFAULT;
 
 CREATE TABLE IF NOT EXISTS users (
   id SERIAL PRIMARY KEY,
@@ -24,14 +56,184 @@ CREATE TABLE IF NOT EXISTS portfolios (
 CREATE TABLE IF NOT EXISTS portfolio_holdings (
   id SERIAL PRIMARY KEY,
   portfolio_id INTEGER NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
-  contract_id INTEGER NOT NULL REFERENCES contracts(id) ON DELETE CASCADE,
+  -- A foreign key to a partitioned table must include its partition key, so the
+  -- contracts reference is enforced by the triggers below instead.
+  contract_id INTEGER NOT NULL,
   added_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
   CONSTRAINT uq_portfolio_contract UNIQUE (portfolio_id, contract_id)
 );
 
+-- Background jobs (app/services/jobs.py); the row holds status, progress, and result.
+CREATE TABLE IF NOT EXISTS jobs (
+  id SERIAL PRIMARY KEY,
+  kind VARCHAR(40) NOT NULL,
+  status VARCHAR(16) NOT NULL DEFAULT 'queued',
+  params JSON NOT NULL DEFAULT '{}',
+  progress DOUBLE PRECISION NOT NULL DEFAULT 0,
+  progress_message VARCHAR(200),
+  cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+  result JSON,
+  result_path VARCHAR(500),
+  error TEXT,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  started_at TIMESTAMPTZ,
+  finished_at TIMESTAMPTZ,
+  lease_owner VARCHAR(100),
+  lease_expires_at TIMESTAMPTZ
+);
+
+-- Append-only price and status log (app/services/price_history_service.py). No
+-- foreign key to contracts, so history outlives deleted contracts.
+CREATE TABLE IF NOT EXISTS contract_price_history (
+  id BIGSERIAL PRIMARY KEY,
+  contract_id INTEGER NOT NULL,
+  recorded_at TIMESTAMPTZ NOT NULL,
+  reason VARCHAR(16) NOT NULL,
+  energy_type energy_type_enum NOT NULL,
+  location_id INTEGER NOT NULL REFERENCES locations(id),
+  price_per_mwh NUMERIC(18, 6) NOT NULL,
+  status contract_status_enum NOT NULL,
+  price_changed BOOLEAN NOT NULL
+);
+
+-- OHLC per bucket width ('hour', 'day', 'month'), upserted with each history row.
+CREATE TABLE IF NOT EXISTS contract_price_rollups (
+  bucket VARCHAR(8) NOT NULL,
+  energy_type energy_type_enum NOT NULL,
+  location_id INTEGER NOT NULL REFERENCES locations(id),
+  bucket_start TIMESTAMPTZ NOT NULL,
+  open_price NUMERIC(18, 6) NOT NULL,
+  open_at TIMESTAMPTZ NOT NULL,
+  high_price NUMERIC(18, 6) NOT NULL,
+  low_price NUMERIC(18, 6) NOT NULL,
+  close_price NUMERIC(18, 6) NOT NULL,
+  close_at TIMESTAMPTZ NOT NULL,
+  observations INTEGER NOT NULL,
+  price_sum NUMERIC(24, 6) NOT NULL,
+  PRIMARY KEY (bucket, energy_type, location_id, bucket_start)
+);
+
+-- Written by `python -m app.migrate_cli` and read once at startup. The fingerprint
+-- is app.services.schema_service.metadata_fingerprint() for SCHEMA_VERSION.
+CREATE TABLE IF NOT EXISTS schema_version (
+  id INTEGER PRIMARY KEY,
+  version INTEGER NOT NULL,
+  fingerprint VARCHAR(64) NOT NULL,
+  migrated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
 CREATE INDEX IF NOT EXISTS idx_contracts_energy_type ON contracts (energy_type);
-CREATE INDEX IF NOT EXISTS idx_contracts_location ON contracts (location);
+CREATE INDEX IF NOT EXISTS idx_contracts_location_id ON contracts (location_id);
 CREATE INDEX IF NOT EXISTS idx_contracts_delivery_dates ON contracts (delivery_start, delivery_end);
+CREATE INDEX IF NOT EXISTS idx_contracts_total_value ON contracts (total_value);
+CREATE INDEX IF NOT EXISTS idx_contracts_duration_days ON contracts (duration_days);
 CREATE INDEX IF NOT EXISTS idx_portfolios_user_id ON portfolios (user_id);
 CREATE INDEX IF NOT EXISTS idx_portfolio_holdings_portfolio_id ON portfolio_holdings (portfolio_id);
-CREATE INDEX IF NOT EXISTS idx_portfolio_holdings_contract_id ON portfolio_holdings (contract_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_portfolio_holdings_contract_id ON portfolio_holdings (contract_id);
+CREATE INDEX IF NOT EXISTS idx_portfolio_holdings_keyset ON portfolio_holdings (portfolio_id, added_at, id);
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status);
+-- History is inserted in recorded_at order, so a BRIN index stays a few pages.
+CREATE INDEX IF NOT EXISTS idx_contract_price_history_recorded_at ON contract_price_history USING brin (recorded_at);
+CREATE INDEX IF NOT EXISTS idx_contract_price_history_contract ON contract_price_history (contract_id, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_contract_price_rollups_bucket_start ON contract_price_rollups (bucket, bucket_start);
+
+-- Equivalent of REFERENCES contracts(id) ON DELETE CASCADE for the partitioned table.
+-- The key-share lock matches what a real foreign key takes on the referenced row.
+CREATE OR REPLACE FUNCTION portfolio_holdings_check_contract() RETURNS trigger AS $$
+BEGIN
+  PERFORM 1 FROM contracts WHERE id = NEW.contract_id FOR KEY SHARE;
+  IF NOT FOUND THEN
+    RAISE foreign_key_violation USING MESSAGE = format('contract %s does not exist', NEW.contract_id);
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_portfolio_holdings_contract_fk
+  BEFORE INSERT OR UPDATE OF contract_id ON portfolio_holdings
+  FOR EACH ROW EXECUTE FUNCTION portfolio_holdings_check_contract();
+
+-- A status change that moves a row between partitions also fires DELETE triggers;
+-- AFTER triggers run once the row exists in its new partition, so only real
+-- deletes cascade to holdings.
+CREATE OR REPLACE FUNCTION contracts_cascade_holdings() RETURNS trigger AS $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM contracts WHERE id = OLD.id) THEN
+    DELETE FROM portfolio_holdings WHERE contract_id = OLD.id;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_contracts_cascade_holdings
+  AFTER DELETE ON contracts
+  FOR EACH ROW EXECUTE FUNCTION contracts_cascade_holdings();
+
+-- Recompute every rollup from history (after a backfill or a bulk load such as
+-- seed.sql); the app maintains them incrementally otherwise.
+CREATE OR REPLACE FUNCTION rebuild_contract_price_rollups() RETURNS void AS $$
+BEGIN
+  TRUNCATE contract_price_rollups;
+  INSERT INTO contract_price_rollups (
+    bucket, energy_type, location_id, bucket_start, open_price, open_at, high_price,
+    low_price, close_price, close_at, observations, price_sum
+  )
+  SELECT
+    buckets.bucket,
+    history.energy_type,
+    history.location_id,
+    date_trunc(buckets.bucket, history.recorded_at, 'UTC'),
+    (array_agg(history.price_per_mwh ORDER BY history.recorded_at, history.id))[1],
+    min(history.recorded_at),
+    max(history.price_per_mwh),
+    min(history.price_per_mwh),
+    (array_agg(history.price_per_mwh ORDER BY history.recorded_at DESC, history.id DESC))[1],
+    max(history.recorded_at),
+    count(*),
+    sum(history.price_per_mwh)
+  FROM contract_price_history AS history
+  CROSS JOIN (VALUES ('hour'), ('day'), ('month')) AS buckets (bucket)
+  WHERE history.price_changed
+  GROUP BY 1, 2, 3, 4;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cross-user holdings analytics (app/services/analytics_service.py). Refreshed with
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY, which the unique indexes make possible.
+CREATE MATERIALIZED VIEW IF NOT EXISTS contract_holder_rollups AS
+SELECT
+  contracts.id AS contract_id,
+  contracts.energy_type,
+  contracts.location_id,
+  contracts.quantity_mwh,
+  contracts.price_per_mwh,
+  count(*)::INTEGER AS holders
+FROM portfolio_holdings
+JOIN contracts ON contracts.id = portfolio_holdings.contract_id
+GROUP BY
+  contracts.id,
+  contracts.energy_type,
+  contracts.location_id,
+  contracts.quantity_mwh,
+  contracts.price_per_mwh;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS energy_type_holding_rollups AS
+SELECT
+  contracts.energy_type,
+  count(*)::INTEGER AS holdings,
+  count(DISTINCT portfolio_holdings.contract_id)::INTEGER AS contracts,
+  count(DISTINCT portfolio_holdings.portfolio_id)::INTEGER AS portfolios,
+  sum(contracts.quantity_mwh)::NUMERIC(24, 3) AS committed_capacity_mwh,
+  sum(contracts.total_value)::NUMERIC(28, 6) AS committed_value
+FROM portfolio_holdings
+JOIN contracts ON contracts.id = portfolio_holdings.contract_id
+GROUP BY contracts.energy_type;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_contract_holder_rollups_contract ON contract_holder_rollups (contract_id);
+CREATE INDEX IF NOT EXISTS idx_contract_holder_rollups_holders ON contract_holder_rollups (holders, contract_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_energy_type_holding_rollups_energy_type ON energy_type_holding_rollups (energy_type);
+
+INSERT INTO schema_version (id, version, fingerprint)
+VALUES (1, 9, '234e0ea5dd3b21cc89713f9a17d66caa')
+ON CONFLICT (id) DO UPDATE SET
+  version = EXCLUDED.version, fingerprint = EXCLUDED.fingerprint, migrated_at = NOW();
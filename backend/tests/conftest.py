@@ -4,59 +4,130 @@ from collections.abc import AsyncGenerator, Awaitable, Callable
 from datetime import date
 from decimal import Decimal
 import os
+from pathlib import Path
+import shutil
 
 import pytest
 from fastapi import FastAPI
 import httpx
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.datastructures import State
 
 os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///./test_app.db"
 
-from app.db import get_session
+from app.db import get_read_session, get_session, get_snapshot_session
 from app.models import Base, Contract
+from app.repositories import REPOSITORY_BACKEND, memory_store
+from app.repositories.sql import resolve_location_id
+from app.routers.admin import router as admin_router
 from app.routers.contracts import router as contracts_router
+from app.routers.events import router as events_router
+from app.routers.exports import router as exports_router
+from app.routers.jobs import router as jobs_router
 from app.routers.portfolios import router as portfolios_router
+from app.routers.prices import router as prices_router
+from app.routers.profiles import router as profiles_router
+from app.routers.stats import router as stats_router
+from app.services.distribution_service import distribution_index
+from app.services.recommendations_service import similarity_index
+
+
+# `REPOSITORY_BACKEND=memory pytest` runs the suite with contracts and holdings in
+# `memory_store`; tests of database-only features are marked `requires_sql`.
+MEMORY_BACKEND = REPOSITORY_BACKEND == "memory"
+
+
+def pytest_runtest_setup(item: pytest.Item) -> None:
+    if MEMORY_BACKEND and item.get_closest_marker("requires_sql"):
+        pytest.skip("database-only feature; REPOSITORY_BACKEND=memory")
+
+
+@pytest.fixture(autouse=True)
+def reset_contract_indexes() -> None:
+    # Each test gets a fresh database, so the process-wide indexes must start empty.
+    similarity_index.reset()
+    distribution_index.reset()
+    memory_store.reset()
+
+
+def skip_fsync(dbapi_connection, _connection_record) -> None:
+    # Test databases are thrown away, so commits need not wait for the disk.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous = OFF")
+    cursor.close()
+
+
+@pytest.fixture(scope="session")
+def database_template(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """A SQLite file with the schema created once; each test works on a copy of it."""
+    db_path = tmp_path_factory.mktemp("template") / "template.db"
+    engine = create_engine(f"sqlite:///{db_path.as_posix()}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return db_path
 
 
 @pytest.fixture
 async def session_maker(
-    tmp_path,
+    tmp_path: Path, database_template: Path
 ) -> AsyncGenerator[async_sessionmaker[AsyncSession], None]:
+    # With REPOSITORY_BACKEND=memory only the database-only tables (jobs and the like)
+    # are used, but a copy of the template costs about a millisecond either way.
     db_path = tmp_path / "test.db"
+    shutil.copyfile(database_template, db_path)
     engine = create_async_engine(f"sqlite+aiosqlite:///{db_path.as_posix()}")
-    async with engine.begin() as connection:
-        await connection.run_sync(Base.metadata.create_all)
+    event.listen(engine.sync_engine, "connect", skip_fsync)
 
     session_factory = async_sessionmaker(
         engine, class_=AsyncSession, expire_on_commit=False
     )
     yield session_factory
 
-    async with engine.begin() as connection:
-        await connection.run_sync(Base.metadata.drop_all)
     await engine.dispose()
 
 
-@pytest.fixture
-async def app(
-    session_maker: async_sessionmaker[AsyncSession],
-) -> FastAPI:
-    async def override_get_session() -> AsyncGenerator[AsyncSession, None]:
-        async with session_maker() as session:
-            yield session
-
+@pytest.fixture(scope="session")
+def shared_app() -> FastAPI:
+    # FastAPI prepares each route on its first request, which costs more than most tests,
+    # so every test reuses one app and only its overrides, state and middleware are reset.
     app_instance = FastAPI(title="Energy Contract Marketplace Test")
+    app_instance.include_router(admin_router)
     app_instance.include_router(contracts_router)
+    app_instance.include_router(events_router)
+    app_instance.include_router(exports_router)
+    app_instance.include_router(jobs_router)
     app_instance.include_router(portfolios_router)
+    app_instance.include_router(prices_router)
+    app_instance.include_router(profiles_router)
+    app_instance.include_router(stats_router)
 
     @app_instance.get("/health")
     async def health_check() -> dict:
         return {"status": "ok"}
 
-    app_instance.dependency_overrides[get_session] = override_get_session
     return app_instance
 
 
+@pytest.fixture
+async def app(
+    shared_app: FastAPI, session_maker: async_sessionmaker[AsyncSession]
+) -> FastAPI:
+    async def override_get_session() -> AsyncGenerator[AsyncSession, None]:
+        async with session_maker() as session:
+            yield session
+
+    shared_app.state = State()
+    shared_app.user_middleware = []
+    shared_app.middleware_stack = None
+    shared_app.dependency_overrides = {
+        get_session: override_get_session,
+        get_read_session: override_get_session,
+        get_snapshot_session: override_get_session,
+    }
+    return shared_app
+
+
 @pytest.fixture
 async def client(app: FastAPI) -> AsyncGenerator[httpx.AsyncClient, None]:
     transport = httpx.ASGITransport(app=app)
@@ -71,16 +142,30 @@ async def create_contract(
     session_maker: async_sessionmaker[AsyncSession],
 ) -> Callable[..., Awaitable[Contract]]:
     async def _create_contract(**overrides: object) -> Contract:
-        contract = Contract(
-            energy_type=overrides.get("energy_type", "Solar"),
-            quantity_mwh=overrides.get("quantity_mwh", Decimal("100.000")),
-            price_per_mwh=overrides.get("price_per_mwh", Decimal("50.000000")),
-            delivery_start=overrides.get("delivery_start", date(2026, 1, 1)),
-            delivery_end=overrides.get("delivery_end", date(2026, 1, 31)),
-            location=overrides.get("location", "Texas"),
-            status=overrides.get("status", "Available"),
-        )
+        if MEMORY_BACKEND:
+            return await memory_store.contracts.add(
+                {
+                    "energy_type": overrides.get("energy_type", "Solar"),
+                    "quantity_mwh": overrides.get("quantity_mwh", Decimal("100.000")),
+                    "price_per_mwh": overrides.get("price_per_mwh", Decimal("50.000000")),
+                    "delivery_start": overrides.get("delivery_start", date(2026, 1, 1)),
+                    "delivery_end": overrides.get("delivery_end", date(2026, 1, 31)),
+                    "location": overrides.get("location", "Texas"),
+                    "status": overrides.get("status", "Available"),
+                }
+            )
         async with session_maker() as session:
+            contract = Contract(
+                energy_type=overrides.get("energy_type", "Solar"),
+                quantity_mwh=overrides.get("quantity_mwh", Decimal("100.000")),
+                price_per_mwh=overrides.get("price_per_mwh", Decimal("50.000000")),
+                delivery_start=overrides.get("delivery_start", date(2026, 1, 1)),
+                delivery_end=overrides.get("delivery_end", date(2026, 1, 31)),
+                location_id=await resolve_location_id(
+                    session=session, name=overrides.get("location", "Texas")
+                ),
+                status=overrides.get("status", "Available"),
+            )
             session.add(contract)
             await session.commit()
             await session.refresh(contract)
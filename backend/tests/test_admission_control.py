@@ -0,0 +1,102 @@
+import asyncio
+
+from fastapi import FastAPI
+import httpx
+import pytest
+
+from app.services import admission
+from app.services.admission import AdmissionBudget, AdmissionControlMiddleware, AdmissionRejected
+
+
+@pytest.mark.asyncio
+async def test_budget_queues_then_hands_off_slot():
+    budget = AdmissionBudget(name="test", max_concurrency=1, max_queue=1, max_wait_seconds=1)
+    await budget.acquire()
+    waiter = asyncio.create_task(budget.acquire())
+    await asyncio.sleep(0)
+    assert budget.stats()["queue_depth"] == 1
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await budget.acquire()
+    assert exc_info.value.reason == "queue_full"
+    assert exc_info.value.retry_after >= 1
+
+    budget.release(0.01)
+    await waiter
+    assert budget.stats()["in_flight"] == 1
+    assert budget.stats()["queue_depth"] == 0
+    budget.release(0.01)
+    assert budget.stats()["in_flight"] == 0
+    assert budget.stats()["admitted"] == 2
+
+
+@pytest.mark.asyncio
+async def test_budget_sheds_when_deadline_cannot_be_met():
+    budget = AdmissionBudget(name="test", max_concurrency=1, max_queue=10, max_wait_seconds=0.05)
+    await budget.acquire()
+    budget.release(1.0)
+    await budget.acquire()
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await budget.acquire()
+    assert exc_info.value.reason == "deadline"
+    assert budget.stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_budget_times_out_queued_request():
+    budget = AdmissionBudget(name="test", max_concurrency=1, max_queue=10, max_wait_seconds=0.01)
+    await budget.acquire()
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await budget.acquire()
+    assert exc_info.value.reason == "timeout"
+    budget.release(0.01)
+    assert budget.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_heavy_routes_with_retry_after(monkeypatch):
+    heavy = AdmissionBudget(name="heavy", max_concurrency=1, max_queue=0, max_wait_seconds=1)
+    light = AdmissionBudget(name="light", max_concurrency=4, max_queue=4, max_wait_seconds=1)
+    monkeypatch.setattr(admission, "heavy_budget", heavy)
+    monkeypatch.setattr(admission, "light_budget", light)
+    release = asyncio.Event()
+
+    app_instance = FastAPI()
+    app_instance.add_middleware(AdmissionControlMiddleware, enabled=True)
+
+    @app_instance.get("/contracts")
+    async def list_contracts() -> list:
+        await release.wait()
+        return []
+
+    @app_instance.get("/health")
+    async def health_check() -> dict:
+        return {"status": "ok"}
+
+    transport = httpx.ASGITransport(app=app_instance)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        slow = asyncio.create_task(client.get("/contracts"))
+        await asyncio.sleep(0.01)
+
+        shed = await client.get("/contracts")
+        assert shed.status_code == 503
+        assert shed.headers["Retry-After"] == "1"
+
+        health = await client.get("/health")
+        assert health.status_code == 200
+
+        release.set()
+        assert (await slow).status_code == 200
+
+    assert heavy.stats()["shed"]["queue_full"] == 1
+    assert heavy.stats()["in_flight"] == 0
+    assert light.stats()["admitted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_admission_stats_endpoint(client):
+    response = await client.get("/stats/admission")
+    assert response.status_code == 200
+    assert {item["name"] for item in response.json()} == {"heavy", "light"}
@@ -0,0 +1,92 @@
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.fixture
+def admin_client(app, client):
+    app.state.admin_token = "secret"
+    client.headers["X-Admin-Token"] = "secret"
+    return client
+
+
+@pytest.fixture
+async def held_contracts(client, create_contract) -> list[int]:
+    solar = await create_contract(energy_type="Solar", quantity_mwh=Decimal("100"))
+    wind = await create_contract(
+        energy_type="Wind", quantity_mwh=Decimal("200"), price_per_mwh=Decimal("30")
+    )
+    hydro = await create_contract(energy_type="Hydro", quantity_mwh=Decimal("50"))
+    holdings = {1: [solar, wind, hydro], 2: [solar, wind], 3: [solar]}
+    for user_id, contracts in holdings.items():
+        for contract in contracts:
+            await client.post(f"/portfolios/{user_id}/contracts/{contract.id}")
+    return [solar.id, wind.id, hydro.id]
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_rollups_serve_the_last_refresh(admin_client, held_contracts) -> None:
+    assert (await admin_client.get("/admin/analytics/capacity-by-energy-type")).json() == []
+
+    refresh = await admin_client.post("/admin/analytics/refresh")
+    capacity = (await admin_client.get("/admin/analytics/capacity-by-energy-type")).json()
+
+    assert refresh.status_code == 200
+    assert [
+        (row["energy_type"], row["holdings"], Decimal(row["committed_capacity_mwh"]))
+        for row in capacity
+    ] == [
+        ("Wind", 2, Decimal("400")),
+        ("Solar", 3, Decimal("300")),
+        ("Hydro", 1, Decimal("50")),
+    ]
+    assert Decimal(capacity[0]["committed_value"]) == Decimal("12000")
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_top_held_concentration_and_holder_counts(admin_client, held_contracts) -> None:
+    solar_id, wind_id, hydro_id = held_contracts
+    await admin_client.post("/admin/analytics/refresh")
+
+    top = (
+        await admin_client.get("/admin/analytics/most-held-contracts", params={"limit": 2})
+    ).json()
+    concentration = (
+        await admin_client.get("/admin/analytics/concentration", params={"top": 1})
+    ).json()
+    by_holders = (await admin_client.get("/admin/analytics/contracts-by-holders")).json()
+
+    assert [(row["contract_id"], row["holders"]) for row in top] == [(solar_id, 3), (wind_id, 2)]
+    assert top[0]["location"] == "Texas"
+    assert top[0]["holding_share"] == pytest.approx(0.5)
+    assert concentration["total_holdings"] == 6
+    assert concentration["held_contracts"] == 3
+    assert concentration["max_holders"] == 3
+    assert concentration["top_share"] == pytest.approx(0.5)
+    assert concentration["herfindahl_index"] == pytest.approx((9 + 4 + 1) / 36)
+    assert by_holders == [
+        {"holders": 1, "contracts": 1},
+        {"holders": 2, "contracts": 1},
+        {"holders": 3, "contracts": 1},
+    ]
+
+    await admin_client.delete(f"/portfolios/1/contracts/{hydro_id}")
+    await admin_client.post("/admin/analytics/refresh")
+    by_holders = (await admin_client.get("/admin/analytics/contracts-by-holders")).json()
+    assert by_holders == [{"holders": 2, "contracts": 1}, {"holders": 3, "contracts": 1}]
+
+
+@pytest.mark.asyncio
+async def test_admin_routes_require_the_configured_token(app, client) -> None:
+    unconfigured = await client.post("/admin/analytics/refresh")
+    app.state.admin_token = "secret"
+    denied = await client.get("/admin/analytics/concentration")
+    allowed = await client.get(
+        "/admin/analytics/concentration", headers={"X-Admin-Token": "secret"}
+    )
+
+    assert unconfigured.status_code == 404
+    assert denied.status_code == 403
+    assert allowed.status_code == 200
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.events import ChangeFeed, change_feed
+
+
+def parse_frame(frame: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in frame.strip().splitlines())
+    return {"id": fields["id"], "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+@pytest.mark.asyncio
+async def test_change_feed_delivers_and_filters_by_user():
+    feed = ChangeFeed()
+    alice = feed.subscribe(user_id=1)
+    anonymous = feed.subscribe()
+    pending_alice = asyncio.ensure_future(anext(alice))
+    pending_anonymous = asyncio.ensure_future(anext(anonymous))
+    await asyncio.sleep(0)
+
+    feed.publish("portfolio.holdings_changed", '{"user_id": 2}', user_id=2)
+    feed.publish("contract.created", '{"id": 7}')
+
+    assert parse_frame(await pending_alice)["event"] == "contract.created"
+    assert parse_frame(await pending_anonymous)["data"] == {"id": 7}
+    assert feed.has_subscribers(1) and not feed.has_subscribers(2)
+    await alice.aclose()
+    await anonymous.aclose()
+    assert feed.stats()["subscribers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_change_feed_resumes_from_last_event_id():
+    feed = ChangeFeed(replay_size=3)
+    feed.publish("contract.created", '{"id": 1}')
+    first_id = f"{feed.epoch}-1"
+    feed.publish("contract.updated", '{"id": 1}')
+    feed.publish("contract.deleted", '{"id": 1}')
+
+    resumed = feed.subscribe(last_event_id=first_id)
+    events = [parse_frame(await anext(resumed))["event"] for _ in range(2)]
+    assert events == ["contract.updated", "contract.deleted"]
+    await resumed.aclose()
+
+    feed.publish("contract.created", '{"id": 2}')
+    feed.publish("contract.created", '{"id": 3}')
+    too_old = feed.subscribe(last_event_id=first_id)
+    assert parse_frame(await anext(too_old))["event"] == "reset"
+    await too_old.aclose()
+
+    other_process = feed.subscribe(last_event_id="deadbeef-1")
+    assert parse_frame(await anext(other_process))["event"] == "reset"
+    await other_process.aclose()
+
+
+@pytest.mark.asyncio
+async def test_change_feed_resets_slow_subscribers(monkeypatch):
+    monkeypatch.setattr("app.services.events.CHANGE_FEED_QUEUE_SIZE", 2)
+    feed = ChangeFeed()
+    slow = feed.subscribe()
+    first = asyncio.ensure_future(anext(slow))
+    await asyncio.sleep(0)
+    feed.publish("contract.updated", json.dumps({"id": 0}))
+    assert parse_frame(await first)["data"] == {"id": 0}
+
+    # The client stalls while more events arrive than its queue holds.
+    for contract_id in range(1, 4):
+        feed.publish("contract.updated", json.dumps({"id": contract_id}))
+    feed.publish("contract.updated", json.dumps({"id": 99}))
+
+    frames = [parse_frame(await anext(slow)) for _ in range(2)]
+    assert [frame["event"] for frame in frames] == ["reset", "contract.updated"]
+    assert frames[1]["data"] == {"id": 99}
+    assert feed.stats()["overflows"] == 1
+    await slow.aclose()
+
+
+@pytest.mark.asyncio
+async def test_change_feed_keepalive():
+    feed = ChangeFeed()
+    idle = feed.subscribe(keepalive_seconds=0.01)
+    assert await anext(idle) == ": keepalive\n\n"
+    await idle.aclose()
+
+
+@pytest.mark.asyncio
+async def test_service_writes_publish_events(create_contract, client):
+    contract = await create_contract()
+    subscription = change_feed.subscribe(user_id=5)
+    pending = asyncio.ensure_future(anext(subscription))
+    await asyncio.sleep(0)
+
+    await client.patch(f"/contracts/{contract.id}", json={"status": "Reserved"})
+    updated = parse_frame(await pending)
+    assert updated["event"] == "contract.updated"
+    assert updated["data"]["status"] == "Reserved"
+
+    await client.post(f"/portfolios/5/contracts/{contract.id}")
+    added = parse_frame(await anext(subscription))
+    assert added["event"] == "portfolio.holdings_changed"
+    assert added["data"]["action"] == "added"
+    assert added["data"]["holding"]["contract"]["id"] == contract.id
+    assert added["data"]["metrics"]["total_contracts"] == 1
+
+    await client.delete(f"/portfolios/5/contracts/{contract.id}")
+    removed = parse_frame(await anext(subscription))
+    assert removed["data"]["action"] == "removed"
+    assert removed["data"]["metrics"]["total_contracts"] == 0
+
+    await client.delete(f"/contracts/{contract.id}")
+    deleted = parse_frame(await anext(subscription))
+    assert deleted["event"] == "contract.deleted"
+    assert deleted["data"] == {"id": contract.id}
+    await subscription.aclose()
@@ -3,9 +3,13 @@ from decimal import Decimal
 
 import pytest
 from fastapi import HTTPException
+from sqlalchemy import select
 
+from app.models import Contract, Location
+from app.repositories import contract_repository
 import app.routers.contracts as contracts_router
 from app.schemas import ContractUpdate
+from app.services.lifecycle_service import sweep_expired_contracts
 
 
 @pytest.mark.asyncio
@@ -199,3 +203,259 @@ async def test_delete_contract_direct_not_found(session_maker):
                 contract_id=99999, session=session
             )
     assert exc.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_compare_contracts_returns_scores_and_distribution(create_contract, client):
+    contracts = [
+        await create_contract(price_per_mwh=Decimal(price), quantity_mwh=Decimal("100.000"))
+        for price in ("10.000000", "20.000000", "30.000000", "40.000000")
+    ]
+    query = "&".join(f"ids={contract.id}" for contract in contracts)
+    response = await client.get(f"/contracts/compare?{query}")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["contracts"]) == 4
+
+    price_metrics = data["metrics"]["price_per_mwh"]
+    assert price_metrics["distribution"]["mean"] == pytest.approx(25)
+    assert price_metrics["distribution"]["p50"] == pytest.approx(25)
+    assert Decimal(str(data["metrics"]["total_cost"]["max"])) == Decimal("4000")
+
+    first, last = data["contracts"][0], data["contracts"][-1]
+    assert first["ranks"]["price_per_mwh"] == 1
+    assert last["ranks"]["price_per_mwh"] == 4
+    assert first["z_scores"]["price_per_mwh"] < 0 < last["z_scores"]["price_per_mwh"]
+    assert first["ranks"]["quantity_mwh"] == 1
+    assert first["z_scores"]["quantity_mwh"] == 0
+
+
+@pytest.mark.asyncio
+async def test_compare_contract_set_summary(create_contract, client):
+    for price in ("10.000000", "20.000000", "60.000000"):
+        await create_contract(price_per_mwh=Decimal(price), energy_type="Hydro")
+    await create_contract(price_per_mwh=Decimal("999.000000"), energy_type="Coal")
+
+    response = await client.get("/contracts/compare/summary?energy_types=Hydro")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 3
+    assert data["truncated"] is False
+    assert Decimal(str(data["metrics"]["price_per_mwh"]["max"])) == Decimal("60")
+    assert data["scores"]["ranks"]["price_per_mwh"] == [1, 2, 3]
+    assert len(data["scores"]["z_scores"]["total_cost"]) == 3
+
+    truncated = await client.get(
+        "/contracts/compare/summary?max_contracts=2&include_scores=false"
+    )
+    assert truncated.json()["truncated"] is True
+    assert truncated.json()["scores"] is None
+
+
+@pytest.mark.asyncio
+async def test_compare_contract_set_summary_empty(client):
+    response = await client.get("/contracts/compare/summary?energy_types=Nuclear")
+    assert response.status_code == 200
+    assert response.json() == {"count": 0, "truncated": False, "metrics": None, "scores": None}
+
+
+@pytest.mark.asyncio
+async def test_similar_contracts_ranked_by_features(create_contract, client):
+    anchor = await create_contract(price_per_mwh=Decimal("50.000000"), location="Texas")
+    close = await create_contract(price_per_mwh=Decimal("51.000000"), location="Texas")
+    other_location = await create_contract(price_per_mwh=Decimal("51.000000"), location="Ohio")
+    other_type = await create_contract(
+        price_per_mwh=Decimal("50.000000"), location="Texas", energy_type="Coal"
+    )
+    for price in ("15.000000", "120.000000"):
+        await create_contract(price_per_mwh=Decimal(price), location="Maine", energy_type="Nuclear")
+
+    response = await client.get(f"/contracts/{anchor.id}/similar?k=3")
+    assert response.status_code == 200
+    ranked = [item["contract"]["id"] for item in response.json()]
+    assert ranked == [close.id, other_location.id, other_type.id]
+
+
+@pytest.mark.asyncio
+async def test_similar_contracts_follow_service_writes(create_contract, client):
+    anchor = await create_contract(price_per_mwh=Decimal("50.000000"))
+    neighbour = await create_contract(price_per_mwh=Decimal("52.000000"))
+    first = await client.get(f"/contracts/{anchor.id}/similar?k=1")
+    assert first.json()[0]["contract"]["id"] == neighbour.id
+
+    payload = {
+        "energy_type": "Solar",
+        "quantity_mwh": "100.000",
+        "price_per_mwh": "50.000000",
+        "delivery_start": "2026-01-01",
+        "delivery_end": "2026-01-31",
+        "location": "Texas",
+    }
+    created = (await client.post("/contracts", json=payload)).json()
+    second = await client.get(f"/contracts/{anchor.id}/similar?k=1")
+    assert second.json()[0]["contract"]["id"] == created["id"]
+
+    await client.delete(f"/contracts/{created['id']}")
+    third = await client.get(f"/contracts/{anchor.id}/similar?k=5")
+    assert [item["contract"]["id"] for item in third.json()] == [neighbour.id]
+
+
+@pytest.mark.asyncio
+async def test_similar_contracts_not_found(client):
+    response = await client.get("/contracts/99999/similar")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_by_ids(create_contract, client):
+    first = await create_contract()
+    second = await create_contract()
+    untouched = await create_contract()
+
+    response = await client.post(
+        "/contracts/bulk-update",
+        json={"contract_ids": [first.id, second.id, 99999], "update": {"status": "Reserved"}},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["updated_count"] == 2
+    assert {contract["id"] for contract in body["contracts"]} == {first.id, second.id}
+    assert all(contract["status"] == "Reserved" for contract in body["contracts"])
+    assert (await client.get(f"/contracts/{untouched.id}")).json()["status"] == "Available"
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_by_filters(create_contract, client):
+    await create_contract(energy_type="Wind", price_per_mwh=Decimal("40.000000"))
+    await create_contract(energy_type="Wind", price_per_mwh=Decimal("80.000000"))
+    await create_contract(energy_type="Solar", price_per_mwh=Decimal("40.000000"))
+
+    response = await client.post(
+        "/contracts/bulk-update",
+        json={
+            "filters": {"energy_types": ["Wind"], "price_max": "50"},
+            "update": {"price_per_mwh": "45.000000"},
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["updated_count"] == 1
+    assert Decimal(response.json()["contracts"][0]["price_per_mwh"]) == Decimal("45")
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_validation(client):
+    both = await client.post(
+        "/contracts/bulk-update",
+        json={"contract_ids": [1], "filters": {"status": "Available"}, "update": {"status": "Sold"}},
+    )
+    assert both.status_code == 422
+    empty_filters = await client.post(
+        "/contracts/bulk-update", json={"filters": {}, "update": {"status": "Sold"}}
+    )
+    assert empty_filters.status_code == 422
+    one_date = await client.post(
+        "/contracts/bulk-update",
+        json={"contract_ids": [1], "update": {"delivery_end": "2026-03-01"}},
+    )
+    assert one_date.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_sweeper_expires_contracts_past_delivery(create_contract, session_maker):
+    lapsed = [
+        await create_contract(delivery_start=date(2025, 1, 1), delivery_end=date(2025, 1, 31))
+        for _ in range(3)
+    ]
+    sold = await create_contract(
+        delivery_start=date(2025, 1, 1), delivery_end=date(2025, 1, 31), status="Sold"
+    )
+    current = await create_contract(
+        delivery_start=date(2026, 1, 1), delivery_end=date(2026, 12, 31)
+    )
+
+    expired = await sweep_expired_contracts(
+        session_factory=session_maker, today=date(2026, 2, 1), batch_size=2, pause_seconds=0
+    )
+    assert expired == 3
+
+    async with session_maker() as session:
+        stored = await contract_repository(session).get_many(
+            [contract.id for contract in (*lapsed, sold, current)]
+        )
+        statuses = {contract.id: contract.status for contract in stored}
+    assert all(statuses[contract.id] == "Expired" for contract in lapsed)
+    assert statuses[sold.id] == "Sold"
+    assert statuses[current.id] == "Available"
+
+
+@pytest.mark.asyncio
+async def test_list_contracts_active_only(create_contract, client):
+    available = await create_contract(status="Available")
+    reserved = await create_contract(status="Reserved")
+    await create_contract(status="Sold")
+    await create_contract(status="Expired")
+
+    response = await client.get("/contracts?active_only=true")
+    assert response.status_code == 200
+    assert {contract["id"] for contract in response.json()} == {available.id, reserved.id}
+    assert len((await client.get("/contracts")).json()) == 4
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_locations_are_normalized_into_dimension_table(client, session_maker):
+    payload = {
+        "energy_type": "Wind",
+        "quantity_mwh": "10.000",
+        "price_per_mwh": "30.000000",
+        "delivery_start": "2026-01-01",
+        "delivery_end": "2026-01-31",
+        "location": "Oregon",
+    }
+    first = (await client.post("/contracts", json=payload)).json()
+    second = (await client.post("/contracts", json={**payload, "location": " Oregon "})).json()
+    assert first["location"] == second["location"] == "Oregon"
+
+    updated = await client.patch(f"/contracts/{second['id']}", json={"location": "Idaho"})
+    assert updated.json()["location"] == "Idaho"
+
+    async with session_maker() as session:
+        names = (
+            await session.execute(select(Location.name).order_by(Location.name))
+        ).scalars().all()
+        location_ids = dict(
+            (await session.execute(select(Contract.id, Contract.location_id))).all()
+        )
+    assert names == ["Idaho", "Oregon"]
+    assert location_ids[first["id"]] != location_ids[second["id"]]
+
+    filtered = await client.get("/contracts?location=ore")
+    assert [contract["id"] for contract in filtered.json()] == [first["id"]]
+
+
+@pytest.mark.asyncio
+async def test_generated_value_and_duration_columns(create_contract, client):
+    short = await create_contract(
+        quantity_mwh=Decimal("10.000"),
+        price_per_mwh=Decimal("30.000000"),
+        delivery_end=date(2026, 1, 10),
+    )
+    large = await create_contract(quantity_mwh=Decimal("200.000"), delivery_end=date(2026, 3, 31))
+    medium = await create_contract(quantity_mwh=Decimal("50.000"))
+
+    by_value = await client.get("/contracts?sort_by=total_value&sort_direction=desc")
+    long_ones = await client.get("/contracts?duration_days_min=31&sort_by=duration_days")
+    mid_value = await client.get("/contracts?total_value_min=1000&total_value_max=5000")
+    updated = await client.patch(
+        f"/contracts/{short.id}", json={"delivery_end": "2026-01-20", "price_per_mwh": "31"}
+    )
+
+    assert [contract["id"] for contract in by_value.json()] == [large.id, medium.id, short.id]
+    assert by_value.json()[0]["total_value"] == "10000.000000000"
+    assert [contract["id"] for contract in long_ones.json()] == [medium.id, large.id]
+    assert [contract["duration_days"] for contract in long_ones.json()] == [31, 90]
+    assert [contract["id"] for contract in mid_value.json()] == [medium.id]
+    assert (updated.json()["duration_days"], updated.json()["total_value"]) == (
+        20,
+        "310.000000000",
+    )
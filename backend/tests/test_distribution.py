@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from app.services.distribution_service import QuantileSketch
+
+
+def test_sketch_quantiles_are_within_relative_accuracy() -> None:
+    values = np.random.default_rng(7).lognormal(mean=4, sigma=1, size=5000)
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(float(value))
+
+    estimates = sketch.quantiles([0.1, 0.5, 0.9])
+
+    ordered = np.sort(values)
+    for q, estimate in zip([0.1, 0.5, 0.9], estimates):
+        exact = ordered[int(q * (len(values) - 1))]
+        assert abs(estimate - exact) <= 0.01 * exact + 1e-9
+
+
+def test_sketch_merge_and_remove_match_direct_build() -> None:
+    left, right, direct = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for value in range(1, 101):
+        (left if value % 2 else right).add(value)
+        direct.add(value)
+    left.merge(right)
+    for value in range(1, 51):
+        left.remove(value)
+        direct.remove(value)
+
+    assert left.count == direct.count == 50
+    assert left.quantiles([0.1, 0.5, 0.9]) == direct.quantiles([0.1, 0.5, 0.9])
+    assert sum(item.count for item in left.histogram(5)) == 50
+
+
+@pytest.mark.asyncio
+async def test_distribution_endpoint_filters_by_dimension(client, create_contract) -> None:
+    for price in ("10", "20", "30"):
+        await create_contract(energy_type="Solar", price_per_mwh=Decimal(price))
+    await create_contract(energy_type="Wind", price_per_mwh=Decimal("90"), location="Ohio")
+
+    everything = (await client.get("/contracts/distribution", params={"bins": 4})).json()
+    solar = (await client.get("/contracts/distribution", params={"energy_types": "Solar"})).json()
+    ohio = (await client.get("/contracts/distribution", params={"locations": "Ohio"})).json()
+
+    assert everything["count"] == 4
+    assert len(everything["price_per_mwh"]["histogram"]) == 4
+    assert solar["count"] == 3
+    assert solar["price_per_mwh"]["p50"] == pytest.approx(20, rel=0.01)
+    assert solar["price_per_mwh"]["max"] == pytest.approx(30, rel=0.01)
+    assert ohio["count"] == 1
+    assert ohio["quantity_mwh"]["p90"] == pytest.approx(100, rel=0.01)
+
+
+@pytest.mark.asyncio
+async def test_distribution_follows_contract_writes(client) -> None:
+    await client.get("/contracts/distribution")
+    payload = {
+        "energy_type": "Hydro",
+        "quantity_mwh": "50",
+        "price_per_mwh": "40",
+        "delivery_start": "2026-01-01",
+        "delivery_end": "2026-01-31",
+        "location": "Quebec",
+    }
+    first = (await client.post("/contracts", json=payload)).json()["id"]
+    second = (await client.post("/contracts", json={**payload, "price_per_mwh": "60"})).json()["id"]
+    await client.patch(f"/contracts/{first}", json={"status": "Sold"})
+    await client.delete(f"/contracts/{second}")
+
+    available = (
+        await client.get("/contracts/distribution", params={"statuses": "Available"})
+    ).json()
+    sold = (await client.get("/contracts/distribution", params={"statuses": "Sold"})).json()
+
+    assert available["count"] == 0
+    assert available["price_per_mwh"]["p50"] is None
+    assert sold["count"] == 1
+    assert sold["price_per_mwh"]["p50"] == pytest.approx(40, rel=0.01)
@@ -0,0 +1,102 @@
+from datetime import date
+from decimal import Decimal
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.schemas import ContractFilters, ExportFormat, ExportTable
+from app.services.export_service import export_table
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_export_contracts_arrow_keeps_exact_decimals(client, create_contract):
+    for index in range(5):
+        await create_contract(
+            price_per_mwh=Decimal("41.123456") + index,
+            quantity_mwh=Decimal("250.125"),
+            location="Texas" if index % 2 else "Ohio",
+        )
+    await create_contract(energy_type="Wind", status="Sold")
+
+    response = await client.get(
+        "/exports/contracts", params={"energy_types": "Solar", "format": "arrow"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 5
+    assert table.schema.field("price_per_mwh").type == pa.decimal128(18, 6)
+    assert table.column("price_per_mwh").to_pylist()[0] == Decimal("41.123456")
+    assert table.column("quantity_mwh").to_pylist()[4] == Decimal("250.125")
+    assert table.column("location").to_pylist() == ["Ohio", "Texas", "Ohio", "Texas", "Ohio"]
+    assert table.column("delivery_start").to_pylist()[0] == date(2026, 1, 1)
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_export_portfolio_holdings_parquet(client, create_contract):
+    held = await create_contract(price_per_mwh=Decimal("12.500000"))
+    other = await create_contract(energy_type="Wind")
+    await client.post(f"/portfolios/1/contracts/{held.id}")
+    await client.post(f"/portfolios/2/contracts/{other.id}")
+
+    response = await client.get(
+        "/exports/portfolio-holdings", params={"format": "parquet", "user_id": 1}
+    )
+
+    assert response.status_code == 200
+    assert 'filename="portfolio_holdings.parquet"' in response.headers["content-disposition"]
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.to_pylist()[0] | {"added_at": None, "holding_id": None} == {
+        "holding_id": None,
+        "user_id": 1,
+        "added_at": None,
+        "contract_id": held.id,
+        "energy_type": "Solar",
+        "quantity_mwh": Decimal("100.000"),
+        "price_per_mwh": Decimal("12.500000"),
+        "delivery_start": date(2026, 1, 1),
+        "delivery_end": date(2026, 1, 31),
+        "location": "Texas",
+        "status": "Available",
+    }
+    assert table.num_rows == 1
+
+
+@pytest.mark.asyncio
+async def test_export_empty_selection_is_valid(client):
+    response = await client.get("/exports/contracts", params={"format": "parquet"})
+
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 0
+    assert table.schema.names[0] == "id"
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_export_streams_one_record_batch_per_cursor_partition(session_maker, create_contract):
+    for location in ["Ohio", "Texas", "Maine", "Ohio", "Utah"]:
+        await create_contract(location=location)
+
+    async with session_maker() as session:
+        chunks = [
+            chunk
+            async for chunk in export_table(
+                session=session,
+                table=ExportTable.contracts,
+                filters=ContractFilters(),
+                export_format=ExportFormat.arrow,
+                batch_size=2,
+            )
+        ]
+
+    reader = pa.ipc.open_stream(b"".join(chunks))
+    batches = list(reader)
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert pa.Table.from_batches(batches).column("location").to_pylist() == [
+        "Ohio", "Texas", "Maine", "Ohio", "Utah"
+    ]
@@ -0,0 +1,299 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import io
+
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import update
+
+from app.models import Job
+from app.schemas import JobKind
+from app.services.jobs import (
+    JOB_HANDLERS,
+    JobCancelled,
+    JobContext,
+    JobOutcome,
+    JobQueue,
+)
+
+TERMINAL = {"succeeded", "failed", "cancelled"}
+
+
+@pytest.fixture
+async def job_queue(app, session_maker, tmp_path):
+    queue = JobQueue(
+        session_factory=session_maker,
+        max_concurrency=1,
+        process_pool_workers=0,
+        result_dir=tmp_path / "jobs",
+    )
+    await queue.start()
+    app.state.job_queue = queue
+    yield queue
+    await queue.stop()
+
+
+async def wait_for_job(client, job_id: int, statuses=TERMINAL) -> dict:
+    for _ in range(200):
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} stuck in {job['status']}")
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_export_job_writes_result_file(client, create_contract, job_queue):
+    await create_contract(price_per_mwh=Decimal("33.333333"))
+    await create_contract(energy_type="Wind")
+
+    response = await client.post(
+        "/jobs",
+        json={
+            "kind": "export",
+            "params": {"table": "contracts", "filters": {"energy_types": ["Solar"]}},
+        },
+    )
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+
+    job = await wait_for_job(client, response.json()["id"])
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    assert job["started_at"] is not None and job["finished_at"] is not None
+
+    result = await client.get(f"/jobs/{job['id']}/result")
+    assert result.headers["content-type"] == "application/vnd.apache.parquet"
+    table = pq.read_table(io.BytesIO(result.content))
+    assert table.column("price_per_mwh").to_pylist() == [Decimal("33.333333")]
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_job_returns_json_result(client, create_contract, job_queue):
+    contract = await create_contract()
+
+    response = await client.post(
+        "/jobs",
+        json={
+            "kind": "bulk_update_contracts",
+            "params": {"contract_ids": [contract.id], "update": {"status": "Reserved"}},
+        },
+    )
+    job = await wait_for_job(client, response.json()["id"])
+
+    assert job["status"] == "succeeded"
+    assert job["progress_message"] == "Updated 1 contracts"
+    result = await client.get(f"/jobs/{job['id']}/result")
+    assert result.json() == {"updated_count": 1, "contract_ids": [contract.id]}
+    assert (await client.get(f"/contracts/{contract.id}")).json()["status"] == "Reserved"
+
+
+@pytest.mark.asyncio
+async def test_optimize_job_runs_solver_in_process_pool(
+    app, client, create_contract, session_maker, tmp_path
+):
+    cheap = await create_contract(price_per_mwh=Decimal("20.000000"))
+    await create_contract(price_per_mwh=Decimal("90.000000"))
+    queue = JobQueue(
+        session_factory=session_maker, process_pool_workers=1, result_dir=tmp_path / "jobs"
+    )
+    await queue.start()
+    app.state.job_queue = queue
+    try:
+        response = await client.post(
+            "/jobs",
+            json={
+                "kind": "optimize_portfolio",
+                "params": {"user_id": 7, "request": {"target_mwh": "100"}},
+            },
+        )
+        job = await wait_for_job(client, response.json()["id"])
+    finally:
+        await queue.stop()
+
+    assert job["status"] == "succeeded", job["error"]
+    result = (await client.get(f"/jobs/{job['id']}/result")).json()
+    assert [contract["id"] for contract in result["contracts"]] == [cheap.id]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("kind", "params"),
+    [
+        (
+            JobKind.bulk_update_contracts,
+            {"contract_ids": [1], "update": {"status": "Reserved"}},
+        ),
+        (JobKind.optimize_portfolio, {"user_id": 7, "request": {"target_mwh": "100"}}),
+        (JobKind.rebuild_similarity_index, {}),
+    ],
+)
+async def test_handlers_stop_before_heavy_step_when_cancelled(
+    create_contract, session_maker, tmp_path, kind, params
+):
+    await create_contract()
+    async with session_maker() as session:
+        job = Job(kind=kind.value, status="running", params=params, cancel_requested=True)
+        session.add(job)
+        await session.commit()
+    context = JobContext(
+        job_id=job.id, session_factory=session_maker, cpu_executor=None, result_dir=tmp_path
+    )
+
+    with pytest.raises(JobCancelled):
+        await JOB_HANDLERS[kind](context, params)
+    async with session_maker() as session:
+        reported = await session.get(Job, job.id)
+    assert reported.progress == 0.0
+    assert reported.progress_message is not None
+
+
+@pytest.mark.asyncio
+async def test_invalid_job_params_are_rejected(client, job_queue):
+    response = await client.post(
+        "/jobs", json={"kind": "export", "params": {"table": "users"}}
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_and_queued_jobs(app, client, session_maker, tmp_path):
+    started = asyncio.Event()
+
+    async def block(context, params):
+        started.set()
+        await asyncio.Event().wait()
+        return JobOutcome()
+
+    queue = JobQueue(
+        session_factory=session_maker,
+        max_concurrency=1,
+        process_pool_workers=0,
+        result_dir=tmp_path,
+        handlers={JobKind.rebuild_similarity_index: block},
+    )
+    await queue.start()
+    app.state.job_queue = queue
+    try:
+        running = (await client.post("/jobs", json={"kind": "rebuild_similarity_index"})).json()
+        queued = (await client.post("/jobs", json={"kind": "rebuild_similarity_index"})).json()
+        await asyncio.wait_for(started.wait(), 1)
+
+        assert (await client.get(f"/jobs/{running['id']}/result")).status_code == 409
+        cancelled = await client.post(f"/jobs/{queued['id']}/cancel")
+        assert cancelled.json()["status"] == "cancelled"
+        cancelled = await client.post(f"/jobs/{running['id']}/cancel")
+        assert cancelled.json()["status"] == "cancelled"
+        assert cancelled.json()["finished_at"] is not None
+        assert (await client.post(f"/jobs/{running['id']}/cancel")).status_code == 200
+        queued_job = await wait_for_job(client, queued["id"])
+        assert queued_job["started_at"] is None
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_jobs_left_over_from_a_previous_process_are_resumed(
+    app, client, session_maker, tmp_path
+):
+    async with session_maker() as session:
+        session.add(Job(kind="rebuild_similarity_index", status="running", params={}))
+        await session.commit()
+
+    queue = JobQueue(session_factory=session_maker, process_pool_workers=0, result_dir=tmp_path)
+    await queue.start()
+    app.state.job_queue = queue
+    try:
+        job = await wait_for_job(client, 1)
+    finally:
+        await queue.stop()
+    assert job["status"] == "succeeded"
+    assert (await client.get("/jobs/1/result")).json() == {"contracts_indexed": 0}
+
+
+@pytest.mark.asyncio
+async def test_only_jobs_with_lapsed_leases_are_recovered(app, client, session_maker, tmp_path):
+    now = datetime.now(timezone.utc)
+    async with session_maker() as session:
+        session.add_all(
+            [
+                Job(
+                    kind="rebuild_similarity_index",
+                    status="running",
+                    params={},
+                    lease_owner="live-worker",
+                    lease_expires_at=now + timedelta(minutes=5),
+                ),
+                Job(
+                    kind="rebuild_similarity_index",
+                    status="running",
+                    params={},
+                    lease_owner="crashed-worker",
+                    lease_expires_at=now - timedelta(seconds=1),
+                ),
+            ]
+        )
+        await session.commit()
+
+    queue = JobQueue(session_factory=session_maker, process_pool_workers=0, result_dir=tmp_path)
+    await queue.start()
+    app.state.job_queue = queue
+    try:
+        lapsed = await wait_for_job(client, 2)
+        assert await queue.recover() == []
+    finally:
+        await queue.stop()
+    assert lapsed["status"] == "succeeded"
+    assert (await client.get("/jobs/1")).json()["status"] == "running"
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_renews_lease_and_applies_remote_cancel(
+    app, client, session_maker, tmp_path
+):
+    started = asyncio.Event()
+
+    async def block(context, params):
+        started.set()
+        await asyncio.Event().wait()
+        return JobOutcome()
+
+    queue = JobQueue(
+        session_factory=session_maker,
+        max_concurrency=1,
+        process_pool_workers=0,
+        result_dir=tmp_path,
+        handlers={JobKind.rebuild_similarity_index: block},
+        lease_seconds=3,
+    )
+    await queue.start()
+    app.state.job_queue = queue
+    try:
+        response = await client.post("/jobs", json={"kind": "rebuild_similarity_index"})
+        job_id = response.json()["id"]
+        await asyncio.wait_for(started.wait(), 1)
+        async with session_maker() as session:
+            claimed = await session.get(Job, job_id)
+        assert claimed.lease_owner == queue.worker_id
+
+        await asyncio.sleep(1.2)
+        async with session_maker() as session:
+            renewed = await session.get(Job, job_id)
+            assert renewed.lease_expires_at > claimed.lease_expires_at
+            # Another process asks for the cancel; only the owner's heartbeat sees it.
+            await session.execute(
+                update(Job).where(Job.id == job_id).values(cancel_requested=True)
+            )
+            await session.commit()
+        job = await wait_for_job(client, job_id)
+    finally:
+        await queue.stop()
+    assert job["status"] == "cancelled"
+
+
+@pytest.mark.asyncio
+async def test_jobs_disabled_returns_503(client):
+    response = await client.post("/jobs", json={"kind": "rebuild_similarity_index"})
+    assert response.status_code == 503
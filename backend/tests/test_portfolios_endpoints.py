@@ -1,9 +1,18 @@
+import asyncio
+from datetime import date, timedelta
+import json
 from decimal import Decimal
 
 import pytest
 from fastapi import HTTPException
+from sqlalchemy import event, func, select
 
+from app.models import Portfolio, User
+from app.repositories import SqlPortfolioRepository
+from app.schemas import OptimizationStatus, PortfolioOptimizationRequest
 import app.routers.portfolios as portfolios_router
+import app.services.optimizer_service as optimizer_service
+import app.services.portfolios_service as portfolios_service
 
 
 @pytest.mark.asyncio
@@ -42,6 +51,51 @@ async def test_remove_contract_from_portfolio(create_contract, client):
     assert missing_response.json()["detail"] == "Portfolio holding not found"
 
 
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_add_and_remove_holding_statement_counts(create_contract, session_maker):
+    contract = await create_contract()
+    engine = session_maker.kw["bind"].sync_engine
+    statements: list[str] = []
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        async with session_maker() as session:
+            repository = SqlPortfolioRepository(session)
+            await repository.add_holding(user_id=70, contract_id=contract.id)
+            added = len(statements)
+            await repository.add_holding(user_id=70, contract_id=contract.id)
+            added_again = len(statements) - added
+            assert await repository.remove_holding(user_id=70, contract_id=contract.id)
+            removed = len(statements) - added - added_again
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # SQLite has no data-modifying CTEs: user, portfolio, and holding upserts plus the
+    # read-back. PostgreSQL sends them as one statement.
+    assert added == 4
+    assert added_again == 4
+    assert removed == 1
+    assert not any(statement.lstrip().upper().startswith("SELECT") for statement in statements[:3])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_adds_keep_one_holding(create_contract, client):
+    contract = await create_contract()
+
+    responses = await asyncio.gather(
+        *(client.post(f"/portfolios/71/contracts/{contract.id}") for _ in range(5))
+    )
+    assert [response.status_code for response in responses] == [201] * 5
+    assert len({response.json()["id"] for response in responses}) == 1
+
+    portfolio = await client.get("/portfolios/71")
+    assert [item["contract"]["id"] for item in portfolio.json()["holdings"]] == [contract.id]
+
+
 @pytest.mark.asyncio
 async def test_portfolio_metrics_after_add(create_contract, client):
     contract = await create_contract(
@@ -123,3 +177,427 @@ async def test_get_portfolio_metrics_direct_empty(session_maker):
             user_id=99, session=session
         )
     assert metrics.total_contracts == 0
+
+
+@pytest.mark.asyncio
+async def test_portfolio_schedule_spreads_across_months(create_contract, client):
+    january = await create_contract(
+        quantity_mwh=Decimal("310.000"),
+        price_per_mwh=Decimal("10.000000"),
+        delivery_start=date(2026, 1, 1),
+        delivery_end=date(2026, 1, 31),
+    )
+    straddling = await create_contract(
+        quantity_mwh=Decimal("310.000"),
+        price_per_mwh=Decimal("20.000000"),
+        delivery_start=date(2026, 1, 15),
+        delivery_end=date(2026, 2, 14),
+    )
+    await client.post(f"/portfolios/30/contracts/{january.id}")
+    await client.post(f"/portfolios/30/contracts/{straddling.id}")
+
+    response = await client.get("/portfolios/30/schedule?granularity=month")
+    assert response.status_code == 200
+    buckets = response.json()["buckets"]
+    assert [bucket["period_start"] for bucket in buckets] == ["2026-01-01", "2026-02-01"]
+    assert buckets[0]["period_end"] == "2026-01-31"
+    assert buckets[0]["capacity_mwh"] == "480.000"
+    assert buckets[0]["cost"] == "6500.000000000"
+    assert buckets[1]["capacity_mwh"] == "140.000"
+
+
+@pytest.mark.asyncio
+async def test_portfolio_schedule_weekly_window(create_contract, client):
+    contract = await create_contract(
+        quantity_mwh=Decimal("70.000"),
+        delivery_start=date(2026, 3, 2),
+        delivery_end=date(2026, 3, 15),
+    )
+    await client.post(f"/portfolios/31/contracts/{contract.id}")
+
+    response = await client.get(
+        "/portfolios/31/schedule?granularity=week&start=2026-03-09&end=2026-03-31"
+    )
+    assert response.status_code == 200
+    buckets = response.json()["buckets"]
+    assert buckets[0]["period_start"] == "2026-03-09"
+    assert buckets[0]["capacity_mwh"] == "35.000"
+    assert sum(Decimal(bucket["capacity_mwh"]) for bucket in buckets) == Decimal("35")
+
+
+@pytest.mark.asyncio
+async def test_portfolio_schedule_sums_exactly_to_metrics(create_contract, client):
+    # Quantities and costs that do not divide evenly over 3, 7, and 29 days.
+    for quantity, price, days in (
+        ("100.000", "33.333333", 3),
+        ("0.001", "0.000001", 7),
+        ("1234.567", "89.123457", 29),
+    ):
+        contract = await create_contract(
+            quantity_mwh=Decimal(quantity),
+            price_per_mwh=Decimal(price),
+            delivery_start=date(2026, 2, 20),
+            delivery_end=date(2026, 2, 20) + timedelta(days=days - 1),
+        )
+        await client.post(f"/portfolios/32/contracts/{contract.id}")
+
+    metrics = (await client.get("/portfolios/32/metrics")).json()
+    for granularity in ("day", "week", "month"):
+        buckets = (
+            await client.get(f"/portfolios/32/schedule?granularity={granularity}")
+        ).json()["buckets"]
+        assert sum(Decimal(bucket["capacity_mwh"]) for bucket in buckets) == Decimal(
+            metrics["total_capacity_mwh"]
+        )
+        assert sum(Decimal(bucket["cost"]) for bucket in buckets) == Decimal(
+            metrics["total_cost"]
+        )
+
+
+@pytest.mark.asyncio
+async def test_portfolio_schedule_empty(client):
+    response = await client.get("/portfolios/404/schedule")
+    assert response.status_code == 200
+    assert response.json()["buckets"] == []
+
+
+@pytest.mark.asyncio
+async def test_portfolio_what_if_ranks_candidates(create_contract, client):
+    held = await create_contract(
+        quantity_mwh=Decimal("100.000"), price_per_mwh=Decimal("50.000000"), energy_type="Solar"
+    )
+    cheap = await create_contract(
+        quantity_mwh=Decimal("100.000"), price_per_mwh=Decimal("30.000000"), energy_type="Wind"
+    )
+    pricey = await create_contract(
+        quantity_mwh=Decimal("100.000"), price_per_mwh=Decimal("90.000000"), energy_type="Solar"
+    )
+    await client.post(f"/portfolios/40/contracts/{held.id}")
+
+    response = await client.get("/portfolios/40/what-if")
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["baseline"]["total_contracts"] == 1
+    assert payload["candidates_evaluated"] == 2
+    first, second = payload["candidates"]
+    assert first["contract_id"] == cheap.id
+    assert Decimal(first["weighted_avg_price_after"]) == Decimal("40")
+    assert Decimal(first["weighted_avg_price_delta"]) == Decimal("-10")
+    assert Decimal(first["total_cost_delta"]) == Decimal("3000")
+    assert first["energy_type_share_after"] == pytest.approx(0.5)
+    assert second["contract_id"] == pricey.id
+    assert second["energy_type_share_delta"] == pytest.approx(0)
+
+
+@pytest.mark.asyncio
+async def test_portfolio_what_if_applies_filters(create_contract, client):
+    await create_contract(energy_type="Solar")
+    wind = await create_contract(energy_type="Wind", quantity_mwh=Decimal("250.000"))
+
+    response = await client.get(
+        "/portfolios/41/what-if?energy_types=Wind&rank_by=total_capacity&rank_direction=desc"
+    )
+    assert response.status_code == 200
+    candidates = response.json()["candidates"]
+    assert [item["contract_id"] for item in candidates] == [wind.id]
+    assert candidates[0]["energy_type_share_after"] == pytest.approx(1)
+
+
+@pytest.mark.asyncio
+async def test_portfolio_what_if_ranks_whole_filtered_set(create_contract, client):
+    for price in ("70.000000", "60.000000", "50.000000"):
+        await create_contract(price_per_mwh=Decimal(price))
+    cheapest = await create_contract(price_per_mwh=Decimal("10.000000"))
+
+    # Filter order is by price descending, so the best addition comes last.
+    response = await client.get(
+        "/portfolios/42/what-if?sort_by=price_per_mwh&sort_direction=desc&top=1"
+    )
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["candidates_evaluated"] == 4
+    assert [item["contract_id"] for item in payload["candidates"]] == [cheapest.id]
+
+
+@pytest.mark.asyncio
+async def test_portfolio_what_if_merges_batches_into_running_top(
+    create_contract, client, monkeypatch
+):
+    monkeypatch.setattr(portfolios_service, "WHAT_IF_BATCH_SIZE", 2)
+    prices = ("40.000000", "10.000000", "70.000000", "10.000000", "20.000000")
+    contracts = [await create_contract(price_per_mwh=Decimal(price)) for price in prices]
+
+    response = await client.get("/portfolios/43/what-if?rank_by=total_cost&top=3")
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["candidates_evaluated"] == 5
+    # Equal costs rank by contract id.
+    assert [item["contract_id"] for item in payload["candidates"]] == [
+        contracts[1].id,
+        contracts[3].id,
+        contracts[4].id,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_optimize_portfolio_picks_cheapest_cover(create_contract, client):
+    cheap = await create_contract(quantity_mwh=Decimal("100.000"), price_per_mwh=Decimal("20.000000"))
+    mid = await create_contract(quantity_mwh=Decimal("100.000"), price_per_mwh=Decimal("30.000000"))
+    await create_contract(quantity_mwh=Decimal("100.000"), price_per_mwh=Decimal("90.000000"))
+    await create_contract(
+        quantity_mwh=Decimal("500.000"), price_per_mwh=Decimal("1.000000"), status="Sold"
+    )
+
+    response = await client.post("/portfolios/50/optimize", json={"target_mwh": "150"})
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["status"] == "feasible"
+    assert payload["applied"] is False
+    assert sorted(item["id"] for item in payload["contracts"]) == [cheap.id, mid.id]
+    assert payload["total_cost"] == pytest.approx(5000)
+    assert payload["lower_bound_cost"] == pytest.approx(3500)
+
+    portfolio = await client.get("/portfolios/50")
+    assert portfolio.json()["holdings"] == []
+
+
+@pytest.mark.asyncio
+async def test_optimize_portfolio_applies_per_type_targets(create_contract, client):
+    wind = await create_contract(energy_type="Wind", quantity_mwh=Decimal("80.000"))
+    solar = await create_contract(energy_type="Solar", quantity_mwh=Decimal("60.000"))
+    await create_contract(energy_type="Solar", location="Ohio", price_per_mwh=Decimal("1.000000"))
+
+    response = await client.post(
+        "/portfolios/51/optimize",
+        json={
+            "targets": [
+                {"energy_type": "Wind", "quantity_mwh": "50"},
+                {"energy_type": "Solar", "quantity_mwh": "50", "delivery_month": "2026-01-15"},
+            ],
+            "locations": ["Texas"],
+            "apply": True,
+        },
+    )
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["applied"] is True
+    assert sorted(item["id"] for item in payload["contracts"]) == [wind.id, solar.id]
+    assert payload["targets"][1]["delivery_month"] == "2026-01-01"
+
+    portfolio = await client.get("/portfolios/51")
+    assert len(portfolio.json()["holdings"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_optimize_portfolio_reports_budget_and_supply(create_contract, client):
+    await create_contract(quantity_mwh=Decimal("100.000"), price_per_mwh=Decimal("50.000000"))
+
+    over_budget = await client.post(
+        "/portfolios/52/optimize", json={"target_mwh": "100", "budget": "10", "apply": True}
+    )
+    assert over_budget.json()["status"] == "over_budget"
+    assert over_budget.json()["applied"] is False
+
+    short = await client.post("/portfolios/52/optimize", json={"target_mwh": "1000"})
+    assert short.json()["status"] == "insufficient_supply"
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_portfolio_reads_do_not_create_rows(client, session_maker):
+    portfolio_response = await client.get("/portfolios/60")
+    metrics_response = await client.get("/portfolios/60/metrics")
+    assert portfolio_response.json() == {"user_id": 60, "holdings": []}
+    assert metrics_response.json()["total_contracts"] == 0
+
+    async with session_maker() as session:
+        users = await session.execute(select(func.count(User.id)))
+        portfolios = await session.execute(select(func.count(Portfolio.id)))
+    assert users.scalar_one() == 0
+    assert portfolios.scalar_one() == 0
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_first_add_creates_portfolio(create_contract, client, session_maker):
+    contract = await create_contract()
+    await client.post(f"/portfolios/61/contracts/{contract.id}")
+
+    async with session_maker() as session:
+        portfolio = await session.execute(select(Portfolio).where(Portfolio.user_id == 61))
+    assert portfolio.scalar_one().user_id == 61
+
+
+@pytest.mark.asyncio
+async def test_portfolio_snapshot_matches_separate_reads(create_contract, client):
+    wind = await create_contract(
+        energy_type="Wind", quantity_mwh=Decimal("200.000"), price_per_mwh=Decimal("30.000000")
+    )
+    solar = await create_contract(
+        energy_type="Solar", quantity_mwh=Decimal("100.000"), price_per_mwh=Decimal("60.000000")
+    )
+    await client.post(f"/portfolios/70/contracts/{wind.id}")
+    await client.post(f"/portfolios/70/contracts/{solar.id}")
+
+    snapshot = (await client.get("/portfolios/70/snapshot")).json()
+    portfolio = (await client.get("/portfolios/70")).json()
+    metrics = (await client.get("/portfolios/70/metrics")).json()
+    assert snapshot["total_holdings"] == 2
+    assert snapshot["holdings"] == portfolio["holdings"]
+    assert Decimal(str(snapshot["metrics"]["total_cost"])) == Decimal(str(metrics["total_cost"]))
+    assert Decimal(str(snapshot["metrics"]["weighted_avg_price_per_mwh"])) == Decimal("40")
+    assert [item["energy_type"] for item in snapshot["metrics"]["breakdown_by_energy_type"]] == [
+        item["energy_type"] for item in metrics["breakdown_by_energy_type"]
+    ]
+
+    page = (await client.get("/portfolios/70/snapshot?offset=1&limit=1")).json()
+    assert page["total_holdings"] == 2
+    assert [item["id"] for item in page["holdings"]] == [portfolio["holdings"][1]["id"]]
+
+
+@pytest.mark.asyncio
+async def test_portfolio_snapshot_large_portfolio_uses_aggregates(
+    create_contract, client, monkeypatch
+):
+    monkeypatch.setattr(portfolios_service, "SNAPSHOT_IN_MEMORY_METRICS_MAX_HOLDINGS", 1)
+    for _ in range(3):
+        contract = await create_contract()
+        await client.post(f"/portfolios/71/contracts/{contract.id}")
+
+    holdings_limits = []
+    list_portfolio_holdings = portfolios_service.list_portfolio_holdings
+
+    async def record_limit(**kwargs):
+        holdings_limits.append(kwargs.get("limit"))
+        return await list_portfolio_holdings(**kwargs)
+
+    monkeypatch.setattr(portfolios_service, "list_portfolio_holdings", record_limit)
+    snapshot = (await client.get("/portfolios/71/snapshot?limit=2")).json()
+    assert snapshot["total_holdings"] == 3
+    assert len(snapshot["holdings"]) == 2
+    # Counted first, so only the requested page is loaded.
+    assert holdings_limits == [2]
+    assert Decimal(str(snapshot["metrics"]["total_capacity_mwh"])) == Decimal("300")
+
+
+@pytest.mark.asyncio
+async def test_portfolio_holdings_keyset_pagination(create_contract, client):
+    holding_ids = []
+    for _ in range(5):
+        contract = await create_contract()
+        holding = (await client.post(f"/portfolios/80/contracts/{contract.id}")).json()
+        holding_ids.append(holding["id"])
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/portfolios/80/holdings?limit=2"
+        if cursor:
+            url += f"&cursor={cursor}"
+        page = (await client.get(url)).json()
+        seen.extend(item["id"] for item in page["holdings"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == list(reversed(holding_ids))
+
+
+@pytest.mark.asyncio
+async def test_portfolio_holdings_filter_and_sort(create_contract, client):
+    prices = ["70.000000", "20.000000", "45.000000"]
+    for price in prices:
+        contract = await create_contract(price_per_mwh=Decimal(price))
+        await client.post(f"/portfolios/81/contracts/{contract.id}")
+    coal = await create_contract(energy_type="Coal", price_per_mwh=Decimal("10.000000"))
+    await client.post(f"/portfolios/81/contracts/{coal.id}")
+
+    first = (
+        await client.get(
+            "/portfolios/81/holdings?limit=2&energy_types=Solar&sort_by=price_per_mwh"
+        )
+    ).json()
+    second = (
+        await client.get(
+            "/portfolios/81/holdings?limit=2&energy_types=Solar&sort_by=price_per_mwh"
+            f"&cursor={first['next_cursor']}"
+        )
+    ).json()
+    prices_seen = [
+        Decimal(str(item["contract"]["price_per_mwh"]))
+        for item in first["holdings"] + second["holdings"]
+    ]
+    assert prices_seen == sorted(Decimal(price) for price in prices)
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_portfolio_holdings_rejects_bad_cursor(client):
+    response = await client.get("/portfolios/82/holdings?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.asyncio
+async def test_portfolio_holdings_stream_ndjson(create_contract, client):
+    for _ in range(3):
+        contract = await create_contract()
+        await client.post(f"/portfolios/83/contracts/{contract.id}")
+
+    response = await client.get("/portfolios/83/holdings/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 3
+    assert lines[0]["contract"]["energy_type"] == "Solar"
+
+
+@pytest.mark.asyncio
+async def test_optimize_portfolio_apply_skips_contracts_gone_since_solve(
+    create_contract, client, session_maker
+):
+    kept = await create_contract(quantity_mwh=Decimal("100.000"))
+    sold = await create_contract(quantity_mwh=Decimal("100.000"))
+    deleted = await create_contract(quantity_mwh=Decimal("100.000"))
+
+    async def change_contracts(progress: float, _message: str) -> None:
+        # Runs after the solve and before the apply.
+        if progress == 0.9:
+            await client.patch(f"/contracts/{sold.id}", json={"status": "Sold"})
+            await client.delete(f"/contracts/{deleted.id}")
+
+    async with session_maker() as session:
+        result = await optimizer_service.optimize_portfolio(
+            session=session,
+            user_id=53,
+            payload=PortfolioOptimizationRequest(target_mwh=Decimal("300"), apply=True),
+            on_progress=change_contracts,
+        )
+    assert result["status"] == OptimizationStatus.feasible
+    assert result["added_contract_ids"] == [kept.id]
+
+    portfolio = await client.get("/portfolios/53")
+    assert [item["contract"]["id"] for item in portfolio.json()["holdings"]] == [kept.id]
+
+
+@pytest.mark.asyncio
+async def test_optimize_portfolio_concurrent_applies_do_not_conflict(create_contract, client):
+    contracts = [await create_contract(quantity_mwh=Decimal("100.000")) for _ in range(3)]
+    request = {"target_mwh": "300", "apply": True}
+
+    responses = await asyncio.gather(
+        client.post("/portfolios/54/optimize", json=request),
+        client.post("/portfolios/54/optimize", json=request),
+        client.post(f"/portfolios/54/contracts/{contracts[0].id}"),
+    )
+    assert [response.status_code for response in responses] == [200, 200, 201]
+    added = [
+        contract_id
+        for response in responses[:2]
+        for contract_id in response.json()["added_contract_ids"]
+    ]
+    assert len(added) == len(set(added))
+
+    portfolio = await client.get("/portfolios/54")
+    assert sorted(item["contract"]["id"] for item in portfolio.json()["holdings"]) == [
+        contract.id for contract in contracts
+    ]
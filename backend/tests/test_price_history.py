@@ -0,0 +1,182 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.models import Contract
+from app.schemas import PriceBucket, PriceChangeReason
+from app.services.lifecycle_service import expire_contract_batch
+from app.services.price_history_service import bucket_start, record_price_history
+
+CONTRACT_PAYLOAD = {
+    "energy_type": "Wind",
+    "quantity_mwh": "100.000",
+    "price_per_mwh": "40.000000",
+    "delivery_start": "2026-01-01",
+    "delivery_end": "2026-01-31",
+    "location": "Texas",
+    "status": "Available",
+}
+
+
+def test_bucket_start_truncates_in_utc() -> None:
+    moment = datetime(2026, 3, 15, 17, 45, 12, tzinfo=timezone.utc)
+
+    assert bucket_start(moment, PriceBucket.hour) == datetime(2026, 3, 15, 17, tzinfo=timezone.utc)
+    assert bucket_start(moment, PriceBucket.day) == datetime(2026, 3, 15, tzinfo=timezone.utc)
+    assert bucket_start(moment, PriceBucket.month) == datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_create_and_update_record_price_and_status_history(client) -> None:
+    contract_id = (await client.post("/contracts", json=CONTRACT_PAYLOAD)).json()["id"]
+    await client.patch(f"/contracts/{contract_id}", json={"price_per_mwh": "42.5"})
+    await client.patch(f"/contracts/{contract_id}", json={"quantity_mwh": "120"})
+    await client.patch(f"/contracts/{contract_id}", json={"status": "Reserved"})
+
+    response = await client.get(f"/contracts/{contract_id}/price-history")
+
+    assert response.status_code == 200
+    history = response.json()
+    assert [
+        (row["reason"], row["price_per_mwh"], row["status"], row["price_changed"])
+        for row in history
+    ] == [
+        ("updated", "42.500000", "Reserved", False),
+        ("updated", "42.500000", "Available", True),
+        ("created", "40.000000", "Available", True),
+    ]
+    assert history[0]["location"] == "Texas"
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_history_outlives_deleted_contract(client) -> None:
+    contract_id = (await client.post("/contracts", json=CONTRACT_PAYLOAD)).json()["id"]
+    await client.delete(f"/contracts/{contract_id}")
+
+    history = (await client.get(f"/contracts/{contract_id}/price-history")).json()
+
+    assert [row["reason"] for row in history] == ["created"]
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_bulk_update_records_only_changed_contracts(client, create_contract) -> None:
+    cheap = await create_contract(price_per_mwh=Decimal("30.000000"))
+    priced = await create_contract(price_per_mwh=Decimal("45.000000"))
+
+    response = await client.post(
+        "/contracts/bulk-update",
+        json={"contract_ids": [cheap.id, priced.id], "update": {"price_per_mwh": "45"}},
+    )
+
+    assert response.json()["updated_count"] == 2
+    assert len((await client.get(f"/contracts/{cheap.id}/price-history")).json()) == 1
+    assert (await client.get(f"/contracts/{priced.id}/price-history")).json() == []
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_expiry_records_status_change(session_maker, create_contract, client) -> None:
+    contract = await create_contract(delivery_end=date(2026, 1, 31))
+
+    async with session_maker() as session:
+        await expire_contract_batch(session=session, today=date(2026, 2, 1), batch_size=10)
+
+    history = (await client.get(f"/contracts/{contract.id}/price-history")).json()
+    assert [(row["reason"], row["status"], row["price_changed"]) for row in history] == [
+        ("expired", "Expired", False)
+    ]
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_rollups_track_open_high_low_close(session_maker, create_contract, client) -> None:
+    contract = await create_contract(energy_type="Solar", location="Arizona")
+    other = await create_contract(energy_type="Wind", location="Arizona")
+    observations = [
+        (datetime(2026, 3, 15, 10, 5, tzinfo=timezone.utc), Decimal("50")),
+        (datetime(2026, 3, 15, 10, 50, tzinfo=timezone.utc), Decimal("58")),
+        # Arrives late but belongs before the others: becomes the open, not the close.
+        (datetime(2026, 3, 15, 10, 1, tzinfo=timezone.utc), Decimal("47")),
+        (datetime(2026, 3, 15, 11, 30, tzinfo=timezone.utc), Decimal("52")),
+    ]
+    async with session_maker() as session:
+        solar = await session.get(Contract, contract.id)
+        for recorded_at, price in observations:
+            solar.price_per_mwh = price
+            await record_price_history(
+                session=session,
+                contracts=[solar],
+                reason=PriceChangeReason.updated,
+                recorded_at=recorded_at,
+            )
+        wind = await session.get(Contract, other.id)
+        await record_price_history(
+            session=session,
+            contracts=[wind],
+            reason=PriceChangeReason.created,
+            recorded_at=datetime(2026, 3, 15, 12, tzinfo=timezone.utc),
+        )
+        await session.commit()
+
+    hourly = (
+        await client.get(
+            "/prices/ohlc",
+            params={"bucket": "hour", "energy_type": "Solar", "location": "Arizona"},
+        )
+    ).json()
+    daily = (await client.get("/prices/ohlc", params={"bucket": "day"})).json()
+    ranged = (
+        await client.get(
+            "/prices/ohlc",
+            params={
+                "bucket": "hour",
+                "start": "2026-03-15T11:00:00Z",
+                "end": "2026-03-15T12:00:00Z",
+            },
+        )
+    ).json()
+
+    assert [
+        (
+            row["open_price"],
+            row["high_price"],
+            row["low_price"],
+            row["close_price"],
+            row["observations"],
+        )
+        for row in hourly
+    ] == [
+        ("47.000000", "58.000000", "47.000000", "58.000000", 3),
+        ("52.000000", "52.000000", "52.000000", "52.000000", 1),
+    ]
+    assert [(row["energy_type"], row["close_price"], row["average_price"]) for row in daily] == [
+        ("Solar", "52.000000", "51.750000"),
+        ("Wind", "50.000000", "50.000000"),
+    ]
+    assert [row["close_price"] for row in ranged] == ["52.000000"]
+
+
+@pytest.mark.asyncio
+async def test_ohlc_rejects_empty_range(client) -> None:
+    response = await client.get(
+        "/prices/ohlc", params={"start": "2026-03-02T00:00:00Z", "end": "2026-03-01T00:00:00Z"}
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_ohlc_compares_naive_and_aware_bounds(client) -> None:
+    response = await client.get(
+        "/prices/ohlc", params={"start": "2026-03-01T00:00:00", "end": "2026-03-02T00:00:00Z"}
+    )
+    reversed_range = await client.get(
+        "/prices/ohlc", params={"start": "2026-03-02T00:00:00+00:00", "end": "2026-03-01T00:00:00"}
+    )
+
+    assert response.status_code == 200
+    assert reversed_range.status_code == 400
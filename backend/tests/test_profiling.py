@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import pstats
+
+from fastapi import FastAPI
+import httpx
+import pytest
+
+from app.services.profiling import ProfileStore, ProfilingMiddleware
+
+
+@pytest.fixture
+def profile_store(tmp_path) -> ProfileStore:
+    return ProfileStore(directory=tmp_path / "profiles", max_traces=2)
+
+
+@pytest.fixture
+async def profiled_client(app: FastAPI, profile_store: ProfileStore):
+    app.add_middleware(ProfilingMiddleware, token="secret", store=profile_store)
+    app.state.profile_store = profile_store
+    app.state.profile_token = "secret"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_profiles_endpoints_are_404_when_profiling_disabled(client) -> None:
+    response = await client.get("/profiles")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_profiles_endpoints_are_404_without_configured_token(
+    profiled_client, app: FastAPI
+) -> None:
+    app.state.profile_token = ""
+
+    anonymous = await profiled_client.get("/profiles")
+    with_header = await profiled_client.get("/profiles", headers={"X-Profile-Token": ""})
+
+    assert anonymous.status_code == 404
+    assert with_header.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_requests_without_token_are_not_profiled(profiled_client, profile_store) -> None:
+    response = await profiled_client.get("/contracts")
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert profile_store.list() == []
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_token_header_profiles_request_with_db_time(
+    profiled_client, profile_store, create_contract
+) -> None:
+    await create_contract()
+
+    response = await profiled_client.get("/contracts", headers={"X-Profile-Token": "secret"})
+
+    assert response.status_code == 200
+    trace_id = response.headers["x-profile-id"]
+    summary = profile_store.get(trace_id)
+    assert summary["path"] == "/contracts"
+    assert summary["status_code"] == 200
+    assert summary["db_queries"] >= 1
+    assert summary["db_ms"] > 0
+    assert summary["wall_ms"] >= summary["db_ms"]
+    assert "pydantic" in summary["own_time_ms_by_bucket"]
+    assert summary["top_functions"]
+    assert pstats.Stats(str(profile_store.profile_path(trace_id))).total_calls > 0
+
+
+@pytest.mark.asyncio
+async def test_profile_store_keeps_only_newest_traces(profiled_client, profile_store) -> None:
+    headers = {"X-Profile-Token": "secret"}
+    trace_ids = [
+        (await profiled_client.get("/health", headers=headers)).headers["x-profile-id"]
+        for _ in range(3)
+    ]
+
+    listed = await profiled_client.get("/profiles", headers=headers)
+
+    assert listed.status_code == 200
+    assert [item["id"] for item in listed.json()] == trace_ids[:0:-1]
+    assert profile_store.get(trace_ids[0]) is None
+    assert profile_store.profile_path(trace_ids[0]) is None
+
+
+@pytest.mark.asyncio
+async def test_profile_download_and_report_require_token(profiled_client) -> None:
+    headers = {"X-Profile-Token": "secret"}
+    trace_id = (await profiled_client.get("/health", headers=headers)).headers["x-profile-id"]
+
+    forbidden = await profiled_client.get(f"/profiles/{trace_id}/download")
+    download = await profiled_client.get(f"/profiles/{trace_id}/download", headers=headers)
+    report = await profiled_client.get(f"/profiles/{trace_id}/report", headers=headers)
+    missing = await profiled_client.get("/profiles/../../etc/passwd", headers=headers)
+
+    assert forbidden.status_code == 403
+    assert download.status_code == 200
+    assert download.headers["content-type"] == "application/octet-stream"
+    assert report.status_code == 200
+    assert "cumulative" in report.text
+    assert missing.status_code == 404
@@ -0,0 +1,293 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from app import repositories
+from app.models import Contract, PortfolioHolding
+from app.repositories import InMemoryStore, SqlContractRepository, SqlPortfolioRepository
+from app.repositories.keyset import (
+    HOLDINGS_SORT_TYPES,
+    decode_holdings_cursor,
+    encode_holdings_cursor,
+    holding_sort_value,
+)
+from app.schemas import ContractFilters, ContractSortBy, ContractSortDirection, EnergyType
+
+LOCATIONS = ("Texas", "Ohio", "West Texas", "Quebec")
+STATUSES = ("Available", "Reserved", "Sold", "Expired")
+
+
+def generate_contract_fields(count: int, seed: int = 11) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    energy_types = [energy_type.value for energy_type in EnergyType]
+    contracts = []
+    for _ in range(count):
+        delivery_start = date(2026, 1, 1) + timedelta(days=int(rng.integers(0, 90)))
+        contracts.append(
+            {
+                "energy_type": energy_types[int(rng.integers(0, len(energy_types)))],
+                # Few distinct values, so sort ties exercise the id tie-breaker.
+                "quantity_mwh": Decimal(int(rng.integers(1, 6)) * 50),
+                "price_per_mwh": Decimal(int(rng.integers(20, 30))),
+                "delivery_start": delivery_start,
+                "delivery_end": delivery_start + timedelta(days=int(rng.integers(0, 60))),
+                "location": LOCATIONS[int(rng.integers(0, len(LOCATIONS)))],
+                "status": STATUSES[int(rng.integers(0, len(STATUSES)))],
+            }
+        )
+    return contracts
+
+
+@pytest.fixture(params=["sql", "memory"])
+async def backend(request, session_maker):
+    if request.param == "memory":
+        store = InMemoryStore()
+        yield store.contracts, store.portfolios
+        return
+    async with session_maker() as session:
+        yield SqlContractRepository(session), SqlPortfolioRepository(session)
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "filters",
+    [
+        ContractFilters(),
+        ContractFilters(sort_by=ContractSortBy.price_per_mwh, price_min=22, price_max=26),
+        ContractFilters(
+            sort_by=ContractSortBy.quantity_mwh,
+            sort_direction=ContractSortDirection.desc,
+            quantity_min=100,
+        ),
+        ContractFilters(
+            sort_by=ContractSortBy.delivery_start,
+            sort_direction=ContractSortDirection.desc,
+            delivery_start_from=date(2026, 2, 1),
+            delivery_end_to=date(2026, 3, 1),
+        ),
+        ContractFilters(location="texas", active_only=True, energy_types=[EnergyType.wind]),
+        ContractFilters(
+            sort_by=ContractSortBy.total_value,
+            sort_direction=ContractSortDirection.desc,
+            total_value_min=2_000,
+            total_value_max=6_000,
+        ),
+        ContractFilters(
+            sort_by=ContractSortBy.duration_days, duration_days_min=10, duration_days_max=40
+        ),
+        ContractFilters(search="sol", sort_direction=ContractSortDirection.desc),
+    ],
+)
+async def test_memory_listing_matches_sql(session_maker, filters) -> None:
+    store = InMemoryStore()
+    async with session_maker() as session:
+        sql_repository = SqlContractRepository(session)
+        for fields in generate_contract_fields(120):
+            await sql_repository.add(fields)
+            await store.contracts.add(fields)
+
+        for offset, limit in ((0, 500), (7, 15)):
+            sql_page = await sql_repository.list(filters=filters, offset=offset, limit=limit)
+            memory_page = await store.contracts.list(filters=filters, offset=offset, limit=limit)
+            assert [contract.id for contract in memory_page] == [
+                contract.id for contract in sql_page
+            ]
+        sql_measures = await sql_repository.list_measures(filters=filters, limit=40)
+        memory_measures = await store.contracts.list_measures(filters=filters, limit=40)
+        assert [tuple(row) for row in memory_measures] == [tuple(row) for row in sql_measures]
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "filters",
+    [
+        ContractFilters(),
+        ContractFilters(sort_by=ContractSortBy.price_per_mwh, energy_types=[EnergyType.solar]),
+        ContractFilters(
+            sort_by=ContractSortBy.total_value,
+            sort_direction=ContractSortDirection.desc,
+            active_only=True,
+        ),
+        ContractFilters(sort_direction=ContractSortDirection.asc, location="texas"),
+    ],
+)
+async def test_memory_holdings_and_candidates_match_sql(session_maker, filters) -> None:
+    store = InMemoryStore()
+    async with session_maker() as session:
+        repositories_by_backend = (
+            (SqlContractRepository(session), SqlPortfolioRepository(session)),
+            (store.contracts, store.portfolios),
+        )
+        results = []
+        for contracts, portfolios in repositories_by_backend:
+            added = [await contracts.add(fields) for fields in generate_contract_fields(60)]
+            await portfolios.add_holdings(
+                user_id=3, contract_ids=[contract.id for contract in added[::3]]
+            )
+            pages, after = [], None
+            while True:
+                page = await portfolios.list_holdings_after(
+                    user_id=3, filters=filters, limit=4, after=after
+                )
+                pages.append([holding.contract_id for holding in page])
+                if len(page) < 4:
+                    break
+                # Round-trip through the page cursor, as the API does.
+                cursor = encode_holdings_cursor(holding_sort_value(page[-1], filters), page[-1].id)
+                after = decode_holdings_cursor(cursor, filters)
+            streamed = [
+                row[2].id
+                async for batch in portfolios.stream_holdings(
+                    user_id=3, filters=filters, batch_size=5
+                )
+                for row in batch
+            ]
+            measures = await portfolios.list_holding_measures(user_id=3, filters=filters)
+            candidates = await portfolios.list_candidates(user_id=3, filters=filters, limit=25)
+            streamed_candidates = [
+                tuple(row)
+                async for batch in portfolios.stream_candidates(
+                    user_id=3, filters=filters, batch_size=7
+                )
+                for row in batch
+            ]
+            results.append(
+                (
+                    pages,
+                    streamed,
+                    sorted(tuple(row) for row in measures),
+                    [tuple(row) for row in candidates],
+                    sorted(streamed_candidates),
+                )
+            )
+
+    sql_result, memory_result = results
+    assert memory_result == sql_result
+    assert sum(sql_result[0], []) == sql_result[1]
+
+
+def test_holdings_sort_types_match_columns() -> None:
+    expected = {"added_at": PortfolioHolding.added_at.type.python_type}
+    for sort_by in ContractSortBy:
+        expected[sort_by.value] = getattr(Contract, sort_by.value).type.python_type
+    assert HOLDINGS_SORT_TYPES == expected
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_and_expiry(backend) -> None:
+    contracts, portfolios = backend
+    added = [await contracts.add(fields) for fields in generate_contract_fields(30)]
+    await portfolios.add_holdings(user_id=4, contract_ids=[added[0].id, added[1].id])
+    assert await portfolios.add_holdings(user_id=4, contract_ids=[added[1].id, added[2].id]) == [
+        added[2].id
+    ]
+
+    by_ids = await contracts.bulk_update(
+        {"price_per_mwh": Decimal(10)}, contract_ids=[added[0].id, added[1].id, 999]
+    )
+    assert sorted(contract.id for contract in by_ids) == [added[0].id, added[1].id]
+    assert (await portfolios.metrics(user_id=4))["total_cost"] == sum(
+        contract.quantity_mwh * (10 if index < 2 else contract.price_per_mwh)
+        for index, contract in enumerate(added[:3])
+    )
+
+    by_filters = await contracts.bulk_update(
+        {"status": "Reserved"}, filters=ContractFilters(location="ohio")
+    )
+    expected = [contract.id for contract in added if contract.location == "Ohio"]
+    assert sorted(contract.id for contract in by_filters) == expected
+
+    today = date(2026, 3, 1)
+    lapsed = sorted(
+        contract.id
+        for contract in added
+        if contract.delivery_end < today and contract.status in ("Available", "Reserved")
+    )
+    first_batch = await contracts.expire(today=today, batch_size=3)
+    rest = await contracts.expire(today=today, batch_size=100)
+    assert [contract.id for contract in first_batch] == lapsed[:3]
+    assert sorted(contract.id for contract in rest) == lapsed[3:]
+    assert all(contract.status == "Expired" for contract in [*first_batch, *rest])
+
+
+@pytest.mark.asyncio
+async def test_holdings_are_idempotent_and_newest_first(backend) -> None:
+    contracts, portfolios = backend
+    first, second = [await contracts.add(fields) for fields in generate_contract_fields(2)]
+
+    added = await portfolios.add_holding(user_id=5, contract_id=first.id)
+    again = await portfolios.add_holding(user_id=5, contract_id=first.id)
+    await portfolios.add_holding(user_id=5, contract_id=second.id)
+
+    assert again.id == added.id
+    assert added.contract.id == first.id
+    assert await portfolios.add_holding(user_id=5, contract_id=999) is None
+    holdings = await portfolios.list_holdings(user_id=5)
+    assert [holding.contract_id for holding in holdings] == [second.id, first.id]
+    assert await portfolios.count_holdings(user_id=5) == 2
+    assert await portfolios.count_holdings(user_id=6) == 0
+    assert await portfolios.remove_holding(user_id=5, contract_id=first.id)
+    assert not await portfolios.remove_holding(user_id=5, contract_id=first.id)
+    assert [holding.contract_id for holding in await portfolios.list_holdings(user_id=5)] == [
+        second.id
+    ]
+
+
+@pytest.mark.asyncio
+async def test_metrics_follow_contract_updates_and_deletes(backend) -> None:
+    contracts, portfolios = backend
+    base = generate_contract_fields(1)[0]
+    solar = await contracts.add({**base, "energy_type": "Solar", "quantity_mwh": Decimal(100)})
+    wind = await contracts.add({**base, "energy_type": "Wind", "quantity_mwh": Decimal(300)})
+    for contract in (solar, wind):
+        await portfolios.add_holding(user_id=8, contract_id=contract.id)
+        await portfolios.add_holding(user_id=9, contract_id=contract.id)
+
+    await contracts.update(solar, {"price_per_mwh": Decimal(40)})
+    await contracts.update(wind, {"price_per_mwh": Decimal(20)})
+    metrics = await portfolios.metrics(user_id=8)
+
+    assert metrics["total_contracts"] == 2
+    assert metrics["total_capacity_mwh"] == Decimal(400)
+    assert metrics["total_cost"] == Decimal(10_000)
+    assert metrics["weighted_avg_price_per_mwh"] == Decimal(25)
+    assert [item["energy_type"] for item in metrics["breakdown_by_energy_type"]] == [
+        "Solar",
+        "Wind",
+    ]
+
+    target = await contracts.get_for_update(wind.id)
+    await contracts.delete(target)
+
+    for user_id in (8, 9):
+        metrics = await portfolios.metrics(user_id=user_id)
+        assert metrics["total_contracts"] == 1
+        assert metrics["total_cost"] == Decimal(4_000)
+    assert (await portfolios.metrics(user_id=404))["total_contracts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_api_runs_on_memory_backend(client, monkeypatch) -> None:
+    monkeypatch.setattr(repositories, "REPOSITORY_BACKEND", "memory")
+    payload = {
+        "energy_type": "Hydro",
+        "quantity_mwh": "50",
+        "price_per_mwh": "40",
+        "delivery_start": "2026-01-01",
+        "delivery_end": "2026-01-31",
+        "location": "Quebec",
+    }
+    contract_id = (await client.post("/contracts", json=payload)).json()["id"]
+    await client.patch(f"/contracts/{contract_id}", json={"price_per_mwh": "44"})
+    await client.post(f"/portfolios/1/contracts/{contract_id}")
+
+    listed = (await client.get("/contracts", params={"location": "queb"})).json()
+    metrics = (await client.get("/portfolios/1/metrics")).json()
+
+    assert [contract["price_per_mwh"] for contract in listed] == ["44.000000"]
+    assert Decimal(metrics["total_cost"]) == Decimal(2_200)
+    assert repositories.memory_store.contracts.store._contracts.keys() == {contract_id}
@@ -0,0 +1,110 @@
+import re
+
+import pytest
+from sqlalchemy import Column, Index, Integer, MetaData, Table, event, text, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models import Base, SchemaVersion
+from app.services import startup
+from app.services.schema_service import (
+    SCHEMA_VERSION,
+    SQL_DIR,
+    SchemaMismatch,
+    check_schema,
+    discover_migrations,
+    metadata_fingerprint,
+    migrate,
+    verify_schema,
+)
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{(tmp_path / 'schema.db').as_posix()}")
+    yield engine
+    await engine.dispose()
+
+
+def test_schema_sql_records_current_version_and_fingerprint():
+    schema_sql = (SQL_DIR / "schema.sql").read_text()
+    version, fingerprint = re.search(
+        r"INSERT INTO schema_version .*?VALUES \(1, (\d+), '(\w+)'\)", schema_sql, re.S
+    ).groups()
+    assert int(version) == SCHEMA_VERSION
+    # Fails when the models change without a migration and an updated schema.sql.
+    assert fingerprint == metadata_fingerprint()
+    assert discover_migrations()[-1].version == SCHEMA_VERSION
+
+
+def test_fingerprint_changes_with_declared_indexes():
+    metadata = MetaData()
+    table = Table("things", metadata, Column("id", Integer, primary_key=True), Column("x", Integer))
+    before = metadata_fingerprint(metadata)
+    Index("idx_things_x", table.c.x)
+    assert metadata_fingerprint(metadata) != before
+
+
+@pytest.mark.asyncio
+async def test_migrate_then_startup_check_is_one_query(engine):
+    with pytest.raises(SchemaMismatch, match="no schema_version row"):
+        await check_schema(engine, mode="strict")
+
+    assert await migrate(engine) == []
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    assert await check_schema(engine, mode="strict") == SCHEMA_VERSION
+    assert len(statements) == 1
+    assert await verify_schema(engine) == []
+
+
+@pytest.mark.asyncio
+async def test_check_schema_detects_fingerprint_drift(engine):
+    await migrate(engine)
+    async with engine.begin() as connection:
+        await connection.execute(update(SchemaVersion).values(fingerprint="stale"))
+
+    with pytest.raises(SchemaMismatch, match="does not match models"):
+        await check_schema(engine, mode="strict")
+    assert await check_schema(engine, mode="warn") == SCHEMA_VERSION
+    assert await check_schema(engine, mode="off") is None
+
+
+@pytest.mark.asyncio
+async def test_existing_database_needs_baseline_and_verify_reports_drift(engine):
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(text("DROP INDEX idx_contracts_energy_type"))
+        await connection.execute(text("DROP TABLE schema_version"))
+
+    with pytest.raises(SchemaMismatch, match="--baseline"):
+        await migrate(engine)
+    assert await migrate(engine, baseline=SCHEMA_VERSION) == []
+    assert await check_schema(engine) == SCHEMA_VERSION
+    assert await verify_schema(engine) == ["missing index contracts.idx_contracts_energy_type"]
+
+
+@pytest.mark.asyncio
+async def test_prewarm_reads_hot_pages_and_builds_index(session_maker, create_contract):
+    await create_contract()
+
+    pages = await startup.prewarm_contract_pages(session_factory=session_maker, pages=2)
+
+    assert pages == 4
+    assert startup.similarity_index.is_built
+
+
+@pytest.mark.asyncio
+async def test_first_request_timer_reports_time_to_first_request(app, client, monkeypatch):
+    monkeypatch.setattr(startup, "startup_report", startup.StartupReport())
+    app.add_middleware(startup.FirstRequestTimer)
+
+    await client.get("/health")
+    await client.get("/contracts")
+
+    report = startup.startup_report
+    assert report.time_to_first_request_ms > 0
+    assert report.first_request_path == "/health"
@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.services.coalescing import SingleFlight, bind_key
+from app.services.contract_loader import ContractLoader
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_query():
+    flight = SingleFlight(name="test")
+    release = asyncio.Event()
+    calls = 0
+
+    async def query():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return ["row"]
+
+    tasks = [asyncio.create_task(flight.run("key", query)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats()["queries_executed"] == 1
+    assert flight.stats()["requests_coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_followers_retry_when_leader_cancelled():
+    flight = SingleFlight(name="test")
+    release = asyncio.Event()
+
+    async def slow_query():
+        await release.wait()
+        return "leader"
+
+    async def own_query():
+        return "follower"
+
+    leader = asyncio.create_task(flight.run("key", slow_query))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.run("key", own_query))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "follower"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors_to_followers():
+    flight = SingleFlight(name="test")
+    release = asyncio.Event()
+
+    async def failing_query():
+        await release.wait()
+        raise RuntimeError("db down")
+
+    tasks = [asyncio.create_task(flight.run("key", failing_query)) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_bind_key_separates_transaction_modes():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    read_only = engine.execution_options(postgresql_readonly=True)
+    snapshot = engine.execution_options(
+        isolation_level="SERIALIZABLE", postgresql_readonly=True, postgresql_deferrable=True
+    )
+    same_url = create_async_engine("sqlite+aiosqlite://")
+
+    keys = [bind_key(AsyncSession(bind=bind)) for bind in (engine, read_only, snapshot, same_url)]
+    assert len(set(keys)) == 4
+    read_only_again = engine.execution_options(postgresql_readonly=True)
+    assert bind_key(AsyncSession(bind=read_only_again)) == keys[1]
+    await engine.dispose()
+    await same_url.dispose()
+
+
+@pytest.mark.requires_sql
+@pytest.mark.asyncio
+async def test_concurrent_contract_lists_are_coalesced(create_contract, client):
+    await create_contract()
+    before = {item["name"]: item for item in (await client.get("/stats/coalescing")).json()}
+
+    responses = await asyncio.gather(
+        *(client.get("/contracts?energy_types=Solar&energy_types=Wind") for _ in range(3)),
+        client.get("/contracts?energy_types=Wind&energy_types=Solar"),
+    )
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.text for response in responses}) == 1
+
+    after = {item["name"]: item for item in (await client.get("/stats/coalescing")).json()}
+    executed = (
+        after["contracts.list"]["queries_executed"]
+        - before["contracts.list"]["queries_executed"]
+    )
+    coalesced = (
+        after["contracts.list"]["requests_coalesced"]
+        - before["contracts.list"]["requests_coalesced"]
+    )
+    assert executed + coalesced == 4
+    assert coalesced >= 1
+
+
+class _FakeContract:
+    def __init__(self, contract_id):
+        self.id = contract_id
+
+
+@pytest.mark.asyncio
+async def test_contract_loader_batches_concurrent_lookups(session_maker):
+    batches = []
+
+    async def fetch(session, contract_ids):
+        batches.append(sorted(contract_ids))
+        return [_FakeContract(contract_id) for contract_id in contract_ids if contract_id != 3]
+
+    loader = ContractLoader(fetch=fetch, max_batch_size=3, window_seconds=0)
+    async with session_maker() as session:
+        results = await asyncio.gather(
+            *(loader.load(session=session, contract_id=contract_id) for contract_id in [1, 2, 1, 3, 4]),
+        )
+
+    assert batches == [[1, 2, 3], [4]]
+    assert [result.id if result else None for result in results] == [1, 2, 1, None, 4]
+    assert loader.stats()["ids_requested"] == 5
+    assert loader.stats()["batches_dispatched"] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_contract_reads_share_a_batch(create_contract, client):
+    first = await create_contract()
+    second = await create_contract()
+    before = (await client.get("/stats/contract-loader")).json()
+
+    responses = await asyncio.gather(
+        client.get(f"/contracts/{first.id}"),
+        client.get(f"/contracts/{second.id}"),
+        client.get("/contracts/99999"),
+    )
+    assert [response.status_code for response in responses] == [200, 200, 404]
+    assert responses[1].json()["id"] == second.id
+
+    after = (await client.get("/stats/contract-loader")).json()
+    assert after["ids_requested"] - before["ids_requested"] == 3
+    assert after["batches_dispatched"] - before["batches_dispatched"] < 3
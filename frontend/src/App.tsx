@@ -8,10 +8,10 @@ import DashboardView from "./components/DashboardView";
 import PortfolioBuilder from "./components/PortfolioBuilder";
 import RefreshIcon from "./ui/RefreshIcon";
 import { fetchContractComparison, fetchContracts } from "./api/contractsApi";
+import { subscribeToChanges } from "./api/eventsApi";
 import {
   addContractToPortfolio,
-  fetchPortfolio,
-  fetchPortfolioMetrics,
+  fetchPortfolioSnapshot,
   removeContractFromPortfolio,
 } from "./api/portfolioApi";
 import type {
@@ -318,12 +318,9 @@ const App = () => {
     try {
       setPortfolioStatus("loading");
       setPortfolioErrorMessage(null);
-      const [portfolio, metrics] = await Promise.all([
-        fetchPortfolio(PORTFOLIO_USER_ID),
-        fetchPortfolioMetrics(PORTFOLIO_USER_ID),
-      ]);
-      setPortfolioHoldings(portfolio.holdings);
-      setPortfolioMetrics(metrics);
+      const snapshot = await fetchPortfolioSnapshot(PORTFOLIO_USER_ID);
+      setPortfolioHoldings(snapshot.holdings);
+      setPortfolioMetrics(snapshot.metrics);
       setPortfolioStatus("success");
     } catch (error) {
       const message = error instanceof Error ? error.message : "Unable to load portfolio.";
@@ -386,6 +383,47 @@ const App = () => {
     void loadComparison(compareIds);
   }, [compareIds, loadComparison]);
 
+  const appliedFiltersRef = useRef(appliedFilters);
+  appliedFiltersRef.current = appliedFilters;
+
+  useEffect(
+    () =>
+      subscribeToChanges(PORTFOLIO_USER_ID, {
+        // Patch rows already on screen; new contracts show up on the next filtered load.
+        onContractChanged: (contract) => {
+          setContracts((prev) =>
+            prev.map((existing) => (existing.id === contract.id ? contract : existing)),
+          );
+          setPortfolioHoldings((prev) =>
+            prev.map((holding) =>
+              holding.contract.id === contract.id ? { ...holding, contract } : holding,
+            ),
+          );
+        },
+        onContractDeleted: (contractId) => {
+          setContracts((prev) => prev.filter((contract) => contract.id !== contractId));
+        },
+        onHoldingsChanged: (event) => {
+          if (event.metrics === null || (event.action === "added" && event.holding === null)) {
+            void loadPortfolio();
+            return;
+          }
+          setPortfolioMetrics(event.metrics);
+          setPortfolioHoldings((prev) => {
+            const remaining = prev.filter(
+              (holding) => !event.contract_ids.includes(holding.contract.id),
+            );
+            return event.holding === null ? remaining : [event.holding, ...remaining];
+          });
+        },
+        onReset: () => {
+          void loadContracts({ filters: appliedFiltersRef.current });
+          void loadPortfolio();
+        },
+      }),
+    [loadContracts, loadPortfolio],
+  );
+
   const handleAddToPortfolio = useCallback(
     async (contractId: number) => {
       if (portfolioContractIds.has(contractId) || portfolioUpdatingIds.has(contractId)) {
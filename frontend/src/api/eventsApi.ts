@@ -0,0 +1,28 @@
+import { getApiBaseUrl } from "./client";
+import type { Contract, PortfolioHoldingsChangedEvent } from "../types/contracts";
+
+export interface ChangeFeedHandlers {
+  onContractChanged: (contract: Contract) => void;
+  onContractDeleted: (contractId: number) => void;
+  onHoldingsChanged: (event: PortfolioHoldingsChangedEvent) => void;
+  // The server could not replay missed events; refetch everything.
+  onReset: () => void;
+}
+
+// EventSource reconnects on its own and sends Last-Event-ID, so missed events are replayed.
+export const subscribeToChanges = (userId: number, handlers: ChangeFeedHandlers): (() => void) => {
+  const source = new EventSource(`${getApiBaseUrl()}/events?user_id=${userId}`);
+  const onContract = (event: MessageEvent<string>) => {
+    handlers.onContractChanged(JSON.parse(event.data) as Contract);
+  };
+  source.addEventListener("contract.created", onContract);
+  source.addEventListener("contract.updated", onContract);
+  source.addEventListener("contract.deleted", (event: MessageEvent<string>) => {
+    handlers.onContractDeleted((JSON.parse(event.data) as { id: number }).id);
+  });
+  source.addEventListener("portfolio.holdings_changed", (event: MessageEvent<string>) => {
+    handlers.onHoldingsChanged(JSON.parse(event.data) as PortfolioHoldingsChangedEvent);
+  });
+  source.addEventListener("reset", handlers.onReset);
+  return () => source.close();
+};
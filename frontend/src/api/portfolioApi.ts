@@ -3,6 +3,7 @@ import type {
   PortfolioHolding,
   PortfolioMetrics,
   PortfolioRead,
+  PortfolioSnapshot,
 } from "../types/contracts";
 
 const getJson = async <T>(response: Response, fallbackMessage: string): Promise<T> => {
@@ -31,6 +32,15 @@ export const fetchPortfolioMetrics = async (userId: number): Promise<PortfolioMe
   return getJson<PortfolioMetrics>(response, "Unable to load portfolio metrics.");
 };
 
+export const fetchPortfolioSnapshot = async (userId: number): Promise<PortfolioSnapshot> => {
+  const response = await fetch(`${getApiBaseUrl()}/portfolios/${userId}/snapshot`, {
+    headers: {
+      Accept: "application/json",
+    },
+  });
+  return getJson<PortfolioSnapshot>(response, "Unable to load portfolio.");
+};
+
 export const addContractToPortfolio = async (
   userId: number,
   contractId: number,
@@ -26,12 +26,14 @@ interface ContractFiltersProps {
 }
 
 const energyTypes: EnergyType[] = ["Solar", "Wind", "Natural Gas", "Nuclear", "Coal", "Hydro"];
-const statusOptions: Array<ContractStatus | "Any"> = ["Any", "Available", "Reserved", "Sold"];
+const statusOptions: Array<ContractStatus | "Any"> = ["Any", "Available", "Reserved", "Sold", "Expired"];
 const sortOptions: Array<{ value: ContractSortBy | "None"; label: string }> = [
   { value: "None", label: "None" },
   { value: "price_per_mwh", label: "Price per MWh" },
   { value: "quantity_mwh", label: "Quantity (MWh)" },
   { value: "delivery_start", label: "Delivery start date" },
+  { value: "total_value", label: "Total value" },
+  { value: "duration_days", label: "Duration (days)" },
 ];
 const sortDirectionOptions: Array<{ value: ContractSortDirection; label: string }> = [
   { value: "asc", label: "Ascending" },
@@ -6,9 +6,14 @@ export type EnergyType =
   | "Coal"
   | "Hydro";
 
-export type ContractStatus = "Available" | "Reserved" | "Sold";
+export type ContractStatus = "Available" | "Reserved" | "Sold" | "Expired";
 
-export type ContractSortBy = "price_per_mwh" | "quantity_mwh" | "delivery_start";
+export type ContractSortBy =
+  | "price_per_mwh"
+  | "quantity_mwh"
+  | "delivery_start"
+  | "total_value"
+  | "duration_days";
 
 export type ContractSortDirection = "asc" | "desc";
 
@@ -21,12 +26,12 @@ export interface Contract {
   delivery_end: string;
   location: string;
   status: ContractStatus;
-}
-
-export interface ContractComparisonItem extends Contract {
+  total_value: number;
   duration_days: number;
 }
 
+export type ContractComparisonItem = Contract;
+
 export interface ComparisonRangeDecimal {
   min: number;
   max: number;
@@ -109,3 +114,18 @@ export interface PortfolioMetrics {
   weighted_avg_price_per_mwh: NumericValue;
   breakdown_by_energy_type: PortfolioEnergyBreakdown[];
 }
+
+export interface PortfolioSnapshot {
+  user_id: number;
+  total_holdings: number;
+  holdings: PortfolioHolding[];
+  metrics: PortfolioMetrics;
+}
+
+export interface PortfolioHoldingsChangedEvent {
+  user_id: number;
+  action: "added" | "removed";
+  contract_ids: number[];
+  holding: PortfolioHolding | null;
+  metrics: PortfolioMetrics | null;
+}
@@ -8,6 +8,7 @@ const statusCssClassMap: Record<ContractStatus, string> = {
   Available: "statusBadge statusBadgeAvailable",
   Reserved: "statusBadge statusBadgeReserved",
   Sold: "statusBadge statusBadgeSold",
+  Expired: "statusBadge statusBadgeExpired",
 };
 
 const StatusBadge = ({ status }: StatusBadgeProps) => {